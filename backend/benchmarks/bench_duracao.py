@@ -0,0 +1,63 @@
+"""
+Benchmark: duração de contrato em meses (apply + relativedelta x versão vetorizada).
+
+Usa o P18_contratos.csv replicado N vezes (padrão 100x, ~1,2 milhão de linhas).
+Rodar a partir da raiz do projeto:
+
+    python backend/benchmarks/bench_duracao.py --escala 100
+"""
+import sys
+import os
+import time
+import argparse
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from backend.data.processed.duracao import diferenca_meses, histograma_meses
+
+CAMINHO_CONTRATOS = os.path.join(PROJECT_ROOT, "backend", "data", "raw", "P18_contratos.csv")
+
+
+def duracao_apply(df):
+    """Caminho antigo do planos.create_contract_duration_chart."""
+    return df.apply(
+        lambda row: (relativedelta(row['data_fim'], row['data_inicio']).years * 12 +
+                     relativedelta(row['data_fim'], row['data_inicio']).months), axis=1
+    )
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", type=int, default=100, help="Quantas vezes replicar o CSV de contratos")
+    args = parser.parse_args()
+
+    base = pd.read_csv(CAMINHO_CONTRATOS, usecols=["data_inicio", "data_fim"], parse_dates=["data_inicio", "data_fim"])
+    df = pd.concat([base] * args.escala, ignore_index=True)
+    print(f"Linhas: {len(df):,} ({len(base):,} x {args.escala})")
+
+    meses_vetorizado, t_vetorizado = cronometrar(diferenca_meses, df['data_inicio'], df['data_fim'])
+    _, t_histograma = cronometrar(histograma_meses, meses_vetorizado, 10)
+    meses_apply, t_apply = cronometrar(duracao_apply, df)
+
+    iguais = np.array_equal(meses_apply.to_numpy(dtype=np.float64), meses_vetorizado)
+    print(f"apply + relativedelta   : {t_apply:10.3f} s")
+    print(f"vetorizado (numpy)      : {t_vetorizado:10.3f} s  ({t_apply / t_vetorizado:,.0f}x mais rápido)")
+    print(f"histograma pré-agrupado : {t_histograma:10.3f} s")
+    print(f"Resultados idênticos    : {'sim' if iguais else 'NÃO'}")
+    return 0 if iguais else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Benchmark: escala da pontuação em paralelo (aply_mode.py --workers) com 1, 2, 4 e 8 processos.
+
+Monta uma base sintética de clientes ativos (padrão 1 milhão de linhas) sorteando
+clientes do P18_clientes.csv e contratos do P18_contratos.csv, com as mesmas features
+que a view v_clientes_para_predicao_final entrega ao modelo. Não usa o banco.
+
+Rodar a partir da raiz do projeto:
+
+    python backend/benchmarks/bench_scoring.py --linhas 1000000 --workers 1 2 4 8
+"""
+import sys
+import os
+import time
+import argparse
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BACKEND_ROOT = os.path.join(PROJECT_ROOT, "backend")
+for caminho in (PROJECT_ROOT, BACKEND_ROOT):
+    if caminho not in sys.path:
+        sys.path.insert(0, caminho)
+
+import numpy as np
+import pandas as pd
+
+from data.models.aply_mode import CAMINHO_MODELO, columns_for_model_input, criar_pontuador
+from data.processed.duracao import duracao_dias
+
+DIRETORIO_RAW = os.path.join(BACKEND_ROOT, "data", "raw")
+MAPA_SATISFACAO = {"Baixa": 1, "Média": 2, "Alta": 3}
+
+
+def gerar_base_sintetica(linhas, seed=42):
+    """Sorteia pares (cliente, contrato) dos CSVs brutos e calcula as features do modelo."""
+    rng = np.random.default_rng(seed)
+    clientes = pd.read_csv(os.path.join(DIRETORIO_RAW, "P18_clientes.csv"), parse_dates=["data_nascimento"])
+    contratos = pd.read_csv(os.path.join(DIRETORIO_RAW, "P18_contratos.csv"), parse_dates=["data_inicio", "data_fim"])
+
+    cli = clientes.iloc[rng.integers(0, len(clientes), linhas)].reset_index(drop=True)
+    con = contratos.iloc[rng.integers(0, len(contratos), linhas)].reset_index(drop=True)
+
+    idade = (pd.Timestamp.today().year - cli["data_nascimento"].dt.year).to_numpy()
+    renda = cli["renda_mensal"].to_numpy()
+    premio = con["valor_premio_mensal"].to_numpy()
+    return pd.DataFrame({
+        "genero": cli["genero"].str[0].to_numpy(),
+        "nivel_educacional": cli["nivel_educacional"].to_numpy(),
+        "canal_venda": con["canal_venda"].to_numpy(),
+        "tipo_seguro": con["tipo_seguro"].to_numpy(),
+        "renda_mensal": renda,
+        "valor_premio_mensal": premio,
+        "satisfacao_score": con["satisfacao_ultima_avaliacao"].map(MAPA_SATISFACAO).to_numpy(),
+        "renovado_automaticamente": con["renovado_automaticamente"].to_numpy(),
+        "duracao_dias": duracao_dias(con["data_inicio"], con["data_fim"]),
+        "valor_premio_sobre_renda": premio / renda,
+        "interacao_idade_renda": idade * renda,
+    })[columns_for_model_input]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=1_000_000, help="Tamanho da base sintética")
+    parser.add_argument("--tamanho-lote", type=int, default=100_000, help="Linhas por lote, como no aply_mode.py")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Quantidades de processos a medir")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO, help="Artefato do modelo (diretório versionado ou .pkl legado)")
+    args = parser.parse_args()
+
+    X = gerar_base_sintetica(args.linhas)
+    lotes = [X.iloc[i:i + args.tamanho_lote] for i in range(0, len(X), args.tamanho_lote)]
+    print(f"Base sintética: {len(X):,} linhas em {len(lotes)} lotes | núcleos disponíveis: {os.cpu_count()}")
+
+    referencia = None
+    tempo_base = None
+    for workers in args.workers:
+        with criar_pontuador(args.modelo, workers) as pontuador:
+            pontuador.probabilidades(lotes[0].iloc[:100])  # aquece os processos (carga do modelo)
+            inicio = time.perf_counter()
+            proba = np.concatenate([pontuador.probabilidades(lote) for lote in lotes])
+            tempo = time.perf_counter() - inicio
+
+        if referencia is None:
+            referencia, tempo_base = proba, tempo
+        iguais = np.allclose(proba, referencia)
+        print(f"workers={workers:<2} {tempo:8.2f} s  {len(X) / tempo:12,.0f} linhas/s  "
+              f"speedup {tempo_base / tempo:5.2f}x  mesmo resultado: {'sim' if iguais else 'NÃO'}")
+
+
+if __name__ == "__main__":
+    main()
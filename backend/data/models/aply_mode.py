@@ -1,27 +1,60 @@
+"""
+Gera as previsões de cancelamento para os clientes ativos.
+
+Lê a view v_clientes_para_predicao_final em lotes (cursor no servidor), codifica e
+pontua cada lote e grava o resultado aos poucos, então a memória usada depende do
+tamanho do lote e não do tamanho da base.
+
+Por padrão o resultado vai para a tabela predicoes_churn (COPY + upsert, numa única
+transação), que é de onde as páginas do dashboard leem. ``--formato csv|parquet``
+grava em arquivo, para análises fora do banco.
+
+Com ``--workers N`` cada lote é dividido em N fragmentos pontuados em paralelo por um
+pool de processos; cada processo carrega o modelo uma única vez e o CatBoost usa
+núcleos / N threads, para não disputar CPU entre os processos.
+
+Uso (a partir da raiz do projeto):
+
+    python backend/data/models/aply_mode.py
+    python backend/data/models/aply_mode.py --tamanho-lote 20000 --formato parquet --saida previsoes.parquet
+    python backend/data/models/aply_mode.py --workers 4
+    python backend/data/models/aply_mode.py --incremental
+
+Com ``--incremental`` cada linha ganha um hash das features de entrada; na próxima
+execução só linhas novas ou com hash diferente (ou todas, se o modelo mudou) vão
+para o modelo, e as demais reaproveitam a probabilidade já gravada na saída anterior
+(no banco, só as linhas alteradas são regravadas).
+"""
 import sys
 import os
+import time
+import argparse
+import multiprocessing
 
 # Caminho da raiz do projeto
 raiz_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if raiz_projeto not in sys.path:
     sys.path.insert(0, raiz_projeto)
 
-import joblib
+import numpy as np
 import pandas as pd
-from data.processed.loading_views import carregar_view
-
-# 1. Carrega o modelo salvo
-modelo_completo = joblib.load("backend/models/modelo_completo.pkl")
-encoder = modelo_completo["encoder"]
-clf = modelo_completo["model"]
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import text
+from data.processed.data_acess import get_engine
+from data.processed.predicoes import EscritorPredicoes, ler_hashes
+from data.models.artefato import THRESHOLD_PADRAO, caminho_atual, carregar_artefato
 
-# 2. Carrega os dados reais (clientes ativos)
-df = carregar_view('v_clientes_para_predicao_final')
+# Versão ATUAL em backend/models/artefatos (ou o modelo_completo.pkl legado)
+CAMINHO_MODELO = caminho_atual()
+CAMINHO_SAIDA_BASE = os.path.join(raiz_projeto, "models", "clientes_ativos_com_predicao")
+VIEW_PREDICAO = "v_clientes_para_predicao_final"
+# Usado só sem artefato versionado: cada artefato traz no manifesto o threshold escolhido no treino
+THRESHOLD = THRESHOLD_PADRAO
+TAMANHO_LOTE_PADRAO = 50_000
+# Identifica uma linha da view entre execuções (uma previsão por contrato)
+COLUNAS_CHAVE = ["cliente_id", "contrato_id"]
 
-# 3. Guarda cliente_id para depois (mantém na cópia original)
-# Não é necessário fazer nada aqui, pois o df original será usado para juntar o resultado.
-
-# --- AJUSTE AQUI: Listar APENAS as colunas que foram de fato para o modelo no treino ---
+# --- Listar APENAS as colunas que foram de fato para o modelo no treino ---
 columns_for_model_input = [
     "genero",
     "nivel_educacional",
@@ -36,23 +69,307 @@ columns_for_model_input = [
     "interacao_idade_renda"
 ]
 
-# Filtra o dataframe para ter apenas as colunas que o modelo espera
-X_inferencia = df[columns_for_model_input]
 
-# 5. Aplica a transformação usando o encoder salvo
-X_encoded_inferencia = encoder.transform(X_inferencia)
+def carregar_modelo(caminho=CAMINHO_MODELO, artefato=None):
+    """
+    Carrega só o pré-processamento e o classificador do artefato (sem os dados de avaliação).
+    ``artefato`` já aberto evita ler o manifesto de novo.
+    Retorna (função DataFrame -> entrada do modelo, classificador).
+    """
+    artefato = artefato or carregar_artefato(caminho)
+    return artefato.preparador(), artefato.modelo
+
+
+def ler_em_lotes(tamanho_lote, engine=None):
+    """
+    Percorre a view de predição com cursor no servidor, um DataFrame por lote.
+    O id do contrato (id_contrato_legado na view) vem como contrato_id, a chave das previsões.
+    """
+    engine = engine or get_engine()
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=tamanho_lote) as conn:
+        for lote in pd.read_sql_query(text(f"SELECT * FROM {VIEW_PREDICAO}"), con=conn, chunksize=tamanho_lote):
+            yield lote.rename(columns={"id_contrato_legado": "contrato_id"})
+
+
+class PontuadorLocal:
+    """Pontua no próprio processo, com o CatBoost usando todos os núcleos."""
+
+    def __init__(self, caminho_modelo=CAMINHO_MODELO, artefato=None):
+        self.transformar, self.clf = carregar_modelo(caminho_modelo, artefato)
+
+    def probabilidades(self, X):
+        return self.clf.predict_proba(self.transformar(X), thread_count=-1)[:, 1]
+
+    def fechar(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+# Modelo do processo worker: carregado uma vez no initializer, nunca enviado a cada tarefa
+_modelo_worker = None
+
+
+def _iniciar_worker(caminho_modelo, thread_count):
+    global _modelo_worker
+    transformar, clf = carregar_modelo(caminho_modelo)
+    _modelo_worker = (transformar, clf, thread_count)
+
+
+def _probabilidades_worker(X):
+    transformar, clf, thread_count = _modelo_worker
+    return clf.predict_proba(transformar(X), thread_count=thread_count)[:, 1]
+
+
+class PontuadorParalelo:
+    """Divide cada lote em fragmentos e pontua em um pool de processos, mantendo a ordem."""
+
+    def __init__(self, caminho_modelo=CAMINHO_MODELO, workers=2):
+        self.workers = workers
+        # Divide os núcleos entre os processos para o CatBoost não criar threads demais
+        thread_count = max(1, (os.cpu_count() or 1) // workers)
+        # spawn: o pool nasce com a leitura em lotes aberta (cursor e pool de conexões); com fork
+        # os processos herdariam esses sockets e o estado do pool da engine
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_iniciar_worker,
+            initargs=(caminho_modelo, thread_count),
+        )
+
+    def probabilidades(self, X):
+        fragmentos = [X.iloc[idx] for idx in np.array_split(np.arange(len(X)), self.workers) if len(idx)]
+        # map devolve na ordem dos fragmentos, então a concatenação mantém a ordem das linhas
+        return np.concatenate(list(self.pool.map(_probabilidades_worker, fragmentos)))
+
+    def fechar(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def criar_pontuador(caminho_modelo=CAMINHO_MODELO, workers=1, artefato=None):
+    """``artefato`` já aberto é reaproveitado no modo local; cada worker sempre carrega o seu."""
+    if workers > 1:
+        return PontuadorParalelo(caminho_modelo, workers)
+    return PontuadorLocal(caminho_modelo, artefato)
+
+
+def versao_modelo(caminho_modelo=CAMINHO_MODELO):
+    """Versão do artefato (muda sempre que o modelo é re-treinado)."""
+    return carregar_artefato(caminho_modelo).versao
+
+
+def hash_features(df):
+    """Hash (int64) das features de entrada de cada linha."""
+    return pd.util.hash_pandas_object(df[columns_for_model_input], index=False).to_numpy().view(np.int64)
+
+
+def ler_pontuacoes_anteriores(caminho, formato, versao, engine=None):
+    """
+    Lê da saída anterior apenas chave, hash, probabilidade e previsão das linhas pontuadas
+    com a mesma versão do modelo. Retorna None se não houver nada reaproveitável.
+    """
+    if formato == "banco":
+        anteriores = ler_hashes(versao, engine)
+        anteriores = anteriores.dropna(subset=["hash_features"])
+    else:
+        if not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+            return None
+        colunas = COLUNAS_CHAVE + ["hash_features", "versao_modelo", "probabilidade_cancelamento", "cancelamento_previsto"]
+        try:
+            if formato == "parquet":
+                anteriores = pd.read_parquet(caminho, columns=colunas)
+            else:
+                anteriores = pd.read_csv(caminho, usecols=colunas)
+        except (ValueError, KeyError):
+            # Saída antiga, gravada sem hash ou sem contrato_id: pontua tudo de novo
+            return None
+        anteriores = anteriores[anteriores["versao_modelo"].astype(str) == versao]
+    if anteriores.empty:
+        return None
+    anteriores = anteriores.drop_duplicates(COLUNAS_CHAVE, keep="last").set_index(COLUNAS_CHAVE)
+    anteriores["hash_features"] = anteriores["hash_features"].astype("Int64")
+    return anteriores[["hash_features", "probabilidade_cancelamento", "cancelamento_previsto"]]
+
+
+def pontuar_lote(df, pontuador, threshold=THRESHOLD, anteriores=None, versao=None):
+    """
+    Acrescenta probabilidade_cancelamento e cancelamento_previsto ao lote.
+
+    Com ``anteriores`` (modo incremental), linhas cuja chave e hash de features já
+    estavam pontuadas reaproveitam a probabilidade; só o resto passa pelo modelo. Se o
+    threshold do artefato mudou (avaliacao.py --aplicar), as linhas cuja previsão muda
+    também são pontuadas de novo, para serem regravadas.
+    Retorna o lote e a máscara das linhas que foram de fato pontuadas.
+    """
+    reaproveitar = np.zeros(len(df), dtype=bool)
+    y_pred_proba = np.full(len(df), np.nan)
+
+    if versao is not None:
+        df["hash_features"] = hash_features(df)
+        df["versao_modelo"] = versao
+        if anteriores is not None:
+            previas = anteriores.reindex(pd.MultiIndex.from_frame(df[COLUNAS_CHAVE]))
+            reaproveitar = previas["hash_features"].eq(df["hash_features"].to_numpy()).fillna(False).to_numpy(dtype=bool)
+            previsao_atual = previas["probabilidade_cancelamento"].to_numpy() >= threshold
+            reaproveitar &= previas["cancelamento_previsto"].to_numpy() == previsao_atual
+            y_pred_proba[reaproveitar] = previas["probabilidade_cancelamento"].to_numpy()[reaproveitar]
+
+    alterados = ~reaproveitar
+    if alterados.any():
+        # Filtra o dataframe para ter apenas as colunas que o modelo espera
+        y_pred_proba[alterados] = pontuador.probabilidades(df.loc[alterados, columns_for_model_input])
+
+    df["probabilidade_cancelamento"] = y_pred_proba
+    df["cancelamento_previsto"] = (y_pred_proba >= threshold).astype(int)
+    return df, alterados
+
+
+class EscritorArquivo:
+    """
+    Base dos escritores em arquivo: grava num temporário e troca no final,
+    então quem lê nunca vê um arquivo pela metade.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.temporario = f"{caminho}.tmp"
+
+    def fechar(self):
+        os.replace(self.temporario, self.caminho)
+
+    def descartar(self):
+        if os.path.exists(self.temporario):
+            os.remove(self.temporario)
+
+
+class EscritorCSV(EscritorArquivo):
+    """Grava os lotes em CSV, com cabeçalho só no primeiro."""
+
+    def __init__(self, caminho):
+        super().__init__(caminho)
+        self.primeiro = True
+
+    def escrever(self, df, alterados=None):
+        df.to_csv(self.temporario, mode="w" if self.primeiro else "a", header=self.primeiro, index=False)
+        self.primeiro = False
+
+    def fechar(self):
+        if self.primeiro:  # nenhum lote: ainda assim deixa um arquivo vazio válido
+            open(self.temporario, "w").close()
+        super().fechar()
+
+
+class EscritorParquet(EscritorArquivo):
+    """Grava os lotes como row groups de um único arquivo Parquet (requer pyarrow)."""
+
+    def __init__(self, caminho):
+        import pyarrow  # noqa: F401  (falha cedo se não estiver instalado)
+        super().__init__(caminho)
+        self.writer = None
+        self.schema = None
+
+    def escrever(self, df, alterados=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self.writer is None:
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            self.schema = tabela.schema
+            self.writer = pq.ParquetWriter(self.temporario, self.schema)
+        else:
+            # Mantém o schema do primeiro lote (ex.: coluna só com nulos em um lote)
+            tabela = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(tabela)
+
+    def fechar(self):
+        if self.writer is not None:
+            self.writer.close()
+        else:
+            open(self.temporario, "wb").close()
+        super().fechar()
+
+    def descartar(self):
+        if self.writer is not None:
+            self.writer.close()
+        super().descartar()
+
+
+class EscritorBanco:
+    """Grava na tabela predicoes_churn; em modo incremental só as linhas alteradas são regravadas."""
+
+    def __init__(self, caminho=None, engine=None):
+        self.destino = EscritorPredicoes(engine)
+
+    def escrever(self, df, alterados=None):
+        self.destino.escrever(df, alterados)
+
+    def fechar(self):
+        self.destino.fechar()
+
+    def descartar(self):
+        self.destino.descartar()
+
+
+ESCRITORES = {"banco": EscritorBanco, "csv": EscritorCSV, "parquet": EscritorParquet}
+
+
+def pontuar(tamanho_lote=TAMANHO_LOTE_PADRAO, formato="banco", saida=None, caminho_modelo=CAMINHO_MODELO,
+            workers=1, incremental=False, engine=None):
+    """
+    Pontua a base inteira lote a lote e grava na tabela predicoes_churn ou em ``saida``.
+    ``engine`` é o banco lido (e gravado, no formato banco); padrão: o do .env.
+    Retorna (total de linhas gravadas, linhas que passaram pelo modelo).
+    """
+    if formato != "banco":
+        saida = saida or f"{CAMINHO_SAIDA_BASE}.{formato}"
+    # Versão e hash vão sempre junto da previsão; reaproveitar só no modo incremental
+    artefato = carregar_artefato(caminho_modelo)
+    versao, threshold = artefato.versao, artefato.threshold
+    anteriores = ler_pontuacoes_anteriores(saida, formato, versao, engine) if incremental else None
+
+    escritor = EscritorBanco(saida, engine) if formato == "banco" else ESCRITORES[formato](saida)
+    total = 0
+    pontuadas = 0
+    try:
+        with criar_pontuador(caminho_modelo, workers, artefato) as pontuador:
+            for lote in ler_em_lotes(tamanho_lote, engine):
+                lote, alterados = pontuar_lote(lote, pontuador, threshold, anteriores=anteriores, versao=versao)
+                escritor.escrever(lote, alterados if anteriores is not None else None)
+                total += len(lote)
+                pontuadas += int(alterados.sum())
+                print(f"  {total:,} clientes processados ({pontuadas:,} pontuados pelo modelo)...")
+        escritor.fechar()
+    except BaseException:
+        escritor.descartar()
+        raise
+    return total, pontuadas
+
 
-# 6. Faz a predição com o modelo
-y_pred_proba = clf.predict_proba(X_encoded_inferencia)[:, 1]
-threshold = 0.3
-y_pred_com_threshold = (y_pred_proba >= threshold).astype(int)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_PADRAO, help="Linhas lidas e pontuadas por vez")
+    parser.add_argument("--formato", choices=sorted(ESCRITORES), default="banco",
+                        help="Destino: tabela predicoes_churn (banco) ou arquivo csv/parquet")
+    parser.add_argument("--saida", help="Arquivo de saída para csv/parquet (padrão: backend/models/clientes_ativos_com_predicao.<formato>)")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO, help="Artefato do modelo (diretório versionado ou .pkl legado)")
+    parser.add_argument("--workers", type=int, default=1, help="Processos de pontuação em paralelo")
+    parser.add_argument("--incremental", action="store_true", help="Pontua só linhas novas ou com features alteradas")
+    args = parser.parse_args(argv)
 
-# 7. Junta as previsões com os dados originais
-df_resultado = df.copy()
-df_resultado["probabilidade_cancelamento"] = y_pred_proba
-df_resultado["cancelamento_previsto"] = y_pred_com_threshold
+    inicio = time.perf_counter()
+    total, pontuadas = pontuar(args.tamanho_lote, args.formato, args.saida, args.modelo, args.workers, args.incremental)
+    print(f"✅ Previsões geradas e salvas com sucesso! ({total:,} clientes, {pontuadas:,} pontuados pelo modelo, "
+          f"em {time.perf_counter() - inicio:.1f}s)")
 
-# 8. Salva o resultado em CSV
-df_resultado.to_csv("backend/models/clientes_ativos_com_predicao.csv", index=False)
 
-print("✅ Previsões geradas e salvas com sucesso!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Formato versionado do modelo treinado.
+
+Cada treino gera um diretório ``backend/models/artefatos/<versao>/`` com:
+
+    manifesto.json        versão, modo de treino, threshold, colunas de entrada e arquivos
+    modelo.cbm            classificador no formato nativo do CatBoost
+    encoder.joblib        pré-processamento (ColumnTransformer) usado no treino; ausente
+                          no modo nativo, em que o CatBoost recebe as categóricas direto
+    avaliacao/*.npy       opcional: y_test, proba_test, contrato_id_test e (com encoder)
+                          X_test, abertos com memory-map
+    avaliacao/relatorio.json  opcional: varredura de thresholds que escolheu o threshold
+
+O arquivo ``backend/models/artefatos/ATUAL`` guarda o nome da versão em uso. Quem só
+pontua lê o manifesto e carrega modelo e encoder; os dados de avaliação nunca são
+lidos, então o tempo de carga e a memória não crescem com o conjunto de teste.
+
+O antigo ``modelo_completo.pkl`` (tudo num joblib só) continua aceito como fallback
+e pode ser convertido:
+
+    python backend/data/models/artefato.py --converter backend/models/modelo_completo.pkl
+"""
+import sys
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime
+from functools import cached_property
+
+import joblib
+import numpy as np
+
+raiz_backend = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if raiz_backend not in sys.path:
+    sys.path.insert(0, raiz_backend)
+
+from data.models.transformacao import TransformacaoNativa, compilar_transformacao
+
+DIRETORIO_ARTEFATOS = os.path.join(raiz_backend, "models", "artefatos")
+CAMINHO_LEGADO = os.path.join(raiz_backend, "models", "modelo_completo.pkl")
+ARQUIVO_ATUAL = "ATUAL"
+FORMATO = 1
+THRESHOLD_PADRAO = 0.3
+
+
+def caminho_atual(diretorio_base=DIRETORIO_ARTEFATOS):
+    """Diretório da versão apontada por ATUAL, ou o modelo_completo.pkl se ainda não houver artefato."""
+    try:
+        with open(os.path.join(diretorio_base, ARQUIVO_ATUAL), "r") as f:
+            versao = f.read().strip()
+    except OSError:
+        return CAMINHO_LEGADO
+    caminho = os.path.join(diretorio_base, versao)
+    return caminho if os.path.isdir(caminho) else CAMINHO_LEGADO
+
+
+class Artefato:
+    """Artefato versionado; modelo, encoder e dados de avaliação só são lidos quando usados."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with open(os.path.join(caminho, "manifesto.json"), "r") as f:
+            self.manifesto = json.load(f)
+        if self.manifesto.get("formato") != FORMATO:
+            raise ValueError(f"Formato de artefato não suportado em {caminho}: {self.manifesto.get('formato')}")
+
+    @property
+    def versao(self):
+        return self.manifesto["versao"]
+
+    @property
+    def threshold(self):
+        return self.manifesto.get("threshold", THRESHOLD_PADRAO)
+
+    @property
+    def colunas(self):
+        return self.manifesto["colunas"]
+
+    @property
+    def cat_features(self):
+        return self.manifesto.get("cat_features") or []
+
+    def _arquivo(self, nome):
+        return os.path.join(self.caminho, self.manifesto["arquivos"][nome])
+
+    @cached_property
+    def encoder(self):
+        """ColumnTransformer do treino, ou None no modo nativo."""
+        if "encoder" not in self.manifesto["arquivos"]:
+            return None
+        return joblib.load(self._arquivo("encoder"))
+
+    def preparador(self):
+        """Função DataFrame -> entrada do modelo (one-hot compilado ou categóricas nativas)."""
+        if self.encoder is None:
+            return TransformacaoNativa(self.colunas, self.cat_features).transform
+        # Artefatos anteriores à verificação de paridade não têm o campo
+        if not self.manifesto.get("transformacao_compilada", True):
+            return self.encoder.transform
+        return compilar_transformacao(self.encoder)
+
+    @cached_property
+    def modelo(self):
+        from catboost import CatBoostClassifier
+        modelo = CatBoostClassifier()
+        modelo.load_model(self._arquivo("modelo"), format="cbm")
+        return modelo
+
+    def dados_avaliacao(self):
+        """Dict nome -> array (memory-map, só leitura), ou None se o artefato não guardou avaliação."""
+        arquivos = self.manifesto["arquivos"].get("avaliacao")
+        if not arquivos:
+            return None
+        return {nome: np.load(os.path.join(self.caminho, arquivo), mmap_mode="r") for nome, arquivo in arquivos.items()}
+
+
+class ArtefatoLegado:
+    """Mesma interface do Artefato sobre o antigo modelo_completo.pkl (carregado inteiro)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    @cached_property
+    def _conteudo(self):
+        return joblib.load(self.caminho)
+
+    @cached_property
+    def versao(self):
+        # Identificador curto do arquivo (muda sempre que o modelo é re-treinado)
+        with open(self.caminho, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()[:12]
+
+    @property
+    def threshold(self):
+        return THRESHOLD_PADRAO
+
+    @property
+    def colunas(self):
+        return list(self.encoder.feature_names_in_)
+
+    @property
+    def encoder(self):
+        return self._conteudo["encoder"]
+
+    def preparador(self):
+        return compilar_transformacao(self.encoder)
+
+    @property
+    def modelo(self):
+        return self._conteudo["model"]
+
+    def dados_avaliacao(self):
+        dados = {"X_test": self._conteudo.get("X_test_encoded"), "y_test": self._conteudo.get("y_test")}
+        if "contrato_id_test" in self._conteudo:
+            dados["contrato_id_test"] = self._conteudo["contrato_id_test"]
+        return None if dados["X_test"] is None else {nome: np.asarray(v) for nome, v in dados.items()}
+
+
+def carregar_artefato(caminho=None):
+    """Abre o artefato em ``caminho`` (diretório versionado ou .pkl legado); padrão: a versão ATUAL."""
+    caminho = caminho or caminho_atual()
+    if os.path.isdir(caminho):
+        return Artefato(caminho)
+    return ArtefatoLegado(caminho)
+
+
+def salvar_artefato(encoder, modelo, colunas, threshold=THRESHOLD_PADRAO, avaliacao=None,
+                    diretorio_base=DIRETORIO_ARTEFATOS, tornar_atual=True, extras=None, cat_features=None,
+                    relatorio=None):
+    """
+    Grava um novo artefato versionado e (por padrão) passa a apontar ATUAL para ele.
+    ``encoder`` None indica o modo nativo, com ``cat_features`` passadas direto ao CatBoost.
+    ``avaliacao`` é um dict nome -> array (ex.: X_test, y_test); fica fora do caminho de carga.
+    ``relatorio`` (dict) é o relatório de avaliação do threshold, gravado em JSON ao lado.
+    Retorna o diretório criado.
+    """
+    temporario = os.path.join(diretorio_base, f".novo-{os.getpid()}")
+    os.makedirs(temporario)
+    try:
+        arquivos = {"modelo": "modelo.cbm"}
+        modelo.save_model(os.path.join(temporario, arquivos["modelo"]), format="cbm")
+        if encoder is not None:
+            arquivos["encoder"] = "encoder.joblib"
+            joblib.dump(encoder, os.path.join(temporario, arquivos["encoder"]))
+        # Data + hash do modelo: ordena por data e nunca colide entre treinos
+        with open(os.path.join(temporario, arquivos["modelo"]), "rb") as f:
+            versao = f"{datetime.now():%Y%m%d-%H%M%S}-{hashlib.sha1(f.read()).hexdigest()[:8]}"
+        destino = os.path.join(diretorio_base, versao)
+
+        if avaliacao:
+            os.makedirs(os.path.join(temporario, "avaliacao"))
+            arquivos["avaliacao"] = {}
+            for nome, valores in avaliacao.items():
+                valores = np.asarray(valores)
+                # Arrays object (saída do ColumnTransformer) não podem ser abertos com memory-map
+                if valores.dtype == object:
+                    valores = valores.astype(np.float64)
+                arquivos["avaliacao"][nome] = os.path.join("avaliacao", f"{nome}.npy")
+                np.save(os.path.join(temporario, arquivos["avaliacao"][nome]), valores)
+
+        if relatorio is not None:
+            os.makedirs(os.path.join(temporario, "avaliacao"), exist_ok=True)
+            arquivos["relatorio"] = os.path.join("avaliacao", "relatorio.json")
+            with open(os.path.join(temporario, arquivos["relatorio"]), "w") as f:
+                json.dump({**relatorio, "versao_modelo": versao}, f, indent=2, ensure_ascii=False)
+
+        manifesto = {
+            "formato": FORMATO,
+            "versao": versao,
+            "criado_em": datetime.now().isoformat(timespec="seconds"),
+            "modo": "onehot_smote" if encoder is not None else "nativo",
+            "threshold": threshold,
+            "colunas": list(colunas),
+            "cat_features": list(cat_features or []),
+            "arquivos": arquivos,
+        }
+        manifesto.update(extras or {})
+        with open(os.path.join(temporario, "manifesto.json"), "w") as f:
+            json.dump(manifesto, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            shutil.rmtree(temporario)
+
+    if tornar_atual:
+        apontador = os.path.join(diretorio_base, ARQUIVO_ATUAL)
+        with open(f"{apontador}.tmp", "w") as f:
+            f.write(versao)
+        os.replace(f"{apontador}.tmp", apontador)
+    return destino
+
+
+def atualizar_manifesto(caminho, **campos):
+    """Altera campos do manifesto de um artefato versionado (ex.: threshold), com gravação atômica."""
+    if not os.path.isdir(caminho):
+        raise ValueError(f"{caminho} não é um artefato versionado; converta com --converter antes.")
+    caminho_manifesto = os.path.join(caminho, "manifesto.json")
+    with open(caminho_manifesto, "r") as f:
+        manifesto = json.load(f)
+    manifesto.update(campos)
+    with open(f"{caminho_manifesto}.tmp", "w") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    os.replace(f"{caminho_manifesto}.tmp", caminho_manifesto)
+
+
+def converter_legado(caminho_pkl=CAMINHO_LEGADO, diretorio_base=DIRETORIO_ARTEFATOS):
+    """Reescreve um modelo_completo.pkl no formato versionado."""
+    legado = ArtefatoLegado(caminho_pkl)
+    return salvar_artefato(
+        legado.encoder, legado.modelo, legado.colunas,
+        avaliacao=legado.dados_avaliacao(), diretorio_base=diretorio_base,
+        extras={"origem": os.path.basename(caminho_pkl), "versao_origem": legado.versao},
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--converter", metavar="PKL", help="Converte um modelo_completo.pkl para o formato versionado")
+    args = parser.parse_args(argv)
+
+    if args.converter:
+        destino = converter_legado(args.converter)
+        print(f"✅ Artefato gravado em {destino} (agora é a versão ATUAL)")
+    else:
+        artefato = carregar_artefato()
+        print(f"Modelo em uso: {artefato.caminho} (versão {artefato.versao}, threshold {artefato.threshold})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Avaliação do modelo sobre uma grade densa de thresholds e escolha do threshold de operação.
+
+As probabilidades são ordenadas uma única vez; com as contagens acumuladas de positivos
+e um searchsorted, TP/FP/FN/TN de todos os thresholds saem de uma só passada vetorizada
+(O(n log n + t log n)), em vez de um classification_report por threshold.
+
+O threshold é escolhido num conjunto de seleção separado do teste (previsões fora do
+fold no treino, ver train_model.py) e as métricas reportadas são as do teste nesse
+threshold fixo; escolher e medir no mesmo conjunto daria métricas otimistas. O threshold
+vai para o manifesto do artefato e é o que o aply_mode.py e o servico_score.py usam.
+Reavaliar um artefato já treinado (usa o proba_selecao e o proba_test gravados):
+
+    python backend/data/models/avaliacao.py
+    python backend/data/models/avaliacao.py --criterio custo --custo-fn 8 --aplicar
+"""
+import sys
+import os
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+raiz_backend = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if raiz_backend not in sys.path:
+    sys.path.insert(0, raiz_backend)
+
+GRADE_PADRAO = np.round(np.arange(0.01, 1.0, 0.01), 2)
+CRITERIOS = ("f1", "custo")
+# Custos relativos: abordar um cliente que não ia cancelar (FP) x perder um que cancelou (FN)
+CUSTO_FP = 1.0
+CUSTO_FN = 5.0
+
+
+def varrer_thresholds(y_true, scores, thresholds=GRADE_PADRAO, custo_fp=CUSTO_FP, custo_fn=CUSTO_FN):
+    """
+    Métricas para cada threshold (previsto positivo quando score >= threshold).
+    Retorna um DataFrame com threshold, tp, fp, fn, tn, precision, recall, f1 e custo.
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    ordem = np.argsort(scores, kind="mergesort")
+    scores_ordenados = scores[ordem]
+    # positivos_abaixo[i] = positivos entre os i menores scores
+    positivos_abaixo = np.concatenate(([0], np.cumsum(y_true[ordem])))
+
+    n = len(scores)
+    total_positivos = positivos_abaixo[-1]
+    negativos_previstos = np.searchsorted(scores_ordenados, thresholds, side="left")
+    fn = positivos_abaixo[negativos_previstos]
+    tp = total_positivos - fn
+    fp = (n - negativos_previstos) - tp
+    tn = negativos_previstos - fn
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(total_positivos > 0, tp / max(total_positivos, 1), 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+
+    return pd.DataFrame({
+        "threshold": thresholds,
+        "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "custo": custo_fp * fp + custo_fn * fn,
+    })
+
+
+def escolher_threshold(tabela, criterio="f1"):
+    """Linha da tabela com maior F1 ou menor custo (em empate, o menor threshold)."""
+    if criterio not in CRITERIOS:
+        raise ValueError(f"Critério '{criterio}' inválido; use um de {CRITERIOS}.")
+    posicao = tabela["f1"].to_numpy().argmax() if criterio == "f1" else tabela["custo"].to_numpy().argmin()
+    return tabela.iloc[posicao]
+
+
+def metricas_no_threshold(y_true, scores, threshold, custo_fp=CUSTO_FP, custo_fn=CUSTO_FN):
+    """Linha de métricas de um threshold já fixado (ex.: o escolhido fora do conjunto de teste)."""
+    return varrer_thresholds(y_true, scores, [threshold], custo_fp=custo_fp, custo_fn=custo_fn).iloc[0]
+
+
+def _metricas(linha):
+    return {col: float(linha[col]) for col in linha.index if col != "threshold"}
+
+
+def montar_relatorio(tabela, escolhido, criterio, custo_fp=CUSTO_FP, custo_fn=CUSTO_FN, versao=None,
+                     teste=None, origem="teste"):
+    """
+    Relatório serializável em JSON. ``tabela``/``escolhido`` são a grade e o threshold do
+    conjunto de seleção (``origem``); ``teste`` são as métricas no teste nesse threshold,
+    que viram as ``metricas`` do relatório.
+    """
+    final = escolhido if teste is None else teste
+    return {
+        "versao_modelo": versao,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "criterio": criterio,
+        "custos": {"fp": custo_fp, "fn": custo_fn},
+        "origem_threshold": origem,
+        "threshold": float(escolhido["threshold"]),
+        "metricas": _metricas(final),
+        "metricas_selecao": _metricas(escolhido),
+        "amostras": int(final[["tp", "fp", "fn", "tn"]].sum()),
+        "positivos": int(final["tp"] + final["fn"]),
+        "grade": tabela.to_dict(orient="records"),
+    }
+
+
+def imprimir_resumo(tabela, escolhido, criterio, teste=None):
+    pontos = tabela[tabela["threshold"].isin([0.05, 0.1, 0.2, 0.3, 0.4, 0.5]) | (tabela.index == escolhido.name)]
+    print(pontos.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\n🎯 Threshold de operação ({criterio}): {escolhido['threshold']:.2f} "
+          f"| precision {escolhido['precision']:.3f} | recall {escolhido['recall']:.3f} | F1 {escolhido['f1']:.3f}")
+    if teste is not None:
+        print(f"   No conjunto de teste: precision {teste['precision']:.3f} | recall {teste['recall']:.3f} "
+              f"| F1 {teste['f1']:.3f}")
+
+
+def escolher_e_medir(y_selecao, scores_selecao, y_teste, scores_teste, criterio="f1",
+                     custo_fp=CUSTO_FP, custo_fn=CUSTO_FN):
+    """(grade de seleção, linha escolhida, métricas no teste no threshold escolhido)."""
+    tabela = varrer_thresholds(y_selecao, scores_selecao, custo_fp=custo_fp, custo_fn=custo_fn)
+    escolhido = escolher_threshold(tabela, criterio)
+    teste = metricas_no_threshold(y_teste, scores_teste, escolhido["threshold"], custo_fp, custo_fn)
+    return tabela, escolhido, teste
+
+
+def main(argv=None):
+    from data.models.artefato import atualizar_manifesto, carregar_artefato
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modelo", help="Artefato do modelo (padrão: versão ATUAL)")
+    parser.add_argument("--criterio", choices=CRITERIOS, default="f1", help="Como escolher o threshold")
+    parser.add_argument("--custo-fp", type=float, default=CUSTO_FP, help="Custo de um falso positivo")
+    parser.add_argument("--custo-fn", type=float, default=CUSTO_FN, help="Custo de um falso negativo")
+    parser.add_argument("--saida", help="Arquivo JSON do relatório (padrão: só imprime)")
+    parser.add_argument("--aplicar", action="store_true", help="Grava o threshold escolhido no manifesto do artefato")
+    args = parser.parse_args(argv)
+
+    artefato = carregar_artefato(args.modelo)
+    dados = artefato.dados_avaliacao()
+    if dados is None:
+        parser.error("O artefato não tem dados de avaliação.")
+    scores = dados.get("proba_test")
+    if scores is None:
+        scores = artefato.modelo.predict_proba(np.asarray(dados["X_test"]))[:, 1]
+
+    if "proba_selecao" in dados:
+        y_selecao, scores_selecao, origem = dados["y_selecao"], dados["proba_selecao"], "oof_treino"
+    else:
+        # Artefatos antigos só guardaram o teste: o threshold sai dele e as métricas ficam otimistas
+        print("⚠️ Artefato sem previsões de seleção: threshold escolhido no próprio teste (métricas otimistas).")
+        y_selecao, scores_selecao, origem = dados["y_test"], scores, "teste"
+
+    tabela, escolhido, teste = escolher_e_medir(y_selecao, scores_selecao, dados["y_test"], scores,
+                                                args.criterio, args.custo_fp, args.custo_fn)
+    imprimir_resumo(tabela, escolhido, args.criterio, teste)
+
+    relatorio = montar_relatorio(tabela, escolhido, args.criterio, args.custo_fp, args.custo_fn, artefato.versao,
+                                 teste=teste, origem=origem)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"Relatório salvo em {args.saida}")
+    if args.aplicar:
+        atualizar_manifesto(artefato.caminho, threshold=relatorio["threshold"], avaliacao_threshold=relatorio["metricas"])
+        print(f"✅ Threshold {relatorio['threshold']:.2f} gravado no manifesto de {artefato.caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Busca de hiperparâmetros do CatBoost com validação cruzada estratificada.
+
+Cada tentativa sorteia uma combinação do ESPACO_BUSCA (busca aleatória) e é avaliada
+em k folds estratificados do conjunto de treino; o conjunto de teste de
+``train_model.dividir_treino_teste`` fica de fora e só avalia o modelo final. Em cada
+fold o CatBoost para cedo (early stopping) numa parte separada do próprio treino do fold
+(``FRACAO_PARADA``), nunca no fold de validação, e a nota do fold é o melhor F1 da grade
+de thresholds (avaliacao.py) nas previsões do fold de validação.
+
+Folds de tentativas diferentes rodam ao mesmo tempo num pool de processos, que recebe
+a base de treino uma vez só. Poda pela mediana: depois de cada fold, uma tentativa
+cuja média fica abaixo da mediana das outras no mesmo número de folds é abandonada,
+sem rodar os folds restantes.
+
+No fim grava a tabela de resultados (CSV, uma linha por tentativa) e retreina a melhor
+combinação no treino inteiro, com o número de iterações mediano dos folds, gravando o
+artefato versionado como o train_model.py. O threshold de operação é escolhido em
+previsões fora do fold feitas com essa mesma receita (parâmetros e número fixo de
+iterações, sem early stopping), para corresponder ao modelo final; o teste só mede o
+modelo final nesse threshold.
+
+Uso (a partir da raiz do projeto):
+
+    python backend/data/models/busca_hiperparametros.py
+    python backend/data/models/busca_hiperparametros.py --modo nativo --tentativas 40 --folds 5 --workers 4
+    python backend/data/models/busca_hiperparametros.py --sem-salvar
+"""
+import sys
+import os
+import time
+import argparse
+import multiprocessing
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+raiz_backend = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if raiz_backend not in sys.path:
+    sys.path.insert(0, raiz_backend)
+
+from data.models.artefato import salvar_artefato
+from data.models.avaliacao import CRITERIOS, CUSTO_FN, CUSTO_FP, varrer_thresholds
+from data.models.train_model import (
+    MODOS, TREINOS, avaliar, carregar_dados, categorical_features, dividir_treino_teste, probabilidades_oof,
+)
+
+DIRETORIO_RESULTADOS = os.path.join(raiz_backend, "models", "busca")
+# (tipo, mínimo, máximo); "log" sorteia uniforme na escala logarítmica
+ESPACO_BUSCA = {
+    "depth": ("inteiro", 4, 8),
+    "learning_rate": ("log", 0.01, 0.3),
+    "l2_leaf_reg": ("log", 1.0, 10.0),
+    "random_strength": ("uniforme", 0.0, 2.0),
+    "bagging_temperature": ("uniforme", 0.0, 1.0),
+}
+# Teto de iterações: o early stopping decide onde parar antes disso
+MAX_ITERACOES = 2000
+# Métrica do early stopping: o F1 do CatBoost (threshold fixo em 0.5) oscila demais e
+# para nas primeiras iterações; a AUC não depende do threshold escolhido depois
+METRICA_PARADA = "AUC"
+# Parte do treino de cada fold separada só para o early stopping
+FRACAO_PARADA = 0.15
+# Tentativas que já passaram por um fold antes de a poda pela mediana valer nele
+MINIMO_PODA = 3
+
+# Base de treino de cada processo do pool (preenchida uma vez por _iniciar_worker)
+_X = None
+_y = None
+
+
+def sortear_parametros(rng, espaco=ESPACO_BUSCA):
+    parametros = {}
+    for nome, (tipo, minimo, maximo) in espaco.items():
+        if tipo == "inteiro":
+            parametros[nome] = int(rng.integers(minimo, maximo + 1))
+        elif tipo == "log":
+            parametros[nome] = float(np.exp(rng.uniform(np.log(minimo), np.log(maximo))))
+        else:
+            parametros[nome] = float(rng.uniform(minimo, maximo))
+    return parametros
+
+
+def _iniciar_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _rodar_fold(modo, parametros, indices_treino, indices_validacao, semente=42):
+    """
+    Treina num fold, com early stopping numa parte separada do treino do fold, e mede no
+    fold de validação, que o treino não viu. Retorna F1 (melhor threshold) e iterações.
+    """
+    inicio = time.perf_counter()
+    indices_ajuste, indices_parada = train_test_split(
+        indices_treino, test_size=FRACAO_PARADA, stratify=_y.iloc[indices_treino], random_state=semente
+    )
+    _, modelo, preparar = TREINOS[modo](
+        _X.iloc[indices_ajuste], _y.iloc[indices_ajuste], parametros,
+        validacao=(_X.iloc[indices_parada], _y.iloc[indices_parada]),
+    )
+    proba = modelo.predict_proba(preparar(_X.iloc[indices_validacao]))[:, 1]
+    melhor_iteracao = modelo.get_best_iteration()
+    return {
+        "f1": float(varrer_thresholds(_y.iloc[indices_validacao], proba)["f1"].max()),
+        "iteracoes": (melhor_iteracao + 1) if melhor_iteracao is not None else modelo.tree_count_,
+        "tempo_s": time.perf_counter() - inicio,
+    }
+
+
+def deve_podar(media, medias_outras, minimo=MINIMO_PODA):
+    """Poda pela mediana: média abaixo da mediana das outras tentativas no mesmo fold."""
+    return len(medias_outras) >= minimo and media < np.median(medias_outras)
+
+
+def buscar(X, y, modo="smote", tentativas=20, folds=5, workers=None, semente=42, minimo_poda=MINIMO_PODA):
+    """
+    Roda a busca e retorna a tabela de resultados, uma linha por tentativa e melhores primeiro.
+    Cada processo do pool roda um fold por vez; uma tentativa só avança de fold depois
+    do anterior, para a poda poder cortá-la.
+    """
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(semente)
+    divisoes = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=semente).split(X, y))
+    # Os processos dividem as CPUs em vez de cada CatBoost tentar usar todas
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    estado = []
+    for i in range(tentativas):
+        parametros = {**sortear_parametros(rng), "iterations": MAX_ITERACOES, "eval_metric": METRICA_PARADA,
+                      "thread_count": threads}
+        estado.append({"tentativa": i, "parametros": parametros, "f1": [], "iteracoes": [], "tempo_s": 0.0,
+                       "status": "completa"})
+    medias_por_fold = defaultdict(list)
+    fila = deque(range(tentativas))
+    rodando = {}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_iniciar_worker, initargs=(X, y)) as pool:
+        def submeter(i):
+            indices_treino, indices_validacao = divisoes[len(estado[i]["f1"])]
+            futuro = pool.submit(_rodar_fold, modo, estado[i]["parametros"], indices_treino, indices_validacao,
+                                 semente)
+            rodando[futuro] = i
+
+        while fila or rodando:
+            while fila and len(rodando) < workers:
+                submeter(fila.popleft())
+            feitos, _ = wait(rodando, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                i = rodando.pop(futuro)
+                resultado = futuro.result()
+                tentativa = estado[i]
+                tentativa["f1"].append(resultado["f1"])
+                tentativa["iteracoes"].append(resultado["iteracoes"])
+                tentativa["tempo_s"] += resultado["tempo_s"]
+
+                concluidos = len(tentativa["f1"])
+                media = float(np.mean(tentativa["f1"]))
+                podar = concluidos < folds and deve_podar(media, medias_por_fold[concluidos], minimo_poda)
+                medias_por_fold[concluidos].append(media)
+                if podar:
+                    tentativa["status"] = "podada"
+                elif concluidos < folds:
+                    submeter(i)
+                print(f"  tentativa {i:3d} fold {concluidos}/{folds}: F1 {resultado['f1']:.3f} "
+                      f"(média {media:.3f}, {resultado['iteracoes']} iterações){' -> podada' if podar else ''}")
+
+    linhas = []
+    for tentativa in estado:
+        parametros = {nome: valor for nome, valor in tentativa["parametros"].items() if nome in ESPACO_BUSCA}
+        linhas.append({
+            "tentativa": tentativa["tentativa"],
+            "status": tentativa["status"],
+            "folds": len(tentativa["f1"]),
+            "f1_medio": float(np.mean(tentativa["f1"])),
+            "f1_desvio": float(np.std(tentativa["f1"])),
+            "iteracoes": int(np.median(tentativa["iteracoes"])),
+            "tempo_s": tentativa["tempo_s"],
+            **parametros,
+        })
+    tabela = pd.DataFrame(linhas)
+    # Tentativas completas primeiro: a média de uma podada vem de menos folds
+    tabela["_completa"] = tabela["status"] == "completa"
+    return (tabela.sort_values(["_completa", "f1_medio"], ascending=False)
+            .drop(columns="_completa").reset_index(drop=True))
+
+
+def parametros_finais(linha):
+    """Parâmetros do modelo final a partir de uma linha da tabela: o número de iterações é o mediano dos folds."""
+    parametros = {nome: int(linha[nome]) if tipo == "inteiro" else float(linha[nome])
+                  for nome, (tipo, _, _) in ESPACO_BUSCA.items()}
+    parametros["iterations"] = int(linha["iteracoes"])
+    return parametros
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=MODOS, default="smote", help="Modo de treino (ver train_model.py)")
+    parser.add_argument("--tentativas", type=int, default=20, help="Combinações sorteadas")
+    parser.add_argument("--folds", type=int, default=5, help="Folds da validação cruzada estratificada")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos do pool")
+    parser.add_argument("--semente", type=int, default=42, help="Semente do sorteio e dos folds")
+    parser.add_argument("--min-poda", type=int, default=MINIMO_PODA,
+                        help="Tentativas num fold antes de a poda pela mediana valer")
+    parser.add_argument("--saida", help="CSV de resultados (padrão: backend/models/busca/busca_<data>.csv)")
+    parser.add_argument("--sem-salvar", action="store_true", help="Só grava a tabela, sem treinar o modelo final")
+    parser.add_argument("--criterio", choices=CRITERIOS, default="f1", help="Como escolher o threshold de operação")
+    parser.add_argument("--custo-fp", type=float, default=CUSTO_FP, help="Custo de um falso positivo (critério custo)")
+    parser.add_argument("--custo-fn", type=float, default=CUSTO_FN, help="Custo de um falso negativo (critério custo)")
+    args = parser.parse_args(argv)
+
+    df = carregar_dados()
+    X_train, X_test, y_train, y_test, contrato_id_test = dividir_treino_teste(df)
+
+    print(f"--- Busca ({args.modo}): {args.tentativas} tentativas x {args.folds} folds, "
+          f"{args.workers} processos, {len(X_train):,} linhas de treino ---")
+    inicio = time.perf_counter()
+    tabela = buscar(X_train, y_train, args.modo, args.tentativas, args.folds, args.workers, args.semente,
+                    args.min_poda)
+    print(f"\nBusca concluída em {time.perf_counter() - inicio:.1f} s "
+          f"({(tabela['status'] == 'podada').sum()} tentativas podadas)")
+    print(tabela.head(10).to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"busca_{datetime.now():%Y%m%d-%H%M%S}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    tabela.to_csv(saida, index=False)
+    print(f"Resultados salvos em {saida}")
+    if args.sem_salvar:
+        return
+
+    # --- Modelo final: melhor combinação no treino inteiro, sem fold de validação ---
+    melhor = tabela.iloc[0]
+    parametros = parametros_finais(melhor)
+    print(f"\nMelhor tentativa {melhor['tentativa']}: F1 médio {melhor['f1_medio']:.3f} | {parametros}")
+    encoder, final_model, preparar = TREINOS[args.modo](X_train, y_train, parametros)
+    X_test_preparado = preparar(X_test)
+    y_pred_proba = final_model.predict_proba(X_test_preparado)[:, 1]
+    # Threshold em previsões fora do fold com a mesma receita do modelo final (iterações fixas,
+    # sem early stopping): as probabilidades da busca vêm de modelos com outro número de árvores
+    proba_oof = probabilidades_oof(args.modo, X_train, y_train, args.folds, parametros, args.semente)
+    relatorio = avaliar(y_train, proba_oof, y_test, y_pred_proba, args.criterio, args.custo_fp, args.custo_fn,
+                        origem=f"oof_busca_{args.folds}_folds")
+
+    avaliacao = {
+        "y_test": y_test.to_numpy(),
+        "proba_test": y_pred_proba,
+        "contrato_id_test": contrato_id_test,
+        "y_selecao": y_train.to_numpy(),
+        "proba_selecao": proba_oof,
+    }
+    if encoder is not None:
+        avaliacao["X_test"] = X_test_preparado
+    caminho_artefato = salvar_artefato(
+        encoder,
+        final_model,
+        colunas=list(X_train.columns),
+        threshold=relatorio["threshold"],
+        avaliacao=avaliacao,
+        cat_features=categorical_features if encoder is None else None,
+        relatorio=relatorio,
+        extras={"busca": {"parametros": parametros, "f1_cv": float(melhor["f1_medio"]), "folds": args.folds,
+                          "resultados": os.path.basename(saida)}},
+    )
+    print(f"\n✅ Modelo ({args.modo}, threshold {relatorio['threshold']:.2f}) salvo com sucesso em "
+          f"{caminho_artefato} (agora é a versão ATUAL)")
+
+
+if __name__ == "__main__":
+    main()
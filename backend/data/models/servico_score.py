@@ -0,0 +1,283 @@
+"""
+Serviço HTTP local de pontuação online: risco de cancelamento de um cliente (ou de
+poucos) na hora, sem esperar a próxima execução do aply_mode.py.
+
+O encoder e o CatBoost são carregados uma vez e ficam em memória. Requisições que
+chegam juntas são agrupadas: uma thread única junta o que estiver na fila por até
+``--janela-ms`` (ou até ``--max-linhas``) e faz uma só chamada a predict_proba para
+todas, devolvendo a cada requisição a sua fatia do resultado.
+
+Uso (a partir da raiz do projeto):
+
+    python backend/data/models/servico_score.py
+    python backend/data/models/servico_score.py --porta 8765 --janela-ms 5
+
+Endpoints:
+
+    POST /score     {"clientes": [{<features do modelo>}, ...]} ou um único objeto de features
+    GET  /metricas  requisições, lotes e latência p50/p99 (ms) das últimas requisições
+    GET  /saude     versão do modelo carregado e as colunas de features que ele espera
+"""
+import sys
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Caminho da raiz do projeto
+raiz_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if raiz_projeto not in sys.path:
+    sys.path.insert(0, raiz_projeto)
+
+import numpy as np
+import pandas as pd
+from data.models.aply_mode import CAMINHO_MODELO, PontuadorLocal, columns_for_model_input
+from data.models.artefato import carregar_artefato
+
+HOST_PADRAO = os.getenv("SCORE_HOST", "127.0.0.1")
+PORTA_PADRAO = int(os.getenv("SCORE_PORT", 8765))
+JANELA_LOTE_MS = 2.0
+MAX_LINHAS_LOTE = 512
+# Quanto uma requisição espera pelo seu lote antes de desistir (se a thread de lotes travar ou morrer)
+TIMEOUT_PONTUACAO_S = 30.0
+# Latências guardadas para o cálculo de p50/p99
+JANELA_METRICAS = 10_000
+
+
+class ErroRequisicao(ValueError):
+    """Corpo da requisição inválido (vira HTTP 400)."""
+
+
+class Metricas:
+    """Contadores e latências recentes, compartilhados entre as threads do servidor."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias_ms = deque(maxlen=JANELA_METRICAS)
+        self.requisicoes = 0
+        self.erros = 0
+        self.lotes = 0
+        self.linhas = 0
+
+    def registrar_requisicao(self, latencia_ms, erro=False):
+        with self.lock:
+            self.requisicoes += 1
+            self.erros += int(erro)
+            if not erro:
+                self.latencias_ms.append(latencia_ms)
+
+    def registrar_lote(self, linhas):
+        with self.lock:
+            self.lotes += 1
+            self.linhas += linhas
+
+    def resumo(self):
+        with self.lock:
+            latencias = np.fromiter(self.latencias_ms, dtype=np.float64)
+            resumo = {
+                "requisicoes": self.requisicoes,
+                "erros": self.erros,
+                "lotes": self.lotes,
+                "linhas_pontuadas": self.linhas,
+                "linhas_por_lote": round(self.linhas / self.lotes, 2) if self.lotes else 0.0,
+            }
+        if len(latencias):
+            p50, p99 = np.percentile(latencias, [50, 99])
+            resumo["latencia_ms"] = {"p50": round(p50, 3), "p99": round(p99, 3), "amostras": len(latencias)}
+        else:
+            resumo["latencia_ms"] = {"p50": None, "p99": None, "amostras": 0}
+        return resumo
+
+
+class AgrupadorLotes:
+    """
+    Junta as requisições concorrentes em lotes e pontua cada lote com uma só chamada.
+    ``pontuar`` bloqueia a thread da requisição até o lote dela ser processado.
+    """
+
+    def __init__(self, pontuador, metricas, colunas, janela_ms=JANELA_LOTE_MS, max_linhas=MAX_LINHAS_LOTE,
+                 timeout_s=TIMEOUT_PONTUACAO_S):
+        self.pontuador = pontuador
+        self.colunas = list(colunas)
+        self.timeout_s = timeout_s
+        self.metricas = metricas
+        self.janela_s = janela_ms / 1000
+        self.max_linhas = max_linhas
+        self.fila = queue.Queue()
+        self.thread = threading.Thread(target=self._processar, name="agrupador-lotes", daemon=True)
+        self.thread.start()
+
+    def pontuar(self, registros):
+        futuro = Future()
+        self.fila.put((registros, futuro))
+        return futuro.result(timeout=self.timeout_s)
+
+    def fechar(self):
+        self.fila.put(None)
+        self.thread.join()
+
+    def _coletar(self, primeiro):
+        """Pedidos que chegarem até o fim da janela (ou até encher o lote) vão junto com o primeiro."""
+        pedidos = [primeiro]
+        linhas = len(primeiro[0])
+        limite = time.perf_counter() + self.janela_s
+        while linhas < self.max_linhas:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                pedido = self.fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if pedido is None:  # fechar(): termina depois deste lote
+                self.fila.put(None)
+                break
+            pedidos.append(pedido)
+            linhas += len(pedido[0])
+        return pedidos, linhas
+
+    def _processar(self):
+        while True:
+            primeiro = self.fila.get()
+            if primeiro is None:
+                return
+            pedidos, linhas = self._coletar(primeiro)
+            try:
+                X = pd.DataFrame([registro for registros, _ in pedidos for registro in registros],
+                                 columns=self.colunas)
+                proba = self.pontuador.probabilidades(X)
+            except Exception as e:
+                for _, futuro in pedidos:
+                    futuro.set_exception(e)
+                continue
+            self.metricas.registrar_lote(linhas)
+            inicio = 0
+            for registros, futuro in pedidos:
+                futuro.set_result(proba[inicio:inicio + len(registros)])
+                inicio += len(registros)
+
+
+def ler_registros(corpo, colunas=columns_for_model_input):
+    """Valida o JSON recebido (features ``colunas`` do modelo) e devolve a lista de registros."""
+    try:
+        dados = json.loads(corpo or b"null")
+    except ValueError:
+        raise ErroRequisicao("Corpo não é um JSON válido.")
+    if isinstance(dados, dict) and "clientes" in dados:
+        dados = dados["clientes"]
+    registros = [dados] if isinstance(dados, dict) else dados
+    if not isinstance(registros, list) or not registros or not all(isinstance(r, dict) for r in registros):
+        raise ErroRequisicao("Envie um objeto de features ou {\"clientes\": [...]} com ao menos um cliente.")
+    for i, registro in enumerate(registros):
+        faltando = [col for col in colunas if col not in registro]
+        if faltando:
+            raise ErroRequisicao(f"Cliente {i}: faltam as features {', '.join(faltando)}.")
+    return registros
+
+
+class ManipuladorScore(BaseHTTPRequestHandler):
+    server_version = "ServicoScore/1.0"
+
+    def _responder(self, status, conteudo):
+        corpo = json.dumps(conteudo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        if self.path == "/metricas":
+            self._responder(200, self.server.metricas.resumo())
+        elif self.path == "/saude":
+            self._responder(200, {"status": "ok", "versao_modelo": self.server.versao,
+                                  "colunas": self.server.colunas})
+        else:
+            self._responder(404, {"erro": f"Caminho '{self.path}' não existe."})
+
+    def do_POST(self):
+        if self.path != "/score":
+            self._responder(404, {"erro": f"Caminho '{self.path}' não existe."})
+            return
+        inicio = time.perf_counter()
+        try:
+            registros = ler_registros(self.rfile.read(int(self.headers.get("Content-Length") or 0)),
+                                      self.server.colunas)
+            proba = self.server.agrupador.pontuar(registros)
+        except ErroRequisicao as e:
+            self.server.metricas.registrar_requisicao(0.0, erro=True)
+            self._responder(400, {"erro": str(e)})
+            return
+        except TimeoutError:
+            self.server.metricas.registrar_requisicao(0.0, erro=True)
+            self._responder(503, {"erro": f"Lote não pontuado em {self.server.agrupador.timeout_s:g}s."})
+            return
+        except Exception as e:
+            self.server.metricas.registrar_requisicao(0.0, erro=True)
+            self._responder(500, {"erro": f"Falha ao pontuar: {e}"})
+            return
+        self.server.metricas.registrar_requisicao((time.perf_counter() - inicio) * 1000)
+        self._responder(200, {
+            "probabilidades": proba.tolist(),
+            "cancelamento_previsto": (proba >= self.server.threshold).astype(int).tolist(),
+            "threshold": self.server.threshold,
+            "versao_modelo": self.server.versao,
+        })
+
+    def log_message(self, format, *args):
+        # Um print por requisição pesa na latência; erros continuam indo para /metricas
+        pass
+
+
+class ServidorScore(ThreadingHTTPServer):
+    daemon_threads = True
+    # O padrão (5) recusa conexões quando vários clientes chegam ao mesmo tempo
+    request_queue_size = 128
+
+
+def criar_servidor(host=HOST_PADRAO, porta=PORTA_PADRAO, caminho_modelo=CAMINHO_MODELO,
+                   janela_ms=JANELA_LOTE_MS, max_linhas=MAX_LINHAS_LOTE, threshold=None):
+    """
+    Carrega o modelo (uma vez) e monta o servidor, sem começar a atender.
+    Sem ``threshold``, usa o gravado no manifesto do artefato.
+    """
+    artefato = carregar_artefato(caminho_modelo)
+    servidor = ServidorScore((host, porta), ManipuladorScore)
+    servidor.metricas = Metricas()
+    # Colunas do manifesto do artefato carregado, não uma cópia da lista no código
+    servidor.colunas = list(artefato.colunas)
+    servidor.agrupador = AgrupadorLotes(PontuadorLocal(artefato=artefato), servidor.metricas, servidor.colunas,
+                                        janela_ms, max_linhas)
+    servidor.versao = artefato.versao
+    servidor.threshold = artefato.threshold if threshold is None else threshold
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST_PADRAO, help="Endereço de escuta")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO, help="Porta HTTP")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO, help="Artefato do modelo (diretório versionado ou .pkl legado)")
+    parser.add_argument("--janela-ms", type=float, default=JANELA_LOTE_MS,
+                        help="Tempo máximo que uma requisição espera por outras para formar um lote")
+    parser.add_argument("--max-linhas", type=int, default=MAX_LINHAS_LOTE, help="Linhas máximas por lote")
+    args = parser.parse_args(argv)
+
+    servidor = criar_servidor(args.host, args.porta, args.modelo, args.janela_ms, args.max_linhas)
+    print(f"✅ Serviço de score em http://{args.host}:{args.porta} (modelo {servidor.versao})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.agrupador.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,45 @@
+"""
+Treina o modelo de cancelamento e grava um artefato versionado em backend/models/artefatos.
+
+Dois modos de treino:
+
+    smote   (padrão) one-hot denso das categóricas + SMOTE no treino + CatBoost
+    nativo  categóricas passadas direto ao CatBoost (cat_features) e desbalanceamento
+            tratado com auto_class_weights, sem densificar nem sintetizar linhas
+
+Uso (a partir da raiz do projeto):
+
+    python backend/data/models/train_model.py
+    python backend/data/models/train_model.py --modo nativo
+    python backend/data/models/train_model.py --comparar
+    python backend/data/models/train_model.py --criterio custo --custo-fn 8
+
+O threshold de operação é escolhido por uma varredura densa (avaliacao.py: maior F1 ou
+menor custo) sobre previsões fora do fold no conjunto de treino (``--folds-threshold``
+folds estratificados), nunca no teste; o teste só mede precision/recall/F1 nesse
+threshold fixo. Threshold e relatório vão para o manifesto e para avaliacao/relatorio.json.
+
+``--comparar`` treina os dois modos, cada um num processo novo, e mostra lado a lado
+tempo de treino, pico de memória (RSS) e F1 no conjunto de teste; não grava artefato.
+
+Para buscar hiperparâmetros com validação cruzada antes de gravar o artefato, ver
+busca_hiperparametros.py.
+"""
 import sys
 import os
-import joblib
+import time
+import argparse
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from sklearn.model_selection import train_test_split
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from imblearn.over_sampling import SMOTE
 from catboost import CatBoostClassifier
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import classification_report, confusion_matrix, f1_score
 
 # --- Configuração do Caminho ---
 raiz_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -19,12 +51,18 @@ if backend_root not in sys.path:
     sys.path.insert(0, backend_root)
 
 from data.processed.loading_views import carregar_query
+from data.processed.duracao import duracao_dias
+from data.models.artefato import THRESHOLD_PADRAO, salvar_artefato
+from data.models.transformacao import TransformacaoNativa, verificar_paridade
+from data.models.avaliacao import (
+    CRITERIOS, CUSTO_FN, CUSTO_FP, escolher_e_medir, imprimir_resumo, montar_relatorio, varrer_thresholds,
+)
 
 # --- QUERY SQL (Ver acima - copiada para o script) ---
 query = """
 SELECT
     c.cliente_id,
-    c.contrato_id AS id_contrato_legado,
+    c.contrato_id,
     c.cliente_id AS id_cliente_legado,
 
     c.cliente_genero AS genero,
@@ -40,7 +78,6 @@ SELECT
     c.renovacao_automatica AS renovado_automaticamente,
     DATE(c.data_inicio) AS inicio,
     DATE(c.data_fim) AS fim,
-    (c.data_fim - c.data_inicio) AS duracao_dias,
 
     (c.premio_mensal / NULLIF(c.cliente_renda_mensal, 0)) AS valor_premio_sobre_renda,
     ((DATE_PART('year', CURRENT_DATE) - DATE_PART('year', c.cliente_data_nascimento)) * c.cliente_renda_mensal) AS interacao_idade_renda,
@@ -53,18 +90,12 @@ JOIN v_perfil_cliente_enriquecido pce ON c.cliente_id = pce.cliente_id
 WHERE c.status_contrato IN ('Ativo', 'Cancelado');
 """
 
-# --- Carrega os dados ---
-df = carregar_query(query)
-
-# --- ENGENHARIA DE FEATURES (Apenas o que NÃO foi possível fazer na query) ---
-df_att = df.copy()
-
-# O mapeamento de satisfação foi removido, pois 'satisfacao_score' já vem numérico (1, 2, 3)
-# df_att['satisfacao_score'] = df_att['satisfacao_ultima_avaliacao'].map(mapa_satisfacao)
+MODOS = ("smote", "nativo")
+# Iterações sem melhora no fold de validação antes de parar o CatBoost (busca_hiperparametros.py)
+ESPERA_EARLY_STOPPING = 50
+# Folds das previsões fora do fold (no treino) usadas para escolher o threshold de operação
+FOLDS_THRESHOLD = 5
 
-# A feature 'seguro_alto_risco' foi removida, e 'tipo_seguro' será usada diretamente
-
-# --- Prepara X e y com as colunas finais ---
 # Dropar todas as colunas que NÃO são features (IDs, datas auxiliares, target)
 # e as colunas originais que foram usadas para criar novas features
 # e agora são redundantes ou não mais desejadas.
@@ -73,24 +104,12 @@ columns_to_drop_from_X = [
     "inicio",
     "fim",
     "cliente_id", # ID interno
-    "id_contrato_legado", # ID legado
+    "contrato_id",        # ID do contrato (guardado junto do conjunto de teste)
     "id_cliente_legado",  # ID legado
     "idade",              # Original, pode ser usada para interações
     "qtd_dependente",    # Usada para criar 'renda_por_dependente'
 ]
 
-# Remover colunas que não existem no df_att para evitar erros
-columns_to_drop_from_X = [col for col in columns_to_drop_from_X if col in df_att.columns]
-
-X = df_att.drop(columns=columns_to_drop_from_X, axis=1)
-y = df_att["cancelado"]
-
-# --- DIVIDE OS DATOS EM TREINO E TESTE PRIMEIRO! ---
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-# --- OneHotEncoder (Fit APENAS no Treino, Transformar Treino e Teste) ---
 # Atualize esta lista com as novas features categóricas.
 # 'faixa_etaria' e 'seguro_alto_risco' removidas.
 # 'tipo_seguro' adicionada como categórica.
@@ -101,49 +120,207 @@ categorical_features = [
     "tipo_seguro" # Tipo de seguro agora é uma feature categórica
 ]
 
-encoder = ColumnTransformer(
-    [("onehot", OneHotEncoder(drop=None, handle_unknown='ignore', sparse_output=False), categorical_features)],
-    remainder="passthrough"
-)
-
-X_train_encoded = encoder.fit_transform(X_train)
-X_test_encoded = encoder.transform(X_test)
-
-# --- SMOTE (Aplicar APENAS no Conjunto de TREINO) ---
-smote = SMOTE(random_state=42)
-X_train_resampled, y_train_resampled = smote.fit_resample(X_train_encoded, y_train)
-
-# --- Treina modelo final ---
-final_model = CatBoostClassifier(random_seed=42, verbose=0, eval_metric='F1')
-final_model.fit(X_train_resampled, y_train_resampled)
-
-# --- Avalia o Modelo no conjunto de teste com diferentes thresholds ---
-print("\n--- Avaliação do Modelo no Conjunto de Teste com Diferentes Thresholds ---")
 
-y_pred_proba = final_model.predict_proba(X_test_encoded)[:, 1]
-
-thresholds = [0.5, 0.4, 0.3, 0.2, 0.1, 0.05] # Você pode ajustar os thresholds aqui
-
-for threshold in thresholds:
-    print(f"\n--- Threshold: {threshold} ---")
-    y_pred_threshold = (y_pred_proba >= threshold).astype(int)
-
-    print("\n📊 Relatório de Classificação:")
+def carregar_dados():
+    """Lê a base de treino e calcula as features que não vêm prontas da query."""
+    df = carregar_query(query)
+
+    # duracao_dias calculada de forma vetorizada (mesmo módulo usado pelo dashboard),
+    # na mesma posição em que vinha da query para manter a ordem das colunas do modelo
+    df.insert(
+        df.columns.get_loc("valor_premio_sobre_renda"),
+        "duracao_dias",
+        duracao_dias(df["inicio"], df["fim"]),
+    )
+
+    # O mapeamento de satisfação foi removido, pois 'satisfacao_score' já vem numérico (1, 2, 3)
+    # A feature 'seguro_alto_risco' foi removida, e 'tipo_seguro' será usada diretamente
+    return df
+
+
+def dividir_treino_teste(df):
+    """X/y de treino e teste (estratificado) e o contrato de cada linha de teste."""
+    colunas_drop = [col for col in columns_to_drop_from_X if col in df.columns]
+    X = df.drop(columns=colunas_drop)
+    y = df["cancelado"]
+
+    # --- DIVIDE OS DATOS EM TREINO E TESTE PRIMEIRO! ---
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    # Contrato de cada linha de teste, para cruzar a avaliação com os contratos do dashboard
+    contrato_id_test = df.loc[X_test.index, "contrato_id"].to_numpy()
+    return X_train, X_test, y_train, y_test, contrato_id_test
+
+
+def _ajustar(modelo, X, y, preparar, validacao):
+    """fit do CatBoost; com ``validacao`` (X, y), para cedo quando a métrica no fold separado não melhora."""
+    if validacao is None:
+        modelo.fit(X, y)
+    else:
+        X_val, y_val = validacao
+        modelo.fit(X, y, eval_set=(preparar(X_val), y_val), early_stopping_rounds=ESPERA_EARLY_STOPPING)
+    return modelo
+
+
+def treinar_smote(X_train, y_train, parametros=None, validacao=None):
+    """One-hot (fit só no treino) + SMOTE no treino + CatBoost. Retorna (encoder, modelo, preparar)."""
+    encoder = ColumnTransformer(
+        [("onehot", OneHotEncoder(drop=None, handle_unknown='ignore', sparse_output=False), categorical_features)],
+        remainder="passthrough"
+    )
+    X_train_encoded = encoder.fit_transform(X_train)
+
+    # --- SMOTE (Aplicar APENAS no Conjunto de TREINO) ---
+    smote = SMOTE(random_state=42)
+    X_train_resampled, y_train_resampled = smote.fit_resample(X_train_encoded, y_train)
+
+    modelo = CatBoostClassifier(**{"random_seed": 42, "verbose": 0, "eval_metric": 'F1', **(parametros or {})})
+    _ajustar(modelo, X_train_resampled, y_train_resampled, encoder.transform, validacao)
+    return encoder, modelo, encoder.transform
+
+
+def treinar_nativo(X_train, y_train, parametros=None, validacao=None):
+    """CatBoost com cat_features e pesos de classe, sem encoder nem SMOTE. Retorna (None, modelo, preparar)."""
+    preparar = TransformacaoNativa(X_train.columns, categorical_features).transform
+    modelo = CatBoostClassifier(**{
+        "random_seed": 42,
+        "verbose": 0,
+        "eval_metric": 'F1',
+        "cat_features": categorical_features,
+        "auto_class_weights": 'Balanced',
+        **(parametros or {}),
+    })
+    _ajustar(modelo, preparar(X_train), y_train, preparar, validacao)
+    return None, modelo, preparar
+
+
+TREINOS = {"smote": treinar_smote, "nativo": treinar_nativo}
+
+
+def probabilidades_oof(modo, X_train, y_train, folds=FOLDS_THRESHOLD, parametros=None, semente=42):
+    """Probabilidade de cada linha do treino dada por um modelo que não a viu (k folds estratificados)."""
+    proba = np.zeros(len(X_train))
+    divisoes = StratifiedKFold(n_splits=folds, shuffle=True, random_state=semente).split(X_train, y_train)
+    for indices_treino, indices_validacao in divisoes:
+        _, modelo, preparar = TREINOS[modo](X_train.iloc[indices_treino], y_train.iloc[indices_treino], parametros)
+        proba[indices_validacao] = modelo.predict_proba(preparar(X_train.iloc[indices_validacao]))[:, 1]
+    return proba
+
+
+def avaliar(y_selecao, proba_selecao, y_test, y_pred_proba, criterio="f1", custo_fp=CUSTO_FP, custo_fn=CUSTO_FN,
+            origem="oof_treino"):
+    """
+    Escolhe o threshold na grade do conjunto de seleção (previsões fora do fold no treino)
+    e mostra o relatório do teste nesse threshold fixo. Retorna o relatório.
+    """
+    print("\n--- Escolha do threshold (previsões fora do fold no treino) ---")
+    tabela, escolhido, teste = escolher_e_medir(y_selecao, proba_selecao, y_test, y_pred_proba,
+                                                criterio, custo_fp, custo_fn)
+    imprimir_resumo(tabela, escolhido, criterio, teste)
+
+    y_pred_threshold = (y_pred_proba >= escolhido["threshold"]).astype(int)
+    print("\n📊 Relatório de Classificação (teste):")
     print(classification_report(y_test, y_pred_threshold))
-
     print("Confusion Matrix:")
     print(confusion_matrix(y_test, y_pred_threshold))
-    print("--------------------------------------------------")
-
-# --- Salva os objetos com joblib ---
-output_dir = "backend/models"
-os.makedirs(output_dir, exist_ok=True)
-
-joblib.dump({
-    "encoder": encoder,
-    "model": final_model,
-    "X_test_encoded": X_test_encoded,
-    "y_test": y_test
-}, os.path.join(output_dir, "modelo_completo.pkl"))
-
-print("\n✅ Modelo e objetos auxiliares salvos com sucesso em backend/models/modelo_completo.pkl")
\ No newline at end of file
+    return montar_relatorio(tabela, escolhido, criterio, custo_fp, custo_fn, teste=teste, origem=origem)
+
+
+def _pico_rss_mb():
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+
+def _medir_modo(modo, X_train, X_test, y_train, y_test):
+    """Roda num processo novo: o pico de RSS medido é só deste modo."""
+    rss_inicial = _pico_rss_mb()
+    inicio = time.perf_counter()
+    _, modelo, preparar = TREINOS[modo](X_train, y_train)
+    tempo = time.perf_counter() - inicio
+    y_pred_proba = modelo.predict_proba(preparar(X_test))[:, 1]
+    return {
+        "modo": modo,
+        "tempo_s": tempo,
+        "pico_rss_mb": _pico_rss_mb(),
+        "acrescimo_rss_mb": _pico_rss_mb() - rss_inicial,
+        "f1": f1_score(y_test, (y_pred_proba >= THRESHOLD_PADRAO).astype(int)),
+        "f1_melhor": varrer_thresholds(y_test, y_pred_proba)["f1"].max(),
+    }
+
+
+def comparar_modos(X_train, X_test, y_train, y_test, modos=MODOS):
+    """Treina cada modo num processo próprio (spawn) e retorna as medições lado a lado."""
+    resultados = []
+    for modo in modos:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            resultados.append(pool.submit(_medir_modo, modo, X_train, X_test, y_train, y_test).result())
+    return pd.DataFrame(resultados).set_index("modo")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modo", choices=MODOS, default="smote", help="Modo de treino do modelo salvo")
+    parser.add_argument("--comparar", action="store_true", help="Compara os modos (tempo, memória, F1) sem salvar")
+    parser.add_argument("--criterio", choices=CRITERIOS, default="f1", help="Como escolher o threshold de operação")
+    parser.add_argument("--custo-fp", type=float, default=CUSTO_FP, help="Custo de um falso positivo (critério custo)")
+    parser.add_argument("--custo-fn", type=float, default=CUSTO_FN, help="Custo de um falso negativo (critério custo)")
+    parser.add_argument("--folds-threshold", type=int, default=FOLDS_THRESHOLD,
+                        help="Folds das previsões fora do fold usadas para escolher o threshold")
+    args = parser.parse_args(argv)
+
+    df = carregar_dados()
+    X_train, X_test, y_train, y_test, contrato_id_test = dividir_treino_teste(df)
+
+    if args.comparar:
+        tabela = comparar_modos(X_train, X_test, y_train, y_test)
+        print(f"\n--- Comparação dos modos de treino ({len(X_train):,} linhas de treino) ---")
+        print(tabela.to_string(float_format=lambda v: f"{v:.3f}"))
+        print(f"(F1 com threshold {THRESHOLD_PADRAO}; f1_melhor na grade de thresholds 0.01 a 0.99)")
+        return
+
+    # --- Treina modelo final ---
+    encoder, final_model, preparar = TREINOS[args.modo](X_train, y_train)
+    X_test_preparado = preparar(X_test)
+
+    # --- Escolhe o threshold fora do fold no treino e avalia o modelo no teste com ele ---
+    proba_oof = probabilidades_oof(args.modo, X_train, y_train, args.folds_threshold)
+    y_pred_proba = final_model.predict_proba(X_test_preparado)[:, 1]
+    relatorio = avaliar(y_train, proba_oof, y_test, y_pred_proba, args.criterio, args.custo_fp, args.custo_fn,
+                        origem=f"oof_treino_{args.folds_threshold}_folds")
+
+    # --- Salva o artefato versionado (backend/models/artefatos/<versao>) ---
+    # Modelo em .cbm e encoder separados; os dados de teste vão num diretório à parte,
+    # que quem só pontua nunca lê
+    avaliacao = {
+        "y_test": y_test.to_numpy(),
+        "proba_test": y_pred_proba,
+        "contrato_id_test": contrato_id_test,
+        "y_selecao": y_train.to_numpy(),
+        "proba_selecao": proba_oof,
+    }
+    extras = {}
+    if encoder is not None:
+        avaliacao["X_test"] = X_test_preparado
+        # A inferência usa a transformação compilada só se ela reproduz o encoder nestes dados
+        extras["transformacao_compilada"] = verificar_paridade(encoder, X_test)
+        if not extras["transformacao_compilada"]:
+            print("⚠️ Transformação compilada difere do encoder no teste; a inferência vai usar o encoder.")
+    caminho_artefato = salvar_artefato(
+        encoder,
+        final_model,
+        colunas=list(X_train.columns),
+        threshold=relatorio["threshold"],
+        avaliacao=avaliacao,
+        cat_features=categorical_features if encoder is None else None,
+        relatorio=relatorio,
+        extras=extras,
+    )
+
+    print(f"\n✅ Modelo ({args.modo}, threshold {relatorio['threshold']:.2f}) salvo com sucesso em "
+          f"{caminho_artefato} (agora é a versão ATUAL)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Pré-processamento de inferência compilado a partir do encoder treinado.
+
+O ColumnTransformer (OneHotEncoder denso + passthrough) valida e copia os dados a
+cada chamada e devolve uma matriz ``object``. Aqui as categorias aprendidas no treino
+(``categories_``) viram tabelas de consulta aplicadas com códigos de posição (Index.get_indexer),
+escritos direto numa única matriz float64 pré-alocada, na mesma ordem de colunas do
+encoder. Categorias desconhecidas ficam com todas as colunas zeradas, como no
+``handle_unknown='ignore'``.
+
+Só configurações que o caminho compilado reproduz exatamente são aceitas (one-hot sem
+``drop`` e sem categorias infrequentes, e passthrough); para qualquer outra
+``compilar_transformacao`` devolve o próprio ``encoder.transform``. O treino ainda confere
+a paridade no conjunto de teste (``verificar_paridade``) e grava o resultado no manifesto;
+sem paridade, o artefato pontua com o encoder original.
+
+Modelos treinados no modo nativo (``train_model.py --modo nativo``) não têm encoder:
+recebem as categóricas direto, preparadas por ``TransformacaoNativa``.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+
+class TransformacaoNaoSuportada(ValueError):
+    """Encoder com alguma etapa que o caminho compilado não reproduz."""
+
+
+def _eh_passthrough(transformador):
+    if isinstance(transformador, str):
+        return transformador == "passthrough"
+    # A partir do sklearn 1.6 o passthrough treinado aparece como FunctionTransformer sem função
+    return isinstance(transformador, FunctionTransformer) and transformador.func is None
+
+
+class TransformacaoCompilada:
+    """Equivalente a ``encoder.transform(X)`` (saída em float64) para um ColumnTransformer treinado."""
+
+    def __init__(self, encoder):
+        if getattr(encoder, "sparse_output_", False):
+            raise TransformacaoNaoSuportada("Saída esparsa não é suportada.")
+        nomes = list(encoder.feature_names_in_)
+        self.blocos = []  # (tipo, colunas, categorias, posição inicial na saída)
+        posicao = 0
+        with warnings.catch_warnings():
+            # sklearn 1.6 avisa que as colunas do remainder vão deixar de ser índices; tratamos os dois formatos
+            warnings.simplefilter("ignore", FutureWarning)
+            etapas = [
+                (nome, transformador, [nomes[c] if isinstance(c, (int, np.integer)) else c for c in colunas])
+                for nome, transformador, colunas in encoder.transformers_
+            ]
+        for nome, transformador, colunas in etapas:
+            if isinstance(transformador, str) and transformador == "drop":
+                continue
+            if not colunas:
+                continue
+            if isinstance(transformador, OneHotEncoder):
+                if (transformador.drop_idx_ is not None or transformador.handle_unknown != "ignore"
+                        or transformador.min_frequency is not None or transformador.max_categories is not None):
+                    raise TransformacaoNaoSuportada(f"OneHotEncoder '{nome}' com drop/infrequentes/handle_unknown != 'ignore'.")
+                self.blocos.append(("onehot", colunas, transformador.categories_, posicao))
+                posicao += sum(len(categorias) for categorias in transformador.categories_)
+            elif _eh_passthrough(transformador):
+                self.blocos.append(("passthrough", colunas, None, posicao))
+                posicao += len(colunas)
+            else:
+                raise TransformacaoNaoSuportada(f"Etapa '{nome}' ({type(transformador).__name__}) não suportada.")
+        self.n_saida = posicao
+
+    def transform(self, X):
+        n = len(X)
+        saida = np.zeros((n, self.n_saida), dtype=np.float64)
+        linhas = np.arange(n)
+        for tipo, colunas, categorias, inicio in self.blocos:
+            if tipo == "passthrough":
+                saida[:, inicio:inicio + len(colunas)] = X[colunas].to_numpy(dtype=np.float64, na_value=np.nan)
+                continue
+            deslocamento = inicio
+            for coluna, cats in zip(colunas, categorias):
+                codigos = self._codigos(X[coluna], cats)
+                validos = codigos >= 0
+                saida[linhas[validos], deslocamento + codigos[validos]] = 1.0
+                deslocamento += len(cats)
+        return saida
+
+    @staticmethod
+    def _codigos(valores, cats):
+        """Índice de cada valor em ``cats`` (-1 se desconhecido), tratando NaN como categoria se ela existir."""
+        nulos_sao_categoria = len(cats) and pd.isna(cats[-1])
+        conhecidas = cats[:-1] if nulos_sao_categoria else cats
+        # get_indexer dá -1 para valores fora das categorias (pd.Categorical passaria a rejeitá-los)
+        codigos = pd.Index(conhecidas).get_indexer(valores).astype(np.intp)
+        if nulos_sao_categoria:
+            codigos[pd.isna(valores).to_numpy()] = len(cats) - 1
+        return codigos
+
+
+class TransformacaoNativa:
+    """
+    Entrada do modo de treino nativo (CatBoost com cat_features, sem encoder): as colunas
+    na ordem do treino, com as categóricas como texto (o CatBoost não aceita NaN nelas).
+    Usada igual no treino e na inferência, para as duas verem os mesmos valores.
+    """
+
+    def __init__(self, colunas, cat_features):
+        self.colunas = list(colunas)
+        self.cat_features = list(cat_features)
+
+    def transform(self, X):
+        X = X[self.colunas].copy()
+        for coluna in self.cat_features:
+            X[coluna] = X[coluna].astype(object).where(X[coluna].notna(), "").astype(str)
+        return X
+
+
+def compilar_transformacao(encoder):
+    """Função de transformação para a inferência: a compilada se o encoder for suportado."""
+    try:
+        return TransformacaoCompilada(encoder).transform
+    except TransformacaoNaoSuportada:
+        return encoder.transform
+
+
+def verificar_paridade(encoder, X):
+    """
+    True se a transformação compilada produz exatamente a matriz do encoder para ``X``
+    (False também se o encoder não for suportado pelo caminho compilado).
+    """
+    try:
+        compilada = TransformacaoCompilada(encoder)
+    except TransformacaoNaoSuportada:
+        return False
+    esperado = np.asarray(encoder.transform(X), dtype=np.float64)
+    obtido = compilada.transform(X)
+    return esperado.shape == obtido.shape and np.array_equal(esperado, obtido, equal_nan=True)
@@ -0,0 +1,222 @@
+"""
+Banco local embutido (DuckDB) para rodar o dashboard e os scripts sem Postgres.
+
+Com ``DB_BACKEND=duckdb`` o ``get_engine`` aponta para um arquivo DuckDB
+(``LOCAL_DB_PATH``, padrão ``backend/data/cache/seguros_local.duckdb``) em vez do
+Postgres. Na primeira engine do processo as tabelas clientes, contratos e cancelamentos
+são carregadas dos arquivos ``P18_*`` (Parquet, se existir, ou CSV) de ``LOCAL_DATA_DIR``
+(padrão ``backend/data/raw``) e as views que as páginas e os modelos consultam são
+recriadas por cima delas. A carga é a do ingestao.py (mesmas tabelas com chave primária
+e índices, mesma marca d'água por arquivo): só o que mudou nos arquivos é carregado, e
+rodar o ingestao.py contra o banco local não conflita com esta preparação.
+
+Os ids seguem o formato inteiro do banco: cliente_id vem do código do cliente
+(C00042 -> 42) e contrato_id é derivado do md5 do id do contrato, então não muda entre
+cargas. ``faturamento_mensal`` é uma view calculada na hora, não a tabela resumo
+incremental do Postgres.
+
+Requer os pacotes ``duckdb`` e ``duckdb_engine`` (dialeto do SQLAlchemy), usados só
+com esse backend. O DuckDB só permite um processo escrevendo no arquivo: rodar o aply_mode.py com o
+dashboard aberto no mesmo arquivo falha com erro de lock.
+
+Uso (a partir da raiz do projeto):
+
+    DB_BACKEND=duckdb streamlit run frontend/pages/app.py
+    python -m backend.data.processed.backend_local            # (re)cria o banco local e mostra as contagens
+"""
+import os
+import argparse
+
+from sqlalchemy import create_engine, text
+
+DIRETORIO_DADOS = os.getenv(
+    "LOCAL_DATA_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "raw")),
+)
+CAMINHO_BANCO = os.getenv(
+    "LOCAL_DB_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cache", "seguros_local.duckdb")),
+)
+
+# Tabelas carregadas pelo ingestao.py (ESQUEMAS) sobre as quais as views são criadas
+TABELAS = ("clientes", "contratos", "cancelamentos")
+
+# --- Views (mesmas colunas das views do Postgres que o código consulta) ---
+VIEWS = {
+    "v_contratos_detalhados": """
+        SELECT
+            CAST('0x' || md5(ct.id_contrato)[1:15] AS BIGINT) AS contrato_id,
+            ct.id_contrato AS contrato_codigo,
+            CAST(substr(ct.id_cliente, 2) AS INTEGER) AS cliente_id,
+            ct.tipo_seguro AS tipo_seguro_nome,
+            CASE
+                WHEN ca.id_contrato IS NOT NULL THEN 'Cancelado'
+                WHEN ct.data_fim IS NULL OR ct.data_fim >= CURRENT_DATE THEN 'Ativo'
+                ELSE 'Encerrado'
+            END AS status_contrato,
+            ct.data_inicio,
+            ct.data_fim,
+            ct.valor_premio_mensal AS premio_mensal,
+            ct.satisfacao_ultima_avaliacao AS nivel_satisfacao,
+            CASE ct.satisfacao_ultima_avaliacao WHEN 'Baixa' THEN 1 WHEN 'Média' THEN 2 WHEN 'Alta' THEN 3 END
+                AS nivel_satisfacao_num,
+            ct.canal_venda AS canal_venda_nome,
+            ct.renovado_automaticamente AS renovacao_automatica,
+            ca.data_cancelamento,
+            cl.nome AS cliente_nome,
+            left(cl.genero, 1) AS cliente_genero,
+            cl.data_nascimento AS cliente_data_nascimento,
+            cl.renda_mensal AS cliente_renda_mensal,
+            cl.nivel_educacional AS cliente_nivel_educacional
+        FROM contratos ct
+        LEFT JOIN clientes cl ON cl.id_cliente = ct.id_cliente
+        LEFT JOIN cancelamentos ca ON ca.id_contrato = ct.id_contrato
+    """,
+    "v_perfil_cliente_enriquecido": """
+        WITH contratos_cliente AS (
+            SELECT
+                cliente_id,
+                COUNT(*) AS total_contratos,
+                COUNT(*) FILTER (WHERE status_contrato = 'Ativo') AS contratos_ativos,
+                COUNT(*) FILTER (WHERE status_contrato = 'Cancelado') AS contratos_cancelados
+            FROM v_contratos_detalhados
+            GROUP BY cliente_id
+        )
+        SELECT
+            CAST(substr(cl.id_cliente, 2) AS INTEGER) AS cliente_id,
+            cl.nome,
+            left(cl.genero, 1) AS genero,
+            cl.data_nascimento,
+            DATE_PART('year', CURRENT_DATE) - DATE_PART('year', cl.data_nascimento) AS idade_atual,
+            cl.nivel_educacional,
+            cl.qtd_dependentes AS qtd_dependente,
+            cl.renda_mensal,
+            cl.profissao,
+            cl.cidade_residencia,
+            cl.estado_residencia,
+            cl.data_cadastro,
+            COALESCE(cc.total_contratos, 0) AS total_contratos,
+            COALESCE(cc.contratos_ativos, 0) AS contratos_ativos,
+            COALESCE(cc.contratos_cancelados, 0) AS contratos_cancelados,
+            -- Em risco: ainda tem contrato ativo, mas já cancelou algum
+            CASE
+                WHEN cc.contratos_ativos > 0 AND cc.contratos_cancelados > 0 THEN 'Em risco'
+                WHEN cc.contratos_ativos > 0 THEN 'Ativo'
+                ELSE 'Inativo'
+            END AS status_cliente
+        FROM clientes cl
+        LEFT JOIN contratos_cliente cc ON cc.cliente_id = CAST(substr(cl.id_cliente, 2) AS INTEGER)
+    """,
+    "v_analise_churn": """
+        SELECT
+            c.contrato_id,
+            c.cliente_id,
+            c.tipo_seguro_nome,
+            c.canal_venda_nome,
+            c.premio_mensal,
+            c.data_inicio,
+            c.data_fim,
+            ca.data_cancelamento,
+            ca.motivo_cancelamento AS motivo_cancelamento_nome,
+            ca.canal_cancelamento AS canal_cancelamento_nome,
+            ca.avaliacao_experiencia_cancelamento AS avaliacao_experiencia
+        FROM cancelamentos ca
+        JOIN v_contratos_detalhados c ON c.contrato_codigo = ca.id_contrato
+    """,
+    # Contratos ativos com as features do modelo (mesmas contas da query de treino)
+    "v_clientes_para_predicao_final": """
+        SELECT
+            c.cliente_id,
+            c.cliente_genero AS genero,
+            c.cliente_data_nascimento AS data_nascimento,
+            DATE_PART('year', CURRENT_DATE) - DATE_PART('year', c.cliente_data_nascimento) AS idade,
+            c.cliente_renda_mensal AS renda_mensal,
+            c.cliente_nivel_educacional AS nivel_educacional,
+            p.qtd_dependente,
+            c.tipo_seguro_nome AS tipo_seguro,
+            c.premio_mensal AS valor_premio_mensal,
+            c.nivel_satisfacao_num AS satisfacao_score,
+            c.canal_venda_nome AS canal_venda,
+            CAST(c.renovacao_automatica AS INTEGER) AS renovado_automaticamente,
+            c.data_inicio AS inicio,
+            c.data_fim AS fim,
+            c.data_fim - c.data_inicio AS duracao_dias,
+            c.contrato_id AS id_contrato_legado,
+            c.cliente_id AS id_cliente_legado,
+            c.premio_mensal / NULLIF(c.cliente_renda_mensal, 0) AS valor_premio_sobre_renda,
+            (DATE_PART('year', CURRENT_DATE) - DATE_PART('year', c.cliente_data_nascimento)) * c.cliente_renda_mensal
+                AS interacao_idade_renda
+        FROM v_contratos_detalhados c
+        JOIN v_perfil_cliente_enriquecido p ON p.cliente_id = c.cliente_id
+        WHERE c.status_contrato = 'Ativo'
+    """,
+    # No Postgres é a tabela resumo de faturamento_mensal.py; aqui o DuckDB agrega na hora
+    "faturamento_mensal": """
+        SELECT
+            mes_vigencia,
+            tipo_seguro_nome,
+            status_contrato,
+            SUM(premio_mensal) AS faturamento,
+            COUNT(*) AS qtd_contratos
+        FROM (
+            SELECT
+                tipo_seguro_nome,
+                status_contrato,
+                premio_mensal,
+                CAST(unnest(generate_series(
+                    DATE_TRUNC('month', data_inicio), DATE_TRUNC('month', data_fim), INTERVAL 1 MONTH
+                )) AS DATE) AS mes_vigencia
+            FROM v_contratos_detalhados
+            WHERE data_inicio IS NOT NULL AND data_fim IS NOT NULL
+        ) meses
+        GROUP BY mes_vigencia, tipo_seguro_nome, status_contrato
+    """,
+}
+
+
+def montar_dsn_local(caminho=CAMINHO_BANCO):
+    return f"duckdb:///{caminho}"
+
+
+def eh_dsn_local(dsn):
+    return dsn.startswith("duckdb:")
+
+
+def preparar_banco_local(engine, diretorio_dados=None, forcar=False):
+    """
+    Atualiza o banco DuckDB da ``engine``: carrega pelo ingestao.py o que mudou nos
+    arquivos de origem e recria as views. Retorna a lista de tabelas (re)carregadas.
+    """
+    # Import local: o ingestao.py usa o data_acess.py, que importa este módulo
+    from .ingestao import ingerir
+
+    os.makedirs(os.path.dirname(os.path.abspath(engine.url.database)), exist_ok=True)
+    resultado = ingerir(diretorio_dados or DIRETORIO_DADOS, completo=forcar, engine=engine)
+    with engine.begin() as conn:
+        # Sempre recriadas: baratas, e acompanham mudanças nas definições acima
+        for nome, sql in VIEWS.items():
+            conn.execute(text(f"CREATE OR REPLACE VIEW {nome} AS {sql}"))
+    return [tabela for tabela, (acao, _) in resultado.items() if acao != "nada"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", default=CAMINHO_BANCO, help="Arquivo DuckDB")
+    parser.add_argument("--dados", default=DIRETORIO_DADOS, help="Diretório com os arquivos P18_*")
+    parser.add_argument("--forcar", action="store_true", help="Recarrega todas as tabelas")
+    args = parser.parse_args()
+
+    engine = create_engine(montar_dsn_local(args.banco))
+    try:
+        recarregadas = preparar_banco_local(engine, args.dados, forcar=args.forcar)
+        print(f"✅ Banco local em {args.banco} (recarregadas: {', '.join(recarregadas) or 'nenhuma'})")
+        with engine.connect() as conn:
+            for nome in TABELAS + tuple(VIEWS):
+                total = conn.execute(text(f"SELECT COUNT(*) FROM {nome}")).scalar()
+                print(f"  {nome:32s} {total:>10,}")
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
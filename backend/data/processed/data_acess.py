@@ -1,19 +1,182 @@
-import sys
+import io
 import os
+import time
+import atexit
+import functools
+import threading
 
-# Caminho da raiz do projeto (duas pastas acima de frontend/pages)
-    
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
+from .backend_local import eh_dsn_local, montar_dsn_local, preparar_banco_local
+
 load_dotenv()
 
-def get_engine():
+# --- Registro de engines do processo ---
+# Uma engine (e portanto um pool de conexões) por DSN, compartilhada por todas as
+# páginas do Streamlit e por todas as sessões de usuário do mesmo processo.
+_engines = {}
+_engines_lock = threading.Lock()
+
+# --- Métricas do pool ---
+_metricas = {
+    "checkouts": 0,
+    "checkins": 0,
+    "conexoes_criadas": 0,
+    "espera_total_s": 0.0,
+    "espera_max_s": 0.0,
+}
+_metricas_lock = threading.Lock()
+
+
+def _medir_pool(engine):
+    """
+    Registra as métricas do pool da engine pelos eventos públicos do SQLAlchemy (connect,
+    checkout, checkin) e mede a espera por uma conexão livre em volta de raw_connection(),
+    por onde passam engine.connect() e engine.begin(). O pool continua o QueuePool padrão;
+    os eventos ficam na engine, então valem também para o pool recriado por dispose().
+    """
+    def ao_criar(conexao_dbapi, registro):
+        with _metricas_lock:
+            _metricas["conexoes_criadas"] += 1
+
+    def ao_retirar(conexao_dbapi, registro, proxy):
+        with _metricas_lock:
+            _metricas["checkouts"] += 1
+
+    def ao_devolver(conexao_dbapi, registro):
+        with _metricas_lock:
+            _metricas["checkins"] += 1
+
+    event.listen(engine, "connect", ao_criar)
+    event.listen(engine, "checkout", ao_retirar)
+    event.listen(engine, "checkin", ao_devolver)
+
+    obter_conexao = engine.raw_connection
+
+    @functools.wraps(obter_conexao)
+    def raw_connection_medido():
+        inicio = time.perf_counter()
+        try:
+            return obter_conexao()
+        finally:
+            espera = time.perf_counter() - inicio
+            with _metricas_lock:
+                _metricas["espera_total_s"] += espera
+                _metricas["espera_max_s"] = max(_metricas["espera_max_s"], espera)
+
+    engine.raw_connection = raw_connection_medido
+
+
+def montar_dsn():
+    """
+    Monta o DSN a partir das variáveis de ambiente: o do Postgres ou, com
+    ``DB_BACKEND=duckdb``, o do banco local embutido (ver backend_local.py).
+    """
+    if os.getenv("DB_BACKEND", "postgres") == "duckdb":
+        return montar_dsn_local()
     user = os.getenv("DB_USER")
     password = os.getenv("DB_PASS")
     host = os.getenv("DB_HOST")
     port = os.getenv("DB_PORT", 5432)
     db = os.getenv("DB_NAME")
+    # DB_DRIVER=postgresql+psycopg usa o psycopg 3, que faz prepared statements no servidor
+    driver = os.getenv("DB_DRIVER", "postgresql")
+    return f"{driver}://{user}:{password}@{host}:{port}/{db}"
+
+
+def _opcoes_pool(dsn):
+    """Parâmetros do pool configuráveis por variável de ambiente."""
+    opcoes = {
+        "poolclass": QueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+    }
+    if dsn.startswith("postgresql+psycopg:"):
+        # Número de execuções da mesma SQL (na mesma conexão) até o psycopg preparar o plano no servidor
+        opcoes["connect_args"] = {"prepare_threshold": int(os.getenv("DB_PREPARE_THRESHOLD", 2))}
+    return opcoes
+
+
+def get_engine(dsn=None):
+    """
+    Retorna a engine compartilhada para o DSN informado (ou o DSN do .env).
+    A engine é criada apenas na primeira chamada; as seguintes reutilizam o mesmo pool.
+    """
+    dsn = dsn or montar_dsn()
+    engine = _engines.get(dsn)
+    if engine is not None:
+        return engine
+
+    with _engines_lock:
+        # Outra thread pode ter criado a engine enquanto esperávamos o lock
+        engine = _engines.get(dsn)
+        if engine is None:
+            engine = create_engine(dsn, **_opcoes_pool(dsn))
+            _medir_pool(engine)
+            if eh_dsn_local(dsn):
+                # Carrega os arquivos de origem (se mudaram) e recria as views antes do primeiro uso
+                preparar_banco_local(engine)
+            _engines[dsn] = engine
+    return engine
+
+
+def copiar_dataframe(conn, tabela, df):
+    """Carga em massa: COPY no Postgres, leitura direta do DataFrame no DuckDB, executemany nos demais."""
+    if df.empty:
+        return
+    colunas = ", ".join(df.columns)
+    if conn.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        sql_copy = f"COPY {tabela} ({colunas}) FROM STDIN WITH (FORMAT csv)"
+        cursor = conn.connection.cursor()
+        try:
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(sql_copy, buffer)
+            else:  # psycopg 3
+                with cursor.copy(sql_copy) as copy:
+                    copy.write(buffer.getvalue())
+        finally:
+            cursor.close()
+    elif conn.dialect.name == "duckdb":
+        # O DuckDB lê o DataFrame registrado, na mesma transação da conexão, sem um INSERT por linha
+        nativa = conn.connection.driver_connection
+        nativa.register("_copiar_dataframe", df)
+        try:
+            nativa.execute(f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM _copiar_dataframe")
+        finally:
+            nativa.unregister("_copiar_dataframe")
+    else:
+        marcadores = ", ".join(f":{col}" for col in df.columns)
+        registros = df.astype(object).where(df.notna(), None).to_dict("records")
+        conn.execute(text(f"INSERT INTO {tabela} ({colunas}) VALUES ({marcadores})"), registros)
+
+
+def get_pool_metrics():
+    """Retorna um retrato das métricas de uso do pool e do estado de cada engine."""
+    with _metricas_lock:
+        metricas = dict(_metricas)
+    checkouts = metricas["checkouts"]
+    metricas["espera_media_s"] = metricas["espera_total_s"] / checkouts if checkouts else 0.0
+    metricas["engines"] = {
+        engine.url.render_as_string(hide_password=True): engine.pool.status()
+        for engine in list(_engines.values())
+    }
+    return metricas
+
+
+def dispose_engines():
+    """Fecha todas as conexões abertas e esvazia o registro de engines."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
 
-    conn_str = f"postgresql://{user}:{password}@{host}:{port}/{db}"
-    return create_engine(f"postgresql://{user}:{password}@{host}:{port}/{db}")
+atexit.register(dispose_engines)
@@ -0,0 +1,105 @@
+import threading
+
+import streamlit as st
+import pandas as pd
+from sqlalchemy import text
+from .data_acess import get_engine
+from .snapshot_cache import carregar_com_snapshot
+
+# Tempo (s) até um dataset ser buscado de novo no banco. Todas as páginas usam o mesmo ciclo.
+TTL_DATASETS = 3600
+
+# --- Datasets compartilhados entre as páginas ---
+# Para cada view: as colunas que alguma página usa e o tipo em memória de cada uma.
+# "category" para textos repetidos, "datetime" para datas (sem fuso), "numero" para numéricos.
+DATASETS = {
+    "v_contratos_detalhados": {
+        "contrato_id": None,
+        "cliente_id": None,
+        "tipo_seguro_nome": "category",
+        "status_contrato": "category",
+        "data_inicio": "datetime",
+        "data_fim": "datetime",
+        "premio_mensal": "numero",
+    },
+    "v_perfil_cliente_enriquecido": {
+        "cliente_id": None,
+        "nome": None,
+        "genero": "category",
+        "idade_atual": "numero",
+        "nivel_educacional": "category",
+        "qtd_dependente": "numero",
+        "total_contratos": "numero",
+        "renda_mensal": "numero",
+        "status_cliente": "category",
+    },
+}
+
+# Estruturas derivadas de cada dataset (índices de busca): (view, nome do índice) -> (dataset base, índice)
+_indices = {}
+_indices_lock = threading.Lock()
+
+
+def _aplicar_tipos(df, tipos):
+    for coluna, tipo in tipos.items():
+        if coluna not in df.columns or tipo is None:
+            continue
+        if tipo == "category":
+            df[coluna] = df[coluna].astype("category")
+        elif tipo == "datetime":
+            datas = pd.to_datetime(df[coluna])
+            df[coluna] = datas.dt.tz_localize(None) if datas.dt.tz is not None else datas
+        elif tipo == "numero":
+            df[coluna] = pd.to_numeric(df[coluna])
+    return df
+
+
+@st.cache_resource(ttl=TTL_DATASETS)
+def _carregar_dataset(nome_view):
+    tipos = DATASETS[nome_view]
+    engine = get_engine()
+
+    def buscar():
+        with engine.connect() as conn:
+            # Projeta só as colunas conhecidas que a view realmente tem (algumas são opcionais nas páginas).
+            # LIMIT 0 em vez de inspect().get_columns: a reflexão do catálogo não funciona em todo banco (DuckDB)
+            existentes = set(conn.execute(text(f"SELECT * FROM {nome_view} LIMIT 0")).keys())
+            colunas = [col for col in tipos if col in existentes]
+            df = pd.read_sql_query(text(f"SELECT {', '.join(colunas)} FROM {nome_view}"), con=conn)
+        return _aplicar_tipos(df, tipos)
+
+    return carregar_com_snapshot(f"dataset_{nome_view}", buscar, engine)
+
+
+def carregar_dataset(nome_view):
+    """
+    Retorna o dataset da view, buscado uma única vez por ciclo de TTL e compartilhado
+    por todas as páginas e sessões.
+
+    Cada chamada recebe uma cópia rasa: adicionar ou substituir colunas não afeta as
+    outras páginas, mas os dados em si são os mesmos, então não altere valores in-place
+    (``df.loc[...] = ...``) no DataFrame recebido.
+    """
+    if nome_view not in DATASETS:
+        raise KeyError(f"Dataset '{nome_view}' não configurado em DATASETS.")
+    return _carregar_dataset(nome_view).copy(deep=False)
+
+
+def indice_dataset(nome_view, nome_indice, construir):
+    """
+    (dataset, estrutura derivada) da view. A estrutura (ex.: índice de busca) é construída
+    com ``construir(df)`` uma vez por ciclo de cache, compartilhada entre sessões e refeita
+    quando o dataset é buscado de novo.
+
+    O DataFrame devolvido (cópia rasa, como em carregar_dataset) é o mesmo sobre o qual a
+    estrutura foi montada: use-o com as posições de linha do índice, em vez de uma chamada
+    separada a carregar_dataset, que pode pegar um dataset mais novo se o TTL vencer no meio.
+    """
+    base = _carregar_dataset(nome_view)
+    chave = (nome_view, nome_indice)
+    with _indices_lock:
+        guardado = _indices.get(chave)
+        if guardado is None or guardado[0] is not base:
+            guardado = (base, construir(base))
+            _indices[chave] = guardado
+    return guardado[0].copy(deep=False), guardado[1]
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+
+def _como_datetime64(valores):
+    """Converte datas (Series, lista, array, date/str) em um array datetime64[ns] sem fuso."""
+    datas = pd.to_datetime(valores if isinstance(valores, pd.Series) else pd.Series(valores))
+    if datas.dt.tz is not None:
+        datas = datas.dt.tz_localize(None)
+    return datas.to_numpy(dtype="datetime64[ns]")
+
+
+def diferenca_meses(inicio, fim):
+    """
+    Meses de calendário completos entre ``inicio`` e ``fim``, vetorizado.
+
+    Dá o mesmo resultado que ``relativedelta(fim, inicio).years * 12 + .months``: o dia
+    de início é levado para o mês de fim (limitado ao último dia do mês, ex.: 31/01 -> 28/02)
+    e, se o fim ainda não chegou nesse dia, o último mês não conta.
+    Retorna um array float64, com NaN onde alguma das datas é nula.
+    """
+    ini = _como_datetime64(inicio)
+    fim = _como_datetime64(fim)
+    validos = ~(np.isnat(ini) | np.isnat(fim))
+
+    ini_mes = ini.astype("datetime64[M]")
+    fim_mes = fim.astype("datetime64[M]")
+    meses = (fim_mes - ini_mes).astype(np.int64)
+
+    # Dia e hora do início, transportados para o mês do fim
+    ini_dia = ini.astype("datetime64[D]")
+    dia_no_mes = (ini_dia - ini_mes.astype("datetime64[D]")).astype(np.int64)
+    hora_do_dia = ini - ini_dia.astype("datetime64[ns]")
+    dias_mes_fim = ((fim_mes + 1).astype("datetime64[D]") - fim_mes.astype("datetime64[D]")).astype(np.int64)
+    dia_transportado = np.minimum(dia_no_mes, dias_mes_fim - 1)
+    alvo = (fim_mes.astype("datetime64[D]") + dia_transportado.astype("timedelta64[D]")).astype("datetime64[ns]") + hora_do_dia
+
+    # Igual ao relativedelta: passou do alvo em direção oposta -> o último mês está incompleto
+    crescente = fim >= ini
+    meses = meses - (crescente & (fim < alvo)) + (~crescente & (fim > alvo))
+
+    return np.where(validos, meses, np.nan).astype(np.float64)
+
+
+def duracao_dias(inicio, fim):
+    """Dias entre ``inicio`` e ``fim`` (como ``data_fim - data_inicio`` no Postgres), NaN se nulo."""
+    ini = _como_datetime64(inicio).astype("datetime64[D]")
+    fim = _como_datetime64(fim).astype("datetime64[D]")
+    validos = ~(np.isnat(ini) | np.isnat(fim))
+    dias = (fim - ini).astype(np.int64)
+    return np.where(validos, dias, np.nan).astype(np.float64)
+
+
+def histograma_meses(meses, nbins=10):
+    """
+    Pré-agrupa durações em meses em até ``nbins`` faixas inteiras de mesma largura.
+
+    Retorna um DataFrame com ``inicio`` e ``fim`` de cada faixa (inclusivos), o ``centro``
+    e a ``largura`` para desenhar as barras, e a contagem de ``contratos``.
+    """
+    valores = np.asarray(meses, dtype=np.float64)
+    valores = valores[~np.isnan(valores)]
+    colunas = ["inicio", "fim", "centro", "largura", "contratos"]
+    if valores.size == 0:
+        return pd.DataFrame(columns=colunas)
+
+    menor, maior = int(valores.min()), int(valores.max())
+    largura = max(1, int(np.ceil((maior - menor + 1) / nbins)))
+    n_faixas = int(np.ceil((maior - menor + 1) / largura))
+    bordas = menor + largura * np.arange(n_faixas + 1)
+
+    contagens, _ = np.histogram(valores, bins=bordas)
+    inicio = bordas[:-1]
+    return pd.DataFrame({
+        "inicio": inicio,
+        "fim": inicio + largura - 1,
+        "centro": inicio + (largura - 1) / 2,
+        "largura": largura,
+        "contratos": contagens,
+    }, columns=colunas)
@@ -0,0 +1,224 @@
+"""
+Tabela resumo de faturamento mensal por tipo de seguro e status de contrato.
+
+Substitui o generate_series x contratos que o dashboard rodava a cada expiração de cache.
+A atualização incremental compara os contratos atuais com um retrato da última carga e
+recalcula apenas os meses cobertos por contratos novos, alterados ou removidos.
+Roda no Postgres e no DuckDB; no banco local (backend_local.py) faturamento_mensal é uma
+view e não há o que atualizar.
+
+Uso (a partir da raiz do projeto):
+
+    python -m backend.data.processed.faturamento_mensal              # incremental
+    python -m backend.data.processed.faturamento_mensal --completo   # recria tudo
+"""
+import argparse
+import threading
+import time
+
+from sqlalchemy import inspect, text
+
+from .data_acess import get_engine
+
+# --- Leitura usada pelo dashboard (home.py) ---
+QUERY_FATURAMENTO_MENSAL = """
+SELECT
+    mes_vigencia AS "Data",
+    SUM(faturamento) AS "Faturamento"
+FROM faturamento_mensal
+WHERE status_contrato IN ('Ativo', 'Encerrado')
+GROUP BY mes_vigencia
+ORDER BY mes_vigencia;
+"""
+
+# Mesmo resultado calculado direto dos contratos (Postgres), enquanto a tabela resumo ainda não foi criada
+QUERY_FATURAMENTO_MENSAL_DIRETO = """
+SELECT
+    mes_vigencia AS "Data",
+    SUM(premio_mensal) AS "Faturamento"
+FROM (
+    SELECT
+        premio_mensal,
+        generate_series(
+            DATE_TRUNC('month', data_inicio), DATE_TRUNC('month', data_fim), INTERVAL '1 month'
+        )::date AS mes_vigencia
+    FROM v_contratos_detalhados
+    WHERE status_contrato IN ('Ativo', 'Encerrado')
+      AND data_inicio IS NOT NULL AND data_fim IS NOT NULL
+) meses
+GROUP BY mes_vigencia
+ORDER BY mes_vigencia;
+"""
+
+# --- Estrutura ---
+DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS faturamento_mensal (
+        mes_vigencia DATE NOT NULL,
+        tipo_seguro_nome TEXT,
+        status_contrato TEXT,
+        faturamento NUMERIC(16, 2) NOT NULL,
+        qtd_contratos INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_faturamento_mensal
+        ON faturamento_mensal (mes_vigencia, tipo_seguro_nome, status_contrato)
+    """,
+    # Retrato dos contratos na última atualização: é contra ele que as mudanças são detectadas
+    """
+    CREATE TABLE IF NOT EXISTS faturamento_mensal_contratos AS
+    SELECT
+        contrato_id,
+        tipo_seguro_nome,
+        status_contrato,
+        premio_mensal,
+        DATE_TRUNC('month', data_inicio)::date AS mes_inicio,
+        DATE_TRUNC('month', data_fim)::date AS mes_fim
+    FROM v_contratos_detalhados
+    WITH NO DATA
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_faturamento_mensal_contratos
+        ON faturamento_mensal_contratos (contrato_id)
+    """,
+]
+
+LIMPAR_TUDO = [
+    "TRUNCATE faturamento_mensal",
+    "TRUNCATE faturamento_mensal_contratos",
+]
+
+# Meses de mes_inicio a mes_fim, uma linha por mês: no DuckDB o generate_series devolve uma lista
+SERIE_MESES = {
+    "postgresql": "generate_series(mes_inicio, mes_fim, INTERVAL '1 month')",
+    "duckdb": "unnest(generate_series(mes_inicio, mes_fim, INTERVAL '1 month'))",
+}
+
+# Ausência da tabela fica guardada por pouco tempo: a primeira atualização pode rodar em outro processo
+REVERIFICAR_AUSENTE_S = 300
+_existe = {}
+_existe_lock = threading.Lock()
+
+# --- Atualização incremental (tudo na mesma transação) ---
+ATUALIZACAO = [
+    # 1. Estado atual dos contratos, lido uma única vez da view
+    """
+    CREATE TEMP TABLE _fm_atual ON COMMIT DROP AS
+    SELECT
+        contrato_id,
+        tipo_seguro_nome,
+        status_contrato,
+        premio_mensal,
+        DATE_TRUNC('month', data_inicio)::date AS mes_inicio,
+        DATE_TRUNC('month', data_fim)::date AS mes_fim
+    FROM v_contratos_detalhados
+    """,
+    # 2. Versões novas e antigas de tudo que mudou desde a última carga
+    """
+    CREATE TEMP TABLE _fm_alterados ON COMMIT DROP AS
+    (SELECT * FROM _fm_atual EXCEPT SELECT * FROM faturamento_mensal_contratos)
+    UNION ALL
+    (SELECT * FROM faturamento_mensal_contratos EXCEPT SELECT * FROM _fm_atual)
+    """,
+    # 3. Meses afetados por essas mudanças
+    """
+    CREATE TEMP TABLE _fm_meses ON COMMIT DROP AS
+    SELECT DISTINCT {serie_meses}::date AS mes_vigencia
+    FROM _fm_alterados
+    WHERE mes_inicio IS NOT NULL AND mes_fim IS NOT NULL
+    """,
+    # 4. Recalcula só esses meses
+    """
+    DELETE FROM faturamento_mensal
+    WHERE mes_vigencia IN (SELECT mes_vigencia FROM _fm_meses)
+    """,
+    """
+    INSERT INTO faturamento_mensal (mes_vigencia, tipo_seguro_nome, status_contrato, faturamento, qtd_contratos)
+    SELECT
+        m.mes_vigencia,
+        a.tipo_seguro_nome,
+        a.status_contrato,
+        COALESCE(SUM(a.premio_mensal), 0),
+        COUNT(*)
+    FROM _fm_atual a
+    JOIN _fm_meses m ON m.mes_vigencia BETWEEN a.mes_inicio AND a.mes_fim
+    GROUP BY m.mes_vigencia, a.tipo_seguro_nome, a.status_contrato
+    """,
+    # 5. Atualiza o retrato apenas dos contratos alterados
+    """
+    DELETE FROM faturamento_mensal_contratos
+    WHERE contrato_id IN (SELECT contrato_id FROM _fm_alterados)
+    """,
+    """
+    INSERT INTO faturamento_mensal_contratos
+    SELECT * FROM _fm_atual
+    WHERE contrato_id IN (SELECT contrato_id FROM _fm_alterados)
+    """,
+]
+
+# O DuckDB ignora o ON COMMIT DROP: as temporárias são removidas explicitamente no fim
+REMOVER_TEMPORARIAS = [
+    "DROP TABLE IF EXISTS _fm_atual",
+    "DROP TABLE IF EXISTS _fm_alterados",
+    "DROP TABLE IF EXISTS _fm_meses",
+]
+
+
+def existe_faturamento_mensal(engine=None):
+    """
+    Se a tabela resumo já foi criada (no banco local é sempre uma view). Memorizado por
+    engine: a reflexão não roda a cada render; a ausência é reverificada depois de
+    REVERIFICAR_AUSENTE_S.
+    """
+    engine = engine or get_engine()
+    chave = engine.url.render_as_string(hide_password=True)
+    with _existe_lock:
+        existe, verificado_em = _existe.get(chave, (False, None))
+    if existe or (verificado_em is not None and time.monotonic() - verificado_em < REVERIFICAR_AUSENTE_S):
+        return existe
+    existe = inspect(engine).has_table("faturamento_mensal")
+    with _existe_lock:
+        _existe[chave] = (existe, time.monotonic())
+    return existe
+
+
+def atualizar_faturamento_mensal(completo=False, engine=None):
+    """
+    Cria as tabelas se preciso e atualiza o resumo mensal.
+    Retorna (contratos alterados, meses recalculados).
+    """
+    engine = engine or get_engine()
+    if "faturamento_mensal" in inspect(engine).get_view_names():
+        # No banco local faturamento_mensal é uma view calculada na hora: não há o que atualizar
+        return 0, 0
+    serie_meses = SERIE_MESES.get(engine.dialect.name, SERIE_MESES["postgresql"])
+    with engine.begin() as conn:
+        for sql in DDL:
+            conn.execute(text(sql))
+        if completo:
+            for sql in LIMPAR_TUDO:
+                conn.execute(text(sql))
+        for sql in ATUALIZACAO:
+            conn.execute(text(sql.format(serie_meses=serie_meses)))
+        # Conta antes do COMMIT, enquanto as tabelas temporárias existem
+        alterados = conn.execute(text("SELECT COUNT(DISTINCT contrato_id) FROM _fm_alterados")).scalar()
+        meses = conn.execute(text("SELECT COUNT(*) FROM _fm_meses")).scalar()
+        for sql in REMOVER_TEMPORARIAS:
+            conn.execute(text(sql))
+    return alterados, meses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--completo", action="store_true", help="Apaga e recalcula todos os meses")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    alterados, meses = atualizar_faturamento_mensal(completo=args.completo)
+    print(f"✅ faturamento_mensal atualizado: {alterados} contratos alterados, "
+          f"{meses} meses recalculados em {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Filtros da página de clientes executados no banco (push-down).
+
+O dicionário de filtros da barra lateral vira uma cláusula WHERE com parâmetros
+(listas com bind expandido, prefixo de nome com LIKE) sobre v_perfil_cliente_enriquecido.
+O prefixo de nome é comparado por nome_busca(nome) (minúsculas e sem acento, criada pelo
+ingestao.py), a mesma normalização do índice de nomes do modo em memória.
+Só a página visível (LIMIT/OFFSET) e a contagem voltam do banco, em vez da view inteira
+ser filtrada em memória a cada interação.
+
+O texto da SQL depende só de quais filtros estão ativos, não dos valores, então o banco
+reaproveita os planos e o cache do Streamlit fica indexado pelos filtros.
+
+Os KPIs, os gráficos e os limites dos filtros da página também vêm de agregações no
+banco (resumo_clientes, contagem_clientes, perfil_por_faixa_etaria), então a view
+inteira só é carregada no modo de filtro em memória.
+"""
+from decimal import Decimal
+
+import streamlit as st
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .data_acess import get_engine
+from .datasets import TTL_DATASETS
+from .indice_nomes import normalizar_nome
+
+VIEW_CLIENTES = "v_perfil_cliente_enriquecido"
+COLUNAS_LISTAGEM = [
+    "cliente_id",
+    "nome",
+    "genero",
+    "idade_atual",
+    "nivel_educacional",
+    "qtd_dependente",
+    "total_contratos",
+    "renda_mensal",
+]
+TAMANHO_PAGINA = 100
+
+# Filtro "valor em lista": (coluna, chave no dicionário de filtros); lista vazia = sem filtro
+FILTROS_LISTA = [
+    ("genero", "genero"),
+    ("nivel_educacional", "educacao"),
+]
+# Filtro de faixa inclusiva: (coluna, chave do mínimo, chave do máximo)
+FILTROS_FAIXA = [
+    ("idade_atual", "idade_min", "idade_max"),
+    ("qtd_dependente", "dependentes_min", "dependentes_max"),
+    ("total_contratos", "contratos_min", "contratos_max"),
+    ("renda_mensal", "renda_min", "renda_max"),
+]
+
+# Faixas etárias dos gráficos: [início, fim) e rótulo
+FAIXAS_ETARIAS = [(18, 30, "18-30"), (30, 40, "31-40"), (40, 50, "41-50"), (50, 60, "51-60"), (60, 100, "60+")]
+SITUACOES_CLIENTE = ["Ativo", "Inativo", "Em risco"]
+
+
+def _escapar_like(termo):
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _escalar(valor):
+    # Valores numpy (vindos do DataFrame) viram tipos Python antes de ir para o driver
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def busca_sem_acento():
+    """Se o banco tem a função nome_busca (criada pelo ingestao.py)."""
+    try:
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT nome_busca('a')"))
+        return True
+    except SQLAlchemyError:
+        return False
+
+
+def compilar_filtros(filtros, sem_acento=True):
+    """
+    Converte o dicionário de filtros da página em (cláusula WHERE, parâmetros, nomes
+    dos parâmetros de lista). Mesma semântica do apply_filters em memória; com
+    ``sem_acento=False`` (banco sem nome_busca) o prefixo só ignora maiúsculas.
+    """
+    condicoes = []
+    params = {}
+    listas = []
+
+    if filtros.get("nome"):
+        # Prefixo normalizado dos dois lados; o índice em nome_busca(nome) atende o LIKE 'abc%'
+        if sem_acento:
+            condicoes.append("nome_busca(nome) LIKE :nome_prefixo ESCAPE '\\'")
+            params["nome_prefixo"] = _escapar_like(normalizar_nome(filtros["nome"])) + "%"
+        else:
+            condicoes.append("lower(nome) LIKE :nome_prefixo ESCAPE '\\'")
+            params["nome_prefixo"] = _escapar_like(filtros["nome"].lower()) + "%"
+
+    for coluna, chave in FILTROS_LISTA:
+        if filtros.get(chave):
+            condicoes.append(f"{coluna} IN :{chave}")
+            params[chave] = [str(valor) for valor in filtros[chave]]
+            listas.append(chave)
+
+    for coluna, chave_min, chave_max in FILTROS_FAIXA:
+        if filtros.get(chave_min) is not None and filtros.get(chave_max) is not None:
+            condicoes.append(f"{coluna} BETWEEN :{chave_min} AND :{chave_max}")
+            params[chave_min] = _escalar(filtros[chave_min])
+            params[chave_max] = _escalar(filtros[chave_max])
+
+    return " AND ".join(condicoes) or "1 = 1", params, listas
+
+
+def condicoes_filtros(filtros):
+    """
+    Os filtros de lista e de faixa como condições do IndiceBitmap (modo de filtro em
+    memória); a tupla também é a assinatura da combinação no cache do índice.
+    """
+    condicoes = []
+    for coluna, chave in FILTROS_LISTA:
+        if filtros.get(chave):
+            condicoes.append(("lista", coluna, tuple(sorted(str(valor) for valor in filtros[chave]))))
+    for coluna, chave_min, chave_max in FILTROS_FAIXA:
+        if filtros.get(chave_min) is not None and filtros.get(chave_max) is not None:
+            condicoes.append(("faixa", coluna, _escalar(filtros[chave_min]), _escalar(filtros[chave_max])))
+    return tuple(condicoes)
+
+
+def _consultar(sql, params, listas):
+    consulta = text(sql).bindparams(*(bindparam(nome, expanding=True) for nome in listas))
+    engine = get_engine()
+    with engine.connect() as conn:
+        return pd.read_sql_query(consulta, con=conn, params=params)
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def contar_clientes(filtros):
+    """Quantos clientes atendem aos filtros."""
+    where, params, listas = compilar_filtros(filtros, busca_sem_acento())
+    df = _consultar(f"SELECT COUNT(*) AS total FROM {VIEW_CLIENTES} WHERE {where}", params, listas)
+    return int(df["total"].iloc[0])
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def buscar_pagina_clientes(filtros, pagina=1, tamanho_pagina=TAMANHO_PAGINA):
+    """Clientes da ``pagina`` (a partir de 1), ordenados por cliente_id."""
+    where, params, listas = compilar_filtros(filtros, busca_sem_acento())
+    params = {**params, "limite": int(tamanho_pagina), "deslocamento": (int(pagina) - 1) * int(tamanho_pagina)}
+    return _consultar(
+        f"SELECT {', '.join(COLUNAS_LISTAGEM)} FROM {VIEW_CLIENTES} WHERE {where} "
+        "ORDER BY cliente_id LIMIT :limite OFFSET :deslocamento",
+        params,
+        listas,
+    )
+
+
+def exportar_clientes(filtros):
+    """Todos os clientes filtrados (para o botão de exportar; não fica no cache)."""
+    where, params, listas = compilar_filtros(filtros, busca_sem_acento())
+    return _consultar(
+        f"SELECT {', '.join(COLUNAS_LISTAGEM)} FROM {VIEW_CLIENTES} WHERE {where} ORDER BY cliente_id",
+        params,
+        listas,
+    )
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def colunas_clientes():
+    """Colunas que a view de clientes tem (algumas são opcionais nas páginas)."""
+    # LIMIT 0 em vez de inspect().get_columns: a reflexão do catálogo não funciona em todo banco (DuckDB)
+    with get_engine().connect() as conn:
+        return list(conn.execute(text(f"SELECT * FROM {VIEW_CLIENTES} LIMIT 0")).keys())
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def resumo_clientes():
+    """
+    Totais dos KPIs, clientes por situação e mínimo/máximo de cada filtro de faixa, numa
+    só passada pela view. Métricas de colunas que a view não tem ficam de fora do dicionário;
+    médias e limites são None sem clientes.
+    """
+    colunas = set(colunas_clientes())
+    expressoes = ["COUNT(*) AS total"]
+    if "qtd_dependente" in colunas:
+        expressoes.append("AVG(qtd_dependente) AS media_dependentes")
+    if "total_contratos" in colunas:
+        expressoes.append("COUNT(*) FILTER (WHERE total_contratos > 1) AS multi_contratos")
+    if "renda_mensal" in colunas:
+        expressoes.append("AVG(renda_mensal) AS renda_media")
+    if "status_cliente" in colunas:
+        expressoes.append("COUNT(status_cliente) AS com_situacao")
+        expressoes += [f"COUNT(*) FILTER (WHERE status_cliente = '{situacao}') AS \"situacao_{situacao}\""
+                       for situacao in SITUACOES_CLIENTE]
+    for coluna, chave_min, chave_max in FILTROS_FAIXA:
+        if coluna in colunas:
+            expressoes += [f"MIN({coluna}) AS {chave_min}", f"MAX({coluna}) AS {chave_max}"]
+
+    with get_engine().connect() as conn:
+        linha = conn.execute(text(f"SELECT {', '.join(expressoes)} FROM {VIEW_CLIENTES}")).mappings().one()
+    # Colunas DECIMAL (renda) voltam como Decimal: float, como no dataset em memória
+    resumo = {chave: float(valor) if isinstance(valor, Decimal) else _escalar(valor)
+              for chave, valor in linha.items() if not chave.startswith("situacao_")}
+    if "status_cliente" in colunas:
+        resumo["situacao"] = {situacao: int(linha[f"situacao_{situacao}"]) for situacao in SITUACOES_CLIENTE}
+    return resumo
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def contagem_clientes(coluna):
+    """Clientes por valor (não nulo) de ``coluna``, do mais frequente ao menos frequente."""
+    if coluna not in colunas_clientes():
+        raise KeyError(f"Coluna '{coluna}' não existe em {VIEW_CLIENTES}.")
+    with get_engine().connect() as conn:
+        return pd.read_sql_query(
+            text(f"SELECT {coluna}, COUNT(*) AS count FROM {VIEW_CLIENTES} WHERE {coluna} IS NOT NULL "
+                 f"GROUP BY {coluna} ORDER BY count DESC, {coluna}"),
+            con=conn,
+        )
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def perfil_por_faixa_etaria():
+    """
+    Por faixa etária (FAIXAS_ETARIAS) e gênero: clientes, soma e quantidade de rendas
+    informadas. Idades fora das faixas não entram; gênero nulo vira uma linha própria.
+    """
+    casos = " ".join(f"WHEN idade_atual >= {inicio} AND idade_atual < {fim} THEN '{rotulo}'"
+                     for inicio, fim, rotulo in FAIXAS_ETARIAS)
+    with get_engine().connect() as conn:
+        return pd.read_sql_query(
+            text(f"""
+                SELECT faixa_etaria, genero, COUNT(*) AS count,
+                       SUM(renda_mensal) AS renda_total, COUNT(renda_mensal) AS com_renda
+                FROM (SELECT CASE {casos} END AS faixa_etaria, genero, renda_mensal FROM {VIEW_CLIENTES}) f
+                WHERE faixa_etaria IS NOT NULL
+                GROUP BY faixa_etaria, genero
+                ORDER BY faixa_etaria, genero
+            """),
+            con=conn,
+        )
@@ -0,0 +1,161 @@
+"""
+Índices em memória para os filtros de lista e de faixa sobre um dataset compartilhado.
+
+Para cada coluna categórica, por valor: as posições das linhas (ordenadas) e um bitmap
+(np.packbits, 1 bit por linha); para cada coluna numérica, os valores ordenados com a
+posição de origem. Uma faixa são duas buscas binárias, e o tamanho de cada condição
+sai de graça (fim - inicio numa faixa, soma das contagens numa lista). A avaliação
+começa pela condição mais seletiva, que vira o conjunto de candidatas, e as demais só
+são testadas nessas candidatas (bit do bitmap ou valor da coluna), então o custo acompanha
+o tamanho do resultado, não o número de linhas. Faixas que cobrem todo o min..max de uma
+coluna sem nulos não filtram nada e são puladas.
+
+O resultado (posições das linhas) fica num cache LRU pela assinatura dos filtros, então
+voltar a uma combinação já vista não recalcula nada.
+
+Condições aceitas por ``selecionar`` (tupla, para servir de chave do cache):
+
+    ("lista", coluna, (valor, ...))     valor da coluna entre os escolhidos
+    ("faixa", coluna, minimo, maximo)   minimo <= coluna <= maximo
+
+Condições em colunas que o índice não tem são ignoradas, como no apply_filters.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .datasets import indice_dataset
+
+# Combinações de filtros guardadas por índice
+TAMANHO_CACHE = 128
+
+
+def _tem_bit(bitmap, posicoes):
+    return ((bitmap[posicoes >> 3] >> (7 - (posicoes & 7))) & 1).astype(bool)
+
+
+class IndiceBitmap:
+    def __init__(self, df, categoricas, numericas, tamanho_cache=TAMANHO_CACHE):
+        self.linhas = len(df)
+        self.bitmaps = {}
+        self.posicoes_valor = {}
+        self.ordenados = {}
+        self.valores = {}
+        self.sem_nulos = {}
+        for coluna in categoricas:
+            if coluna not in df.columns:
+                continue
+            # Nulos ficam com código -1 e não entram em valor nenhum (isin também os exclui)
+            codigos, valores = pd.factorize(df[coluna])
+            ordem = np.argsort(codigos, kind="stable")
+            limites = np.searchsorted(codigos[ordem], np.arange(len(valores) + 1))
+            self.posicoes_valor[coluna] = {
+                str(valor): ordem[limites[i]:limites[i + 1]] for i, valor in enumerate(valores)
+            }
+            self.bitmaps[coluna] = {str(valor): np.packbits(codigos == i) for i, valor in enumerate(valores)}
+        for coluna in numericas:
+            if coluna not in df.columns:
+                continue
+            valores = pd.to_numeric(df[coluna]).to_numpy(dtype=np.float64, na_value=np.nan)
+            posicoes = np.flatnonzero(~np.isnan(valores))
+            ordem = np.argsort(valores[posicoes], kind="stable")
+            self.ordenados[coluna] = (valores[posicoes][ordem], posicoes[ordem])
+            self.valores[coluna] = valores
+            self.sem_nulos[coluna] = len(posicoes) == self.linhas
+        self._selecionar = lru_cache(maxsize=tamanho_cache)(self._calcular)
+
+    def posicoes_lista(self, coluna, valores):
+        """Posições (ordenadas) das linhas com a coluna entre os valores."""
+        partes = [self.posicoes_valor[coluna].get(str(valor)) for valor in set(map(str, valores))]
+        partes = [parte for parte in partes if parte is not None]
+        if not partes:
+            return np.empty(0, dtype=np.intp)
+        # Os valores são distintos, então as partes não se repetem
+        return np.sort(np.concatenate(partes))
+
+    def intervalo_faixa(self, coluna, minimo, maximo):
+        """(inicio, fim) da faixa no vetor ordenado da coluna."""
+        valores, _ = self.ordenados[coluna]
+        return np.searchsorted(valores, minimo, side="left"), np.searchsorted(valores, maximo, side="right")
+
+    def posicoes_faixa(self, coluna, minimo, maximo):
+        """Posições (ordenadas) das linhas com minimo <= coluna <= maximo."""
+        inicio, fim = self.intervalo_faixa(coluna, minimo, maximo)
+        return np.sort(self.ordenados[coluna][1][inicio:fim])
+
+    def _planejar(self, condicoes):
+        """Condições úteis com o tamanho do conjunto que cada uma seleciona, da menor para a maior."""
+        plano = []
+        for condicao in condicoes:
+            tipo, coluna = condicao[:2]
+            if tipo == "lista" and coluna in self.posicoes_valor:
+                por_valor = self.posicoes_valor[coluna]
+                tamanho = sum(len(por_valor.get(valor, ())) for valor in set(map(str, condicao[2])))
+                plano.append((tamanho, condicao))
+            elif tipo == "faixa" and coluna in self.ordenados:
+                ordenados, _ = self.ordenados[coluna]
+                minimo, maximo = condicao[2:]
+                if self.sem_nulos[coluna] and (len(ordenados) == 0 or (minimo <= ordenados[0] and maximo >= ordenados[-1])):
+                    continue
+                inicio, fim = self.intervalo_faixa(coluna, minimo, maximo)
+                plano.append((fim - inicio, condicao))
+        plano.sort(key=lambda item: item[0])
+        return plano
+
+    def _materializar(self, condicao):
+        if condicao[0] == "lista":
+            return self.posicoes_lista(condicao[1], condicao[2])
+        return self.posicoes_faixa(condicao[1], *condicao[2:])
+
+    def _restringir(self, candidatas, condicao):
+        """As candidatas que também atendem à condição (custo proporcional às candidatas)."""
+        tipo, coluna = condicao[:2]
+        if tipo == "lista":
+            marcadas = np.zeros(len(candidatas), dtype=bool)
+            for valor in set(map(str, condicao[2])):
+                bitmap = self.bitmaps[coluna].get(valor)
+                if bitmap is not None:
+                    marcadas |= _tem_bit(bitmap, candidatas)
+        else:
+            minimo, maximo = condicao[2:]
+            valores = self.valores[coluna][candidatas]
+            marcadas = (valores >= minimo) & (valores <= maximo)
+        return candidatas[marcadas]
+
+    def _calcular(self, condicoes, candidatas=None):
+        plano = self._planejar(condicoes)
+        if candidatas is None:
+            if not plano:
+                posicoes = np.arange(self.linhas)
+                posicoes.flags.writeable = False
+                return posicoes
+            candidatas = self._materializar(plano.pop(0)[1])
+        for _, condicao in plano:
+            if len(candidatas) == 0:
+                break
+            candidatas = self._restringir(candidatas, condicao)
+        # O mesmo vetor é devolvido a todas as sessões que repetirem a combinação
+        candidatas.flags.writeable = False
+        return candidatas
+
+    def selecionar(self, condicoes, candidatas=None):
+        """
+        Posições (em ordem crescente) das linhas que atendem a todas as condições.
+        ``candidatas`` (posições ordenadas, ex.: o resultado do índice de nomes) restringe a
+        busca a essas linhas; como depende do termo digitado, esse caso não passa pelo cache.
+        """
+        if candidatas is None:
+            return self._selecionar(tuple(condicoes))
+        return self._calcular(tuple(condicoes), np.asarray(candidatas, dtype=np.intp))
+
+    def estimar(self, condicoes):
+        """Tamanho do conjunto da condição mais seletiva (o número de linhas sem condições úteis)."""
+        plano = self._planejar(tuple(condicoes))
+        return plano[0][0] if plano else self.linhas
+
+
+def indice_bitmap_dataset(nome_view, categoricas, numericas):
+    """(dataset compartilhado, índice de bitmaps dele), montado uma vez por ciclo de cache."""
+    nome_indice = ("bitmap", tuple(categoricas), tuple(numericas))
+    return indice_dataset(nome_view, nome_indice, lambda df: IndiceBitmap(df, categoricas, numericas))
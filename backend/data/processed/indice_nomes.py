@@ -0,0 +1,64 @@
+"""
+Índice de prefixo para a busca por nome da página de clientes.
+
+Os nomes são normalizados uma vez (minúsculas e sem acentos: "José" e "jose" viram a
+mesma chave) e ordenados; uma busca por prefixo vira duas buscas binárias no vetor
+ordenado e devolve as posições das linhas que casam, sem percorrer nem copiar a
+coluna inteira a cada envio do formulário.
+
+No modo de filtro no banco o mesmo papel é da função ``nome_busca(nome)`` criada pela
+ingestão (ingestao.py, mesma normalização) e, no Postgres, do índice de prefixo sobre ela
+em clientes.nome, que atende o ``nome_busca(nome) LIKE 'prefixo%'`` da view de clientes.
+"""
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from .datasets import indice_dataset
+
+# Maior caractere Unicode: prefixo + FIM_PREFIXO fica depois de toda chave que começa com o prefixo
+FIM_PREFIXO = "\U0010ffff"
+
+
+def normalizar_nome(texto):
+    """Chave de comparação: minúsculas e sem marcas de acento (como o nome_busca do banco)."""
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+class IndiceNomes:
+    """Chaves normalizadas em ordem e a posição (linha) de origem de cada uma."""
+
+    def __init__(self, nomes):
+        nomes = pd.Series(nomes, dtype="string").reset_index(drop=True)
+        validos = nomes.notna().to_numpy()
+        chaves = nomes[validos].str.lower()
+        # A decomposição Unicode (lenta, linha a linha) só é necessária nos nomes com acento
+        com_acento = chaves.str.contains(r"[^\x00-\x7f]", regex=True).to_numpy(dtype=bool)
+        chaves[com_acento] = [normalizar_nome(c) for c in chaves[com_acento]]
+        # Vetor de largura fixa: ordena e faz a busca binária bem mais rápido que um vetor de objetos
+        chaves = chaves.to_numpy(dtype=str)
+        ordem = np.argsort(chaves, kind="stable")
+        self.chaves = chaves[ordem]
+        self.posicoes = np.flatnonzero(validos)[ordem]
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def intervalo(self, prefixo):
+        """(início, fim) no vetor ordenado das chaves que começam com ``prefixo``."""
+        chave = normalizar_nome(prefixo)
+        inicio = int(np.searchsorted(self.chaves, chave, side="left"))
+        fim = int(np.searchsorted(self.chaves, chave + FIM_PREFIXO, side="left"))
+        return inicio, fim
+
+    def buscar(self, prefixo):
+        """Posições (em ordem crescente) das linhas cujo nome começa com ``prefixo``."""
+        inicio, fim = self.intervalo(prefixo)
+        return np.sort(self.posicoes[inicio:fim])
+
+
+def indice_nomes_dataset(nome_view="v_perfil_cliente_enriquecido"):
+    """(dataset compartilhado, índice de nomes dele), montado uma vez por ciclo de cache."""
+    return indice_dataset(nome_view, "nomes", lambda df: IndiceNomes(df["nome"]))
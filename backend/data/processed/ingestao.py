@@ -0,0 +1,335 @@
+"""
+Carga dos arquivos brutos P18_* (clientes, contratos, cancelamentos) nas tabelas do banco.
+É o único dono dessas tabelas: o banco local (backend_local.py, DB_BACKEND=duckdb)
+também é carregado por aqui.
+
+Cada arquivo é lido em lotes com tipos definidos (datas como DATE, valores numéricos,
+booleanos), copiado para uma tabela de staging com COPY (executemany fora do Postgres)
+e aplicado com INSERT ... ON CONFLICT pela chave. Depois da carga os índices usados
+pelas views são criados e as estatísticas atualizadas (ANALYZE), para o planejador
+usar index scan nos filtros por cliente, contrato, tipo de seguro e data de início.
+
+Carga incremental por marca d'água de arquivo: a tabela ingestao_arquivos guarda,
+por tabela, quantos bytes do arquivo já foram carregados e o sha1 desse trecho.
+Na próxima execução:
+
+    arquivo igual          nada a fazer
+    arquivo só cresceu     carrega apenas as linhas novas (a partir do byte salvo)
+    arquivo reescrito      recarrega a tabela inteira
+
+Um ``P18_*.parquet`` tem preferência sobre o CSV do mesmo nome; Parquet não cresce por
+anexação, então só há "nada" ou "completa" (pyarrow é necessário para ler Parquet).
+
+Uso (a partir da raiz do projeto):
+
+    python -m backend.data.processed.ingestao                  # incremental, no banco do .env
+    python -m backend.data.processed.ingestao --completo       # recarrega tudo
+    python -m backend.data.processed.ingestao --dados /caminho/dos/csvs
+    python -m backend.data.processed.ingestao --dsn duckdb:///caminho/local.duckdb
+"""
+import os
+import time
+import hashlib
+import argparse
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .data_acess import copiar_dataframe, get_engine
+
+DIRETORIO_DADOS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "raw"))
+TAMANHO_LOTE = 100_000
+
+# --- Esquema de cada tabela: arquivo de origem (sem extensão), chave e colunas (tipo SQL, tipo na leitura) ---
+ESQUEMAS = {
+    "clientes": {
+        "arquivo": "P18_clientes",
+        "chave": "id_cliente",
+        "colunas": {
+            "id_cliente": ("TEXT NOT NULL", "string"),
+            "nome": ("TEXT", "string"),
+            "data_nascimento": ("DATE", "data"),
+            "genero": ("TEXT", "string"),
+            "cidade_residencia": ("TEXT", "string"),
+            "estado_residencia": ("TEXT", "string"),
+            "profissao": ("TEXT", "string"),
+            "renda_mensal": ("NUMERIC(12, 2)", "float64"),
+            "nivel_educacional": ("TEXT", "string"),
+            "qtd_dependentes": ("SMALLINT", "Int16"),
+            "data_cadastro": ("DATE", "data"),
+        },
+    },
+    "contratos": {
+        "arquivo": "P18_contratos",
+        "chave": "id_contrato",
+        "colunas": {
+            "id_contrato": ("TEXT NOT NULL", "string"),
+            "id_cliente": ("TEXT NOT NULL", "string"),
+            "tipo_seguro": ("TEXT", "string"),
+            "data_inicio": ("DATE", "data"),
+            "data_fim": ("DATE", "data"),
+            "valor_premio_mensal": ("NUMERIC(12, 2)", "float64"),
+            "satisfacao_ultima_avaliacao": ("TEXT", "string"),
+            "canal_venda": ("TEXT", "string"),
+            "renovado_automaticamente": ("BOOLEAN", "boolean"),
+        },
+    },
+    "cancelamentos": {
+        "arquivo": "P18_cancelamentos",
+        "chave": "id_contrato",
+        "colunas": {
+            "id_contrato": ("TEXT NOT NULL", "string"),
+            "data_cancelamento": ("DATE", "data"),
+            "motivo_cancelamento": ("TEXT", "string"),
+            "canal_cancelamento": ("TEXT", "string"),
+            "avaliacao_experiencia_cancelamento": ("TEXT", "string"),
+        },
+    },
+}
+
+# Índices dos filtros e joins das views (a chave de cada tabela já é indexada pela PRIMARY KEY)
+INDICES = {
+    "contratos": [
+        "CREATE INDEX IF NOT EXISTS ix_contratos_id_cliente ON contratos (id_cliente)",
+        "CREATE INDEX IF NOT EXISTS ix_contratos_tipo_inicio ON contratos (tipo_seguro, data_inicio)",
+        "CREATE INDEX IF NOT EXISTS ix_contratos_data_inicio ON contratos (data_inicio)",
+    ],
+    "cancelamentos": [
+        "CREATE INDEX IF NOT EXISTS ix_cancelamentos_data ON cancelamentos (data_cancelamento)",
+    ],
+}
+# Busca por nome da página de clientes: nome_busca(texto) = minúsculas e sem acento, a mesma
+# chave do normalizar_nome do índice em memória (indice_nomes.py), para "jú" achar "Juliana"
+# nos dois modos de filtro. O índice de prefixo fica em clientes.nome; v_perfil_cliente_enriquecido
+# expõe essa coluna sem transformação, então o nome_busca(nome) LIKE 'prefixo%' feito na view
+# também usa o índice. text_pattern_ops: vale qualquer que seja a collation do banco.
+BUSCA_NOMES = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        # unaccent não é IMMUTABLE (depende do search_path); fixando o dicionário dá para indexar
+        """
+        CREATE OR REPLACE FUNCTION nome_busca(texto TEXT) RETURNS TEXT
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, lower(texto)) $$
+        """,
+        "DROP INDEX IF EXISTS ix_clientes_nome_prefixo",
+        "CREATE INDEX IF NOT EXISTS ix_clientes_nome_busca ON clientes (nome_busca(nome) text_pattern_ops)",
+    ],
+    "duckdb": [
+        "CREATE OR REPLACE MACRO nome_busca(texto) AS strip_accents(lower(texto))",
+    ],
+}
+
+DDL_MARCAS = """
+CREATE TABLE IF NOT EXISTS ingestao_arquivos (
+    tabela TEXT PRIMARY KEY,
+    arquivo TEXT NOT NULL,
+    bytes_carregados BIGINT NOT NULL,
+    sha1_carregado TEXT NOT NULL,
+    linhas_carregadas BIGINT NOT NULL,
+    carregado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def ddl_tabela(tabela):
+    esquema = ESQUEMAS[tabela]
+    colunas = ",\n    ".join(f"{nome} {tipo_sql}" for nome, (tipo_sql, _) in esquema["colunas"].items())
+    return f"CREATE TABLE IF NOT EXISTS {tabela} (\n    {colunas},\n    PRIMARY KEY ({esquema['chave']})\n)"
+
+
+def arquivo_origem(tabela, diretorio):
+    """Caminho do arquivo de origem da tabela: Parquet tem preferência sobre o CSV do mesmo nome."""
+    for extensao in (".parquet", ".csv"):
+        caminho = os.path.join(diretorio, ESQUEMAS[tabela]["arquivo"] + extensao)
+        if os.path.exists(caminho):
+            return caminho
+    raise FileNotFoundError(f"Nenhum {ESQUEMAS[tabela]['arquivo']}.parquet/.csv em {diretorio}")
+
+
+def sha1_prefixo(caminho, tamanho):
+    """sha1 dos primeiros ``tamanho`` bytes do arquivo, lido em blocos."""
+    sha1 = hashlib.sha1()
+    restante = tamanho
+    with open(caminho, "rb") as f:
+        while restante > 0:
+            bloco = f.read(min(restante, 1 << 20))
+            if not bloco:
+                break
+            sha1.update(bloco)
+            restante -= len(bloco)
+    return sha1.hexdigest()
+
+
+def ler_marca(conn, tabela):
+    linha = conn.execute(
+        text("""
+            SELECT arquivo, bytes_carregados, sha1_carregado, linhas_carregadas
+            FROM ingestao_arquivos WHERE tabela = :tabela
+        """),
+        {"tabela": tabela},
+    ).fetchone()
+    return None if linha is None else {"arquivo": linha[0], "bytes": linha[1], "sha1": linha[2], "linhas": linha[3]}
+
+
+def planejar(caminho, marca, completo=False):
+    """("nada" | "anexar" | "completa", byte inicial) conforme a marca d'água do arquivo."""
+    tamanho = os.path.getsize(caminho)
+    if completo or marca is None or marca["arquivo"] != os.path.basename(caminho) or tamanho < marca["bytes"]:
+        return "completa", 0
+    if sha1_prefixo(caminho, marca["bytes"]) != marca["sha1"]:
+        return "completa", 0
+    if tamanho == marca["bytes"]:
+        return "nada", marca["bytes"]
+    if caminho.endswith(".parquet"):
+        return "completa", 0
+    return "anexar", marca["bytes"]
+
+
+def ler_lotes(caminho, tabela, inicio=0, tamanho_lote=TAMANHO_LOTE):
+    """
+    Lotes tipados do arquivo a partir do byte ``inicio`` (0 = arquivo inteiro, com cabeçalho).
+    Datas viram ``datetime.date``, que tanto o COPY quanto o executemany gravam como DATE.
+    """
+    colunas = ESQUEMAS[tabela]["colunas"]
+    tipos = {nome: tipo for nome, (_, tipo) in colunas.items() if tipo != "data"}
+    datas = [nome for nome, (_, tipo) in colunas.items() if tipo == "data"]
+    if caminho.endswith(".parquet"):
+        import pyarrow.parquet as pq  # opcional: só para origem em Parquet
+
+        for lote in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho_lote, columns=list(colunas)):
+            lote = lote.to_pandas().astype(tipos)
+            for nome in datas:
+                lote[nome] = pd.to_datetime(lote[nome]).dt.date
+            yield lote[list(colunas)]
+        return
+    with open(caminho, "rb") as f:
+        f.seek(inicio)
+        leitor = pd.read_csv(
+            f,
+            header=0 if inicio == 0 else None,
+            names=None if inicio == 0 else list(colunas),
+            usecols=list(colunas),
+            dtype=tipos,
+            chunksize=tamanho_lote,
+            encoding="utf-8",
+        )
+        for lote in leitor:
+            for nome in datas:
+                lote[nome] = pd.to_datetime(lote[nome], format="%Y-%m-%d").dt.date
+            yield lote[list(colunas)]
+
+
+def _limpar(conn, tabela):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"TRUNCATE {tabela}"))
+    else:
+        conn.execute(text(f"DELETE FROM {tabela}"))
+
+
+def carregar_tabela(conn, tabela, caminho, inicio=0, tamanho_lote=TAMANHO_LOTE):
+    """Copia o arquivo (a partir de ``inicio``) para a tabela via staging + upsert. Retorna as linhas lidas."""
+    esquema = ESQUEMAS[tabela]
+    colunas = list(esquema["colunas"])
+    lista_colunas = ", ".join(colunas)
+    atualizacoes = ", ".join(f"{col} = EXCLUDED.{col}" for col in colunas if col != esquema["chave"])
+    staging = f"_ingestao_{tabela}"
+
+    conn.execute(text(f"CREATE TEMP TABLE {staging} AS SELECT {lista_colunas} FROM {tabela} WHERE 1 = 0"))
+    linhas = 0
+    for lote in ler_lotes(caminho, tabela, inicio, tamanho_lote):
+        conn.execute(text(f"DELETE FROM {staging}"))
+        # A mesma chave repetida no arquivo: vale a última linha, como num upsert linha a linha
+        copiar_dataframe(conn, staging, lote.drop_duplicates(esquema["chave"], keep="last"))
+        conn.execute(text(f"""
+            INSERT INTO {tabela} ({lista_colunas})
+            SELECT {lista_colunas} FROM {staging}
+            WHERE true  -- o SQLite exige um WHERE antes do ON CONFLICT em INSERT ... SELECT
+            ON CONFLICT ({esquema['chave']}) DO UPDATE SET {atualizacoes}
+        """))
+        linhas += len(lote)
+    # A conexão volta ao pool: a tabela temporária não pode ficar nela
+    conn.execute(text(f"DROP TABLE {staging}"))
+    return linhas
+
+
+def criar_busca_nomes(engine):
+    """
+    Cria a função nome_busca (e o índice de prefixo no Postgres) se o banco tiver suporte.
+    Retorna False quando não dá: a página de clientes cai para lower(nome) e avisa.
+    """
+    comandos = BUSCA_NOMES.get(engine.dialect.name)
+    if not comandos:
+        return False
+    try:
+        with engine.begin() as conn:
+            for sql in comandos:
+                conn.execute(text(sql))
+    except SQLAlchemyError as erro:
+        print(f"⚠️ Busca por nome sem acento indisponível: {erro}")
+        return False
+    return True
+
+
+def ingerir(diretorio=DIRETORIO_DADOS, completo=False, engine=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Carrega (ou atualiza) as três tabelas, uma transação por arquivo junto com a marca d'água.
+    Retorna {tabela: (ação, linhas lidas)}.
+    """
+    engine = engine or get_engine()
+    resultado = {}
+    with engine.begin() as conn:
+        conn.execute(text(DDL_MARCAS))
+
+    for tabela in ESQUEMAS:
+        caminho = arquivo_origem(tabela, diretorio)
+        with engine.begin() as conn:
+            conn.execute(text(ddl_tabela(tabela)))
+            marca = ler_marca(conn, tabela)
+            acao, inicio = planejar(caminho, marca, completo)
+            if acao == "nada":
+                resultado[tabela] = (acao, 0)
+                continue
+
+            tamanho = os.path.getsize(caminho)
+            if acao == "completa":
+                _limpar(conn, tabela)
+            linhas = carregar_tabela(conn, tabela, caminho, inicio, tamanho_lote)
+            for sql in INDICES.get(tabela, []):
+                conn.execute(text(sql))
+            conn.execute(text(f"ANALYZE {tabela}"))
+
+            total_linhas = linhas if acao == "completa" else marca["linhas"] + linhas
+            conn.execute(text("DELETE FROM ingestao_arquivos WHERE tabela = :tabela"), {"tabela": tabela})
+            conn.execute(
+                text("""
+                    INSERT INTO ingestao_arquivos (tabela, arquivo, bytes_carregados, sha1_carregado, linhas_carregadas)
+                    VALUES (:tabela, :arquivo, :bytes, :sha1, :linhas)
+                """),
+                {"tabela": tabela, "arquivo": os.path.basename(caminho), "bytes": tamanho,
+                 "sha1": sha1_prefixo(caminho, tamanho), "linhas": total_linhas},
+            )
+        resultado[tabela] = (acao, linhas)
+    criar_busca_nomes(engine)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dados", default=DIRETORIO_DADOS, help="Diretório com os arquivos P18_* (.csv ou .parquet)")
+    parser.add_argument("--dsn", help="Banco de destino (padrão: o do .env / DB_BACKEND)")
+    parser.add_argument("--completo", action="store_true", help="Ignora as marcas d'água e recarrega tudo")
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE, help="Linhas por lote lido do arquivo")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resultado = ingerir(args.dados, completo=args.completo, engine=get_engine(args.dsn),
+                        tamanho_lote=args.tamanho_lote)
+    for tabela, (acao, linhas) in resultado.items():
+        print(f"  {tabela:14s} {acao:9s} {linhas:>10,} linhas")
+    print(f"✅ Ingestão concluída em {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import pandas as pd
+from .loading_views import carregar_query_parametrizada
+
+# --- KPIs por tipo de seguro em uma única passada ---
+# Cada métrica usa um FILTER sobre o mesmo GROUP BY, então o banco lê a view uma vez só
+# para todos os tipos, em vez de uma query por métrica por aba.
+QUERY_KPIS_POR_TIPO = """
+SELECT
+    tipo_seguro_nome,
+    COUNT(*) FILTER (WHERE status_contrato = 'Ativo') AS total_contratos_ativos,
+    COUNT(DISTINCT cliente_id) FILTER (WHERE status_contrato = 'Ativo') AS total_clientes_ativos,
+    COALESCE(SUM(premio_mensal) FILTER (WHERE status_contrato = 'Ativo'), 0) AS faturamento_total,
+    CAST(COUNT(*) FILTER (WHERE status_contrato = 'Cancelado') AS REAL) * 100 /
+        NULLIF(COUNT(*) FILTER (WHERE status_contrato IN ('Ativo', 'Cancelado', 'Encerrado')), 0) AS churn_rate,
+    COALESCE(ROUND(AVG(nivel_satisfacao_num) FILTER (WHERE nivel_satisfacao_num > 0), 2), 0) AS satisfacao_media
+FROM v_contratos_detalhados
+WHERE tipo_seguro_nome IS NOT NULL
+GROUP BY tipo_seguro_nome
+ORDER BY tipo_seguro_nome;
+"""
+
+COLUNAS_KPI = [
+    "total_contratos_ativos",
+    "total_clientes_ativos",
+    "faturamento_total",
+    "churn_rate",
+    "satisfacao_media",
+]
+
+
+def carregar_kpis_por_tipo():
+    """
+    Retorna um DataFrame indexado por tipo_seguro_nome com uma coluna por KPI.
+    Tipos sem contratos no denominador do churn ficam com churn 0, como nas abas.
+    """
+    df = carregar_query_parametrizada(QUERY_KPIS_POR_TIPO)
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_KPI, index=pd.Index([], name="tipo_seguro_nome"))
+    df = df.set_index("tipo_seguro_nome")
+    df["churn_rate"] = df["churn_rate"].fillna(0.0)
+    return df[COLUNAS_KPI]
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
+from sqlalchemy import text
 from .data_acess import get_engine
+from .snapshot_cache import carregar_com_snapshot
 
 @st.cache_data(ttl=3600)
 def carregar_view(nome_view):
@@ -8,9 +10,13 @@ def carregar_view(nome_view):
     if engine is None: # Adiciona verificação para o mock
         return pd.DataFrame() # Retorna DataFrame vazio se o engine for None
     query = f"SELECT * FROM {nome_view}"
-    # CORREÇÃO AQUI: Use params=[] para consultas sem placeholders
-    df = pd.read_sql_query(query, con=engine, params=[])
-    return df
+
+    def buscar():
+        # CORREÇÃO AQUI: Use params=[] para consultas sem placeholders
+        return pd.read_sql_query(query, con=engine, params=[])
+
+    # Snapshot em disco: reinícios e outros workers leem do arquivo enquanto o banco não mudar
+    return carregar_com_snapshot(f"view_{nome_view}", buscar, engine)
 
 @st.cache_data(ttl=3600)
 def carregar_query(sql_query):
@@ -24,4 +30,17 @@ def carregar_query(sql_query):
         else:
             # CORREÇÃO AQUI: Use params=[] para a sua query principal
             df = pd.read_sql_query(sql_query, con=conn, params=[])
-    return df
\ No newline at end of file
+    return df
+
+@st.cache_data(ttl=3600)
+def carregar_query_parametrizada(sql_template, params=None):
+    """
+    Executa uma SQL com parâmetros nomeados (ex.: ``WHERE tipo_seguro_nome = :tipo``).
+
+    O texto da SQL é sempre o mesmo para todos os valores, então o banco reaproveita o
+    plano preparado e o cache do Streamlit fica indexado por (template, params).
+    """
+    engine = get_engine()
+    with engine.connect() as conn:
+        df = pd.read_sql_query(text(sql_template), con=conn, params=params or {})
+    return df
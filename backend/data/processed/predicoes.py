@@ -0,0 +1,225 @@
+"""
+Armazenamento das previsões de cancelamento no banco (tabela predicoes_churn).
+
+O aply_mode.py grava aqui com COPY (uma tabela de staging por lote + upsert) e as páginas
+leem com consultas filtradas pelos índices, em vez de cada uma abrir um CSV inteiro.
+
+Cada gravação concluída incrementa o contador de predicoes_churn_carga na mesma transação.
+O cache das páginas é indexado por esse contador, então uma nova execução do aply_mode.py
+aparece na próxima leitura, sem esperar o TTL.
+"""
+import threading
+import time
+
+import streamlit as st
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from .data_acess import copiar_dataframe, get_engine
+
+DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS predicoes_churn (
+        contrato_id BIGINT PRIMARY KEY,
+        cliente_id BIGINT NOT NULL,
+        tipo_seguro TEXT,
+        versao_modelo TEXT NOT NULL,
+        probabilidade_cancelamento DOUBLE PRECISION NOT NULL,
+        cancelamento_previsto SMALLINT NOT NULL,
+        hash_features BIGINT,
+        pontuado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Abas do planos: "em risco deste tipo"
+    "CREATE INDEX IF NOT EXISTS ix_predicoes_churn_tipo_risco ON predicoes_churn (tipo_seguro, cancelamento_previsto)",
+    "CREATE INDEX IF NOT EXISTS ix_predicoes_churn_cliente ON predicoes_churn (cliente_id)",
+    # Marcador de escrita: uma linha, com um contador que cada gravação concluída incrementa
+    """
+    CREATE TABLE IF NOT EXISTS predicoes_churn_carga (
+        id SMALLINT PRIMARY KEY,
+        carga BIGINT NOT NULL,
+        gravado_em TIMESTAMP NOT NULL
+    )
+    """,
+]
+
+# Ausência das tabelas fica guardada por pouco tempo: o aply_mode.py roda em outro processo
+REVERIFICAR_AUSENTE_S = 30
+_existe = {}
+_existe_lock = threading.Lock()
+
+COLUNAS_TABELA = [
+    "contrato_id",
+    "cliente_id",
+    "tipo_seguro",
+    "versao_modelo",
+    "probabilidade_cancelamento",
+    "cancelamento_previsto",
+    "hash_features",
+]
+
+# --- Leituras usadas pelas páginas (nomes de coluna iguais aos do antigo CSV renomeado) ---
+COLUNAS_PAGINAS = ["cliente_id", "contrato_id", "tipo_seguro_nome", "prob_cancelamento",
+                   "tende_cancelar", "versao_modelo", "pontuado_em"]
+_SELECT_PREDICOES = """
+SELECT
+    cliente_id,
+    contrato_id,
+    tipo_seguro AS tipo_seguro_nome,
+    probabilidade_cancelamento AS prob_cancelamento,
+    cancelamento_previsto AS tende_cancelar,
+    versao_modelo,
+    pontuado_em
+FROM predicoes_churn
+"""
+QUERIES_PREDICOES = {
+    (False, False): _SELECT_PREDICOES + "ORDER BY contrato_id;",
+    (False, True): _SELECT_PREDICOES + "WHERE cancelamento_previsto = 1 ORDER BY contrato_id;",
+    (True, False): _SELECT_PREDICOES + "WHERE tipo_seguro = :tipo ORDER BY contrato_id;",
+    (True, True): _SELECT_PREDICOES + "WHERE tipo_seguro = :tipo AND cancelamento_previsto = 1 ORDER BY contrato_id;",
+}
+
+
+def _chave_engine(engine):
+    return engine.url.render_as_string(hide_password=True)
+
+
+def _tabela_existe(engine, tabela="predicoes_churn"):
+    """Se o aply_mode.py já criou ``tabela``; a presença é memorizada por engine."""
+    chave = (_chave_engine(engine), tabela)
+    with _existe_lock:
+        existe, verificado_em = _existe.get(chave, (False, None))
+    if existe or (verificado_em is not None and time.monotonic() - verificado_em < REVERIFICAR_AUSENTE_S):
+        return existe
+    existe = inspect(engine).has_table(tabela)
+    with _existe_lock:
+        _existe[chave] = (existe, time.monotonic())
+    return existe
+
+
+def carimbo_predicoes(engine=None):
+    """
+    Contador de gravações de predicoes_churn, ou None enquanto não houver previsões.
+    Previsões gravadas antes de existir predicoes_churn_carga valem como carga 0.
+    """
+    engine = engine or get_engine()
+    if not _tabela_existe(engine):
+        return None
+    if not _tabela_existe(engine, "predicoes_churn_carga"):
+        return 0
+    with engine.connect() as conn:
+        carga = conn.execute(text("SELECT carga FROM predicoes_churn_carga WHERE id = 1")).scalar()
+    return carga or 0
+
+
+@st.cache_data(ttl=3600)
+def _buscar_predicoes(tipo_seguro, apenas_risco, carimbo):
+    # ``carimbo`` só entra na chave do cache: muda a cada gravação do aply_mode.py
+    sql = QUERIES_PREDICOES[(tipo_seguro is not None, apenas_risco)]
+    params = {"tipo": tipo_seguro} if tipo_seguro is not None else {}
+    with get_engine().connect() as conn:
+        df = pd.read_sql_query(text(sql), con=conn, params=params)
+    df["tende_cancelar"] = df["tende_cancelar"].astype(int)
+    return df
+
+
+def carregar_predicoes(tipo_seguro=None, apenas_risco=False):
+    """
+    Previsões do banco, opcionalmente só de um tipo de seguro e/ou só as em risco.
+    Cada combinação de filtros usa um texto de SQL fixo, então o plano é reaproveitado;
+    o resultado fica em cache até a próxima gravação (ver carimbo_predicoes).
+    Retorna um DataFrame vazio enquanto o aply_mode.py ainda não tiver gravado nada.
+    """
+    carimbo = carimbo_predicoes()
+    if carimbo is None:
+        return pd.DataFrame(columns=COLUNAS_PAGINAS)
+    return _buscar_predicoes(tipo_seguro, apenas_risco, carimbo)
+
+
+def ler_hashes(versao_modelo, engine=None):
+    """Chave, hash, probabilidade e previsão das previsões feitas com ``versao_modelo`` (modo incremental)."""
+    engine = engine or get_engine()
+    if not _tabela_existe(engine):
+        return pd.DataFrame(columns=["cliente_id", "contrato_id", "hash_features", "probabilidade_cancelamento",
+                                     "cancelamento_previsto"])
+    with engine.connect() as conn:
+        return pd.read_sql_query(
+            text("""
+                SELECT cliente_id, contrato_id, hash_features, probabilidade_cancelamento, cancelamento_previsto
+                FROM predicoes_churn
+                WHERE versao_modelo = :versao
+            """),
+            con=conn,
+            params={"versao": versao_modelo},
+        )
+
+
+class EscritorPredicoes:
+    """
+    Grava as previsões de uma execução do aply_mode.py na tabela predicoes_churn.
+
+    Tudo acontece numa única transação: cada lote é copiado para uma tabela temporária
+    e aplicado com INSERT ... ON CONFLICT; no fechamento, previsões de contratos que não
+    apareceram nesta execução (não estão mais ativos) são removidas.
+    """
+
+    def __init__(self, engine=None):
+        engine = engine or get_engine()
+        self.conn = engine.connect()
+        self.transacao = self.conn.begin()
+        for sql in DDL:
+            self.conn.execute(text(sql))
+        self.conn.execute(text("""
+            CREATE TEMP TABLE _predicoes_lote AS
+            SELECT contrato_id, cliente_id, tipo_seguro, versao_modelo,
+                   probabilidade_cancelamento, cancelamento_previsto, hash_features
+            FROM predicoes_churn WHERE 1 = 0
+        """))
+        self.conn.execute(text("CREATE TEMP TABLE _predicoes_vistas (contrato_id BIGINT PRIMARY KEY)"))
+
+    def escrever(self, df, alterados=None):
+        """Aplica o lote; com ``alterados`` (máscara), só essas linhas são regravadas."""
+        self.conn.execute(text("DELETE FROM _predicoes_lote"))
+        copiar_dataframe(self.conn, "_predicoes_vistas", df[["contrato_id"]].drop_duplicates())
+
+        novos = df if alterados is None else df[alterados]
+        copiar_dataframe(self.conn, "_predicoes_lote", novos[COLUNAS_TABELA].drop_duplicates("contrato_id", keep="last"))
+        self.conn.execute(text(f"""
+            INSERT INTO predicoes_churn ({", ".join(COLUNAS_TABELA)}, pontuado_em)
+            SELECT {", ".join(COLUNAS_TABELA)}, CURRENT_TIMESTAMP FROM _predicoes_lote
+            WHERE true  -- o SQLite exige um WHERE antes do ON CONFLICT em INSERT ... SELECT
+            ON CONFLICT (contrato_id) DO UPDATE SET
+                cliente_id = EXCLUDED.cliente_id,
+                tipo_seguro = EXCLUDED.tipo_seguro,
+                versao_modelo = EXCLUDED.versao_modelo,
+                probabilidade_cancelamento = EXCLUDED.probabilidade_cancelamento,
+                cancelamento_previsto = EXCLUDED.cancelamento_previsto,
+                hash_features = EXCLUDED.hash_features,
+                pontuado_em = EXCLUDED.pontuado_em
+        """))
+
+    def fechar(self):
+        self.conn.execute(text("""
+            DELETE FROM predicoes_churn
+            WHERE contrato_id NOT IN (SELECT contrato_id FROM _predicoes_vistas)
+        """))
+        # Na mesma transação: quem vê o contador novo vê também as previsões novas
+        self.conn.execute(text("""
+            INSERT INTO predicoes_churn_carga (id, carga, gravado_em) VALUES (1, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (id) DO UPDATE SET
+                carga = predicoes_churn_carga.carga + 1,
+                gravado_em = EXCLUDED.gravado_em
+        """))
+        # A conexão volta ao pool: as tabelas temporárias não podem ficar nela
+        self.conn.execute(text("DROP TABLE _predicoes_lote"))
+        self.conn.execute(text("DROP TABLE _predicoes_vistas"))
+        self.transacao.commit()
+        with _existe_lock:
+            for tabela in ("predicoes_churn", "predicoes_churn_carga"):
+                _existe[(_chave_engine(self.conn.engine), tabela)] = (True, time.monotonic())
+        self.conn.close()
+
+    def descartar(self):
+        if self.transacao.is_active:
+            self.transacao.rollback()
+        self.conn.close()
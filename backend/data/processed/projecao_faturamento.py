@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+def _numero_mes(datas):
+    """Converte datas em um inteiro de meses corridos (ano * 12 + mês), -1 para nulos."""
+    datas = pd.to_datetime(datas if isinstance(datas, pd.Series) else pd.Series(datas))
+    if datas.dt.tz is not None:
+        datas = datas.dt.tz_localize(None)
+    meses = datas.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+    numero = meses.astype(np.int64)
+    return np.where(np.isnat(meses), -1, numero), ~np.isnat(meses)
+
+
+def projetar_series(inicio, fim, meses, pesos):
+    """
+    Soma, para cada mês de ``meses``, o peso dos contratos vigentes naquele mês.
+
+    Um contrato é vigente do mês de ``inicio`` ao mês de ``fim`` (inclusive). Em vez de
+    filtrar todos os contratos mês a mês, cada contrato vira um evento +peso no mês de
+    início e -peso no mês seguinte ao fim; a soma acumulada dá a série inteira em
+    O(contratos + meses).
+
+    ``meses`` deve ser uma sequência mensal contínua (ex.: ``pd.date_range(freq='MS')``) e
+    ``pesos`` um dict nome -> array com um valor por contrato (ex.: prêmio, 1 para contagem).
+    Retorna um DataFrame com a coluna ``Data`` e uma coluna por série.
+    """
+    meses = pd.DatetimeIndex(meses)
+    resultado = pd.DataFrame({"Data": meses})
+    n_meses = len(meses)
+    if n_meses == 0:
+        for nome in pesos:
+            resultado[nome] = pd.Series(dtype=np.float64)
+        return resultado
+
+    primeiro_mes = meses[:1].to_numpy().astype("datetime64[M]").astype(np.int64)[0]
+    mes_inicio, inicio_valido = _numero_mes(inicio)
+    mes_fim, fim_valido = _numero_mes(fim)
+
+    entrada = mes_inicio - primeiro_mes
+    saida = mes_fim - primeiro_mes + 1
+    # Descarta datas nulas, contratos fora da janela e intervalos invertidos
+    validos = inicio_valido & fim_valido & (entrada < n_meses) & (saida > 0) & (entrada < saida)
+    entrada = np.clip(entrada[validos], 0, n_meses)
+    saida = np.clip(saida[validos], 0, n_meses)
+
+    for nome, peso in pesos.items():
+        peso = np.asarray(peso, dtype=np.float64)[validos]
+        eventos = (np.bincount(entrada, weights=peso, minlength=n_meses + 1)
+                   - np.bincount(saida, weights=peso, minlength=n_meses + 1))
+        resultado[nome] = np.cumsum(eventos)[:n_meses]
+    return resultado
+
+
+def projetar_faturamento_cenario(contratos, meses, mes_corte):
+    """
+    Faturamento mensal real e no cenário em que os contratos previstos cancelam.
+
+    ``contratos`` precisa de data_inicio, data_fim, status_contrato, premio_mensal e
+    is_predicted_to_cancel. Só contratos 'Ativo' entram no faturamento; a partir de
+    ``mes_corte`` o cenário exclui os contratos previstos para cancelar, antes dele
+    acompanha o real.
+    """
+    ativos = (contratos["status_contrato"] == "Ativo").to_numpy()
+    premio = contratos["premio_mensal"].fillna(0).to_numpy(dtype=np.float64)
+    previsto = contratos["is_predicted_to_cancel"].fillna(False).astype(bool).to_numpy()
+
+    df = projetar_series(
+        contratos["data_inicio"],
+        contratos["data_fim"],
+        meses,
+        {
+            "Faturamento Real": np.where(ativos, premio, 0.0),
+            "Faturamento Cenário Cancelamento": np.where(ativos & ~previsto, premio, 0.0),
+        },
+    )
+    antes_do_corte = df["Data"] < pd.Timestamp(mes_corte)
+    df.loc[antes_do_corte, "Faturamento Cenário Cancelamento"] = df.loc[antes_do_corte, "Faturamento Real"]
+    return df
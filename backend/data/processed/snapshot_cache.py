@@ -0,0 +1,135 @@
+"""
+Cache persistente em disco (Arrow/Feather) para resultados de views.
+
+Cada resultado é gravado em ``<SNAPSHOT_DIR>/<chave>-<banco>.arrow`` junto com um
+``<chave>-<banco>.meta.json`` que guarda o carimbo de versão do banco no momento da leitura.
+Na próxima carga (outro worker, ou depois de reiniciar o servidor) o arquivo é aberto
+com memory-map; o banco só é consultado para uma verificação barata de versão e,
+se nada mudou, nenhum dado trafega pela rede. ``<banco>`` é um hash da URL da engine:
+Postgres e o banco local (DB_BACKEND=duckdb) usam o mesmo diretório sem que um
+processo leia o snapshot do outro banco.
+
+O carimbo de versão no Postgres vem dos contadores de pg_stat_user_tables. É uma
+aproximação, não um marcador de mudança: as estatísticas são publicadas de forma
+assíncrona (uma escrita já confirmada pode só aparecer no carimbo depois do intervalo de
+envio das estatísticas de cada sessão), contam também transações abortadas e voltam a
+zero com pg_stat_reset ou depois de uma queda do servidor. Então um snapshot pode ficar
+desatualizado por até esse intervalo mais ``REVALIDAR_APOS_S``; um reset que coincida com
+o mesmo total de antes também passaria despercebido. Nos outros bancos não há carimbo e o
+snapshot é relido do banco a cada ``REVALIDAR_APOS_S``.
+
+Sem pyarrow instalado o cache fica desligado e tudo vai direto ao banco.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow é opcional
+    pa = None
+    feather = None
+
+DIRETORIO_SNAPSHOTS = os.getenv(
+    "SNAPSHOT_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cache")),
+)
+# Dentro desta janela (s) um snapshot é usado sem nem consultar a versão no banco
+REVALIDAR_APOS_S = float(os.getenv("SNAPSHOT_REVALIDAR_APOS", 60))
+
+logger = logging.getLogger(__name__)
+
+# Soma dos contadores de escrita de todas as tabelas: muda a cada INSERT/UPDATE/DELETE,
+# com o atraso e as ressalvas das estatísticas descritos no topo do módulo
+QUERY_VERSAO_POSTGRES = """
+SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)::bigint
+FROM pg_stat_user_tables
+"""
+
+
+def versao_banco(engine):
+    """
+    Carimbo barato de versão do banco, ou None se o dialeto não tiver um. Aproximado:
+    pode ficar atrás de escritas recentes (ver o topo do módulo).
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    with engine.connect() as conn:
+        return int(conn.execute(text(QUERY_VERSAO_POSTGRES)).scalar())
+
+
+def _caminhos(chave, engine):
+    # A senha fica fora do hash: trocar a senha não muda os dados do banco
+    url = engine.url.render_as_string(hide_password=True)
+    banco = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+    nome = re.sub(r"[^A-Za-z0-9_.-]", "_", chave) + "-" + banco
+    base = os.path.join(DIRETORIO_SNAPSHOTS, nome)
+    return base + ".arrow", base + ".meta.json"
+
+
+def _gravar_atomico(caminho, escrever):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _ler_meta(caminho_meta):
+    try:
+        with open(caminho_meta, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_meta(caminho_meta, versao):
+    def escrever(tmp):
+        with open(tmp, "w") as f:
+            json.dump({"versao": versao, "verificado_em": time.time()}, f)
+    _gravar_atomico(caminho_meta, escrever)
+
+
+def _ler_arrow(caminho_arrow):
+    tabela = feather.read_table(caminho_arrow, memory_map=True)
+    return tabela.to_pandas(split_blocks=True)
+
+
+def carregar_com_snapshot(chave, buscar, engine):
+    """
+    Retorna o DataFrame de ``chave`` a partir do snapshot em disco, se ainda válido;
+    senão chama ``buscar()`` (que consulta o banco) e grava um snapshot novo.
+    """
+    if pa is None:
+        return buscar()
+
+    caminho_arrow, caminho_meta = _caminhos(chave, engine)
+    meta = _ler_meta(caminho_meta)
+    snapshot_existe = meta is not None and os.path.exists(caminho_arrow)
+
+    if snapshot_existe and time.time() - meta.get("verificado_em", 0) < REVALIDAR_APOS_S:
+        return _ler_arrow(caminho_arrow)
+
+    versao = versao_banco(engine)
+    if snapshot_existe and versao is not None and meta.get("versao") == versao:
+        _gravar_meta(caminho_meta, versao)
+        return _ler_arrow(caminho_arrow)
+
+    df = buscar()
+    try:
+        os.makedirs(DIRETORIO_SNAPSHOTS, exist_ok=True)
+        # Sem compressão para que a leitura possa ser feita direto do memory-map
+        _gravar_atomico(caminho_arrow, lambda tmp: feather.write_feather(df, tmp, compression="uncompressed"))
+        _gravar_meta(caminho_meta, versao)
+    except (OSError, pa.ArrowException) as e:
+        # Colunas que o Arrow não sabe serializar ou disco sem permissão: segue sem snapshot
+        logger.warning("Snapshot de '%s' não gravado: %s", chave, e)
+    return df
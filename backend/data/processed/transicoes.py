@@ -0,0 +1,42 @@
+import streamlit as st
+import pandas as pd
+from .datasets import carregar_dataset, TTL_DATASETS
+
+COLUNAS_MATRIZ = ['From', 'To', 'Count']
+
+
+def construir_matriz_transicoes(df_contratos):
+    """
+    Conta as trocas de tipo de seguro entre contratos consecutivos de cada cliente.
+
+    Ordena uma vez por (cliente_id, data_inicio) e usa groupby().shift(-1) para obter o
+    tipo do contrato seguinte, então todas as transições de todos os tipos saem numa
+    única passada. Retorna um DataFrame com colunas From, To e Count (só From != To).
+    """
+    colunas = ['cliente_id', 'data_inicio', 'tipo_seguro_nome']
+    if df_contratos.empty or not all(col in df_contratos.columns for col in colunas):
+        return pd.DataFrame(columns=COLUNAS_MATRIZ)
+
+    df = df_contratos[colunas].copy()
+    df['data_inicio'] = pd.to_datetime(df['data_inicio'])
+    # mergesort é estável: contratos com a mesma data mantêm a ordem de chegada
+    df = df.sort_values(by=['cliente_id', 'data_inicio'], kind='mergesort')
+
+    tipo_atual = df['tipo_seguro_nome']
+    tipo_seguinte = df.groupby('cliente_id', sort=False)['tipo_seguro_nome'].shift(-1)
+
+    houve_troca = tipo_atual.notna() & tipo_seguinte.notna() & (tipo_atual != tipo_seguinte)
+    transicoes = pd.DataFrame({
+        'From': tipo_atual[houve_troca].to_numpy(),
+        'To': tipo_seguinte[houve_troca].to_numpy(),
+    })
+    if transicoes.empty:
+        return pd.DataFrame(columns=COLUNAS_MATRIZ)
+
+    return transicoes.groupby(['From', 'To']).size().reset_index(name='Count')
+
+
+@st.cache_data(ttl=TTL_DATASETS)
+def carregar_matriz_transicoes():
+    """Devolve a matriz de transições de todos os tipos, a partir do dataset compartilhado (com cache)."""
+    return construir_matriz_transicoes(carregar_dataset('v_contratos_detalhados'))
@@ -5,7 +5,18 @@ import pandas as pd
 import plotly.express as px
 import numpy as np
 import altair as alt
-from backend.data.processed.loading_views import carregar_view
+import json
+import urllib.request
+import urllib.error
+from backend.data.processed.datasets import indice_dataset
+from backend.data.processed.loading_views import carregar_query_parametrizada
+from backend.data.processed.indice_nomes import IndiceNomes, normalizar_nome
+from backend.data.processed.indice_bitmap import IndiceBitmap
+from backend.data.processed.filtros_clientes import (
+    COLUNAS_LISTAGEM, FILTROS_FAIXA, FILTROS_LISTA, TAMANHO_PAGINA,
+    buscar_pagina_clientes, busca_sem_acento, colunas_clientes, condicoes_filtros, contagem_clientes,
+    contar_clientes, exportar_clientes, perfil_por_faixa_etaria, resumo_clientes,
+)
 import time
 
 
@@ -20,22 +31,45 @@ raiz_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 if raiz_projeto not in sys.path:
     sys.path.insert(0, raiz_projeto)
 
-# Função para carregar dados com cache
-@st.cache_data(ttl=300)
-def load_data():
-    """Carrega os dados com cache para evitar recarregamentos"""
-    df_perfil = carregar_view('v_perfil_cliente_enriquecido')
-    df_detalhados = carregar_view('v_contratos_detalhados')
-    return df_perfil, df_detalhados
+# Serviço de score online (backend/data/models/servico_score.py)
+SCORE_SERVICE_URL = os.getenv("SCORE_SERVICE_URL", "http://127.0.0.1:8765")
+
+# Onde os filtros da listagem rodam: "banco" (WHERE + LIMIT/OFFSET, só a página volta)
+# ou "memoria" (apply_filters sobre o dataset inteiro, carregado só nesse modo).
+# KPIs, gráficos e limites dos filtros vêm de agregações no banco nos dois modos.
+MODO_FILTRO = os.getenv("CLIENTES_MODO_FILTRO", "banco").lower()
+
+# Features dos contratos ativos de um cliente, já no formato que o modelo espera
+QUERY_FEATURES_CLIENTE = "SELECT * FROM v_clientes_para_predicao_final WHERE cliente_id = :cliente_id;"
+
 
 # Função para aplicar filtros
-def apply_filters(df, filtros):
-    """Aplica os filtros no DataFrame"""
+def apply_filters(df, filtros, indices=None):
+    """
+    Aplica os filtros no DataFrame. Com ``indices`` (índice de nomes, índice de bitmaps)
+    do dataset compartilhado, responde pelos índices em vez de varrer as colunas.
+    """
+    if indices is not None:
+        indice_nomes, indice_bitmap = indices
+        condicoes = condicoes_filtros(filtros)
+        if not filtros['nome']:
+            posicoes = indice_bitmap.selecionar(condicoes)
+        else:
+            # Começa pelo conjunto menor: os nomes filtram as condições, ou o contrário
+            nomes = indice_nomes.buscar(filtros['nome'])
+            if len(nomes) <= indice_bitmap.estimar(condicoes):
+                posicoes = indice_bitmap.selecionar(condicoes, candidatas=nomes)
+            else:
+                posicoes = np.intersect1d(indice_bitmap.selecionar(condicoes), nomes, assume_unique=True)
+        return df.iloc[posicoes]
+
     df_filtrado = df.copy()
-    
+
     if 'nome' in df_filtrado.columns and filtros['nome']:
-        search_term = filtros['nome'].lower()
-        df_filtrado = df_filtrado[df_filtrado['nome'].str.lower().str.startswith(search_term)]
+        # Mesma chave do índice de nomes e do nome_busca do banco: minúsculas e sem acento
+        search_term = normalizar_nome(filtros['nome'])
+        nomes = df_filtrado['nome'].astype('string').map(normalizar_nome, na_action='ignore')
+        df_filtrado = df_filtrado[nomes.str.startswith(search_term).fillna(False).astype(bool)]
     
     if 'genero' in df_filtrado.columns and filtros['genero']:
         df_filtrado = df_filtrado[df_filtrado['genero'].isin(filtros['genero'])]
@@ -69,22 +103,99 @@ def apply_filters(df, filtros):
     
     return df_filtrado
 
-# Função para resetar filtros
-def resetar_filtros(df_perfil):
-    """Reseta todos os filtros para seus valores padrão"""
-    defaults = {
+def indices_perfil():
+    """
+    (perfil dos clientes, (índice de nomes, índice de bitmaps)): o DataFrame e os dois
+    índices vêm da mesma carga do dataset compartilhado (só usado no modo em memória)
+    """
+    def construir(df):
+        return (
+            IndiceNomes(df['nome']),
+            IndiceBitmap(df, [coluna for coluna, _ in FILTROS_LISTA], [coluna for coluna, _, _ in FILTROS_FAIXA]),
+        )
+    return indice_dataset('v_perfil_cliente_enriquecido', 'perfil_clientes', construir)
+
+def filtrar_clientes(filtros, pagina, tamanho_pagina=TAMANHO_PAGINA):
+    """(página de clientes filtrados, total filtrado) no modo de filtro configurado"""
+    if MODO_FILTRO == "memoria":
+        df_perfil, indices = indices_perfil()
+        df_filtrado = apply_filters(df_perfil, filtros, indices)
+        if 'cliente_id' in df_filtrado.columns:
+            df_filtrado = df_filtrado.sort_values('cliente_id')
+        inicio = (pagina - 1) * tamanho_pagina
+        return df_filtrado.iloc[inicio:inicio + tamanho_pagina], len(df_filtrado)
+    return buscar_pagina_clientes(filtros, pagina, tamanho_pagina), contar_clientes(filtros)
+
+def exportar_filtrados(filtros):
+    """Todos os clientes filtrados, para o CSV de exportação"""
+    if MODO_FILTRO == "memoria":
+        df_perfil, indices = indices_perfil()
+        return apply_filters(df_perfil, filtros, indices)
+    return exportar_clientes(filtros)
+
+# Colunas de features do modelo carregado no serviço de score (lidas do manifesto do artefato)
+@st.cache_data(ttl=60)
+def colunas_modelo_servico(timeout=3.0):
+    """Colunas que o modelo em uso no serviço de score espera (GET /saude)"""
+    with urllib.request.urlopen(f"{SCORE_SERVICE_URL}/saude", timeout=timeout) as resposta:
+        return json.loads(resposta.read())["colunas"]
+
+# Função para pontuar os contratos de um cliente no serviço de score
+def consultar_risco_online(df_features, timeout=3.0):
+    """Envia as features ao serviço de score e retorna as probabilidades (uma por linha)"""
+    colunas = colunas_modelo_servico(timeout)
+    corpo = json.dumps({"clientes": json.loads(df_features[colunas].to_json(orient="records"))})
+    requisicao = urllib.request.Request(
+        f"{SCORE_SERVICE_URL}/score",
+        data=corpo.encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+        return json.loads(resposta.read())
+
+# Função para ler o motivo de uma resposta de erro do serviço de score
+def detalhe_erro_servico(erro):
+    """Status e mensagem de um HTTPError do serviço (o corpo é {"erro": ...} ou texto)"""
+    corpo = erro.read().decode("utf-8", errors="replace")
+    try:
+        corpo = json.loads(corpo).get("erro", corpo)
+    except (ValueError, AttributeError):
+        pass
+    return f"HTTP {erro.code}: {corpo or erro.reason}"
+
+# Opções de um filtro de lista (valores distintos da coluna, agregados no banco)
+def opcoes_filtro(coluna):
+    """Valores não nulos da coluna, do mais frequente ao menos; vazio se a view não tem a coluna"""
+    if coluna not in colunas_clientes():
+        return []
+    return contagem_clientes(coluna)[coluna].tolist()
+
+# Função para montar os filtros padrão
+def filtros_padrao():
+    """Todas as opções marcadas e as faixas de ponta a ponta (mínimo/máximo vindos do banco)"""
+    resumo = resumo_clientes()
+
+    def limite(chave, converter, padrao):
+        return converter(resumo[chave]) if resumo.get(chave) is not None else padrao
+
+    return {
         'nome': '',
-        'genero': list(df_perfil['genero'].unique()) if 'genero' in df_perfil.columns else [],
-        'idade_min': int(df_perfil['idade_atual'].min()) if 'idade_atual' in df_perfil.columns else 0,
-        'idade_max': int(df_perfil['idade_atual'].max()) if 'idade_atual' in df_perfil.columns else 100,
-        'educacao': list(df_perfil['nivel_educacional'].unique()) if 'nivel_educacional' in df_perfil.columns else [],
-        'dependentes_min': int(df_perfil['qtd_dependente'].min()) if 'qtd_dependente' in df_perfil.columns else 0,
-        'dependentes_max': int(df_perfil['qtd_dependente'].max()) if 'qtd_dependente' in df_perfil.columns else 10,
-        'contratos_min': int(df_perfil['total_contratos'].min()) if 'total_contratos' in df_perfil.columns else 0,
-        'contratos_max': int(df_perfil['total_contratos'].max()) if 'total_contratos' in df_perfil.columns else 10,
-        'renda_min': float(df_perfil['renda_mensal'].min()) if 'renda_mensal' in df_perfil.columns else 0,
-        'renda_max': float(df_perfil['renda_mensal'].max()) if 'renda_mensal' in df_perfil.columns else 10000
+        'genero': opcoes_filtro('genero'),
+        'idade_min': limite('idade_min', int, 0),
+        'idade_max': limite('idade_max', int, 100),
+        'educacao': opcoes_filtro('nivel_educacional'),
+        'dependentes_min': limite('dependentes_min', int, 0),
+        'dependentes_max': limite('dependentes_max', int, 10),
+        'contratos_min': limite('contratos_min', int, 0),
+        'contratos_max': limite('contratos_max', int, 10),
+        'renda_min': limite('renda_min', float, 0),
+        'renda_max': limite('renda_max', float, 10000)
     }
+
+# Função para resetar filtros
+def resetar_filtros():
+    """Reseta todos os filtros para seus valores padrão"""
+    defaults = filtros_padrao()
     
     # Atualiza cada filtro individualmente no session_state
     for key, value in defaults.items():
@@ -99,24 +210,14 @@ def render():
     load_global_css()
 
     try:
-        # Carrega os dados com cache
-        df_perfil, df_detalhados = load_data()
+        # Agregados do perfil dos clientes (no banco, com cache); a view inteira só no modo em memória
+        colunas_perfil = colunas_clientes()
+        resumo = resumo_clientes()
+        total_clientes = resumo['total']
 
         # Inicialização dos filtros
         if 'filtros' not in st.session_state:
-            defaults = {
-                'nome': '',
-                'genero': list(df_perfil['genero'].unique()) if 'genero' in df_perfil.columns else [],
-                'idade_min': int(df_perfil['idade_atual'].min()) if 'idade_atual' in df_perfil.columns else 0,
-                'idade_max': int(df_perfil['idade_atual'].max()) if 'idade_atual' in df_perfil.columns else 100,
-                'educacao': list(df_perfil['nivel_educacional'].unique()) if 'nivel_educacional' in df_perfil.columns else [],
-                'dependentes_min': int(df_perfil['qtd_dependente'].min()) if 'qtd_dependente' in df_perfil.columns else 0,
-                'dependentes_max': int(df_perfil['qtd_dependente'].max()) if 'qtd_dependente' in df_perfil.columns else 10,
-                'contratos_min': int(df_perfil['total_contratos'].min()) if 'total_contratos' in df_perfil.columns else 0,
-                'contratos_max': int(df_perfil['total_contratos'].max()) if 'total_contratos' in df_perfil.columns else 10,
-                'renda_min': float(df_perfil['renda_mensal'].min()) if 'renda_mensal' in df_perfil.columns else 0,
-                'renda_max': float(df_perfil['renda_mensal'].max()) if 'renda_mensal' in df_perfil.columns else 10000
-            }
+            defaults = filtros_padrao()
             
             # Inicializa cada filtro individualmente
             for key, value in defaults.items():
@@ -129,18 +230,18 @@ def render():
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            kpi_custom("fas fa-users", f"{len(df_perfil):,}", "Clientes Totais")
+            kpi_custom("fas fa-users", f"{total_clientes:,}", "Clientes Totais")
 
         with col2:
-            media_dep = df_perfil['qtd_dependente'].mean() if 'qtd_dependente' in df_perfil.columns else 0.0
+            media_dep = resumo.get('media_dependentes') or 0.0
             kpi_custom("fas fa-child", f"{media_dep:.1f}", "Média Dependentes")
 
         with col3:
-            multi_contr = len(df_perfil[df_perfil['total_contratos'] > 1]) if 'total_contratos' in df_perfil.columns else 0
+            multi_contr = resumo.get('multi_contratos', 0)
             kpi_custom("fas fa-file-contract", f"{multi_contr}", "Clientes +1 Contrato")
 
         with col4:
-            renda_media = f"R${df_perfil['renda_mensal'].mean():,.2f}" if 'renda_mensal' in df_perfil.columns and not df_perfil['renda_mensal'].empty else "R$ 0,00"
+            renda_media = f"R${resumo['renda_media']:,.2f}" if resumo.get('renda_media') is not None else "R$ 0,00"
             kpi_custom("fas fa-money-bill-wave", renda_media, "Renda Média")
 
         st.markdown("---")
@@ -152,9 +253,8 @@ def render():
             # Card 1: Gráfico de Escolaridade
             with st.container(border=True):
                 st.markdown("### Escolaridade dos Clientes")
-                if 'nivel_educacional' in df_perfil.columns and not df_perfil.empty:
-                    df_escolaridade = df_perfil['nivel_educacional'].value_counts().reset_index()
-                    df_escolaridade.columns = ['nivel_educacional', 'count']
+                if 'nivel_educacional' in colunas_perfil and total_clientes:
+                    df_escolaridade = contagem_clientes('nivel_educacional')
                     
                     fig = px.bar(
                         df_escolaridade,
@@ -174,14 +274,9 @@ def render():
             # Card 2: Gráfico Faixa Etária x Gênero
             with st.container(border=True):
                 st.markdown("### Faixa Etária x Gênero")
-                if 'idade_atual' in df_perfil.columns and 'genero' in df_perfil.columns and not df_perfil.empty:
-                    df_perfil['faixa_etaria'] = pd.cut(
-                        df_perfil['idade_atual'],
-                        bins=[18, 30, 40, 50, 60, 100],
-                        labels=["18-30", "31-40", "41-50", "51-60", "60+"],
-                        right=False
-                    )
-                    df_faixa_genero = df_perfil.groupby(['faixa_etaria', 'genero']).size().reset_index(name='count')
+                if 'idade_atual' in colunas_perfil and 'genero' in colunas_perfil and total_clientes:
+                    df_faixas = perfil_por_faixa_etaria()
+                    df_faixa_genero = df_faixas.dropna(subset=['genero'])[['faixa_etaria', 'genero', 'count']]
                     
                     color_map = {'F': "#F561AB", 'M': "#5AB6F8", 'O': "#A35AE7"}
                     
@@ -204,8 +299,6 @@ def render():
             with st.container(border=True):
                 st.markdown("### Situação Clientes")
                 
-                total_clientes = len(df_perfil)
-                
                 if total_clientes == 0:
                     st.warning("Não há dados de clientes para exibir a situação.")
                     ativos_percent = 0
@@ -214,13 +307,13 @@ def render():
                     inativos_sem_risco_percent = 0
                 else:
                     # Tenta calcular baseado na coluna 'status_cliente' se ela existe
-                    if 'status_cliente' in df_perfil.columns:
-                        total_clientes_situacao = df_perfil['status_cliente'].count() 
+                    if 'situacao' in resumo:
+                        total_clientes_situacao = resumo['com_situacao']
 
                         if total_clientes_situacao > 0:
-                            count_ativos = df_perfil[df_perfil['status_cliente'] == 'Ativo'].shape[0]
-                            count_inativos = df_perfil[df_perfil['status_cliente'] == 'Inativo'].shape[0]
-                            count_em_risco = df_perfil[df_perfil['status_cliente'] == 'Em risco'].shape[0]
+                            count_ativos = resumo['situacao']['Ativo']
+                            count_inativos = resumo['situacao']['Inativo']
+                            count_em_risco = resumo['situacao']['Em risco']
 
                             ativos_percent = round((count_ativos / total_clientes_situacao) * 100, 1)
                             em_risco_percent = round((count_em_risco / total_clientes_situacao) * 100, 1)
@@ -288,8 +381,10 @@ def render():
             # Card 4: Gráfico de Renda por Faixa Etária
             with st.container(border=True):
                 st.markdown("### Renda por Faixa Etária")
-                if 'faixa_etaria' in df_perfil.columns and 'renda_mensal' in df_perfil.columns and not df_perfil.empty:
-                    df_renda_idade = df_perfil.groupby('faixa_etaria')['renda_mensal'].mean().reset_index()
+                if 'idade_atual' in colunas_perfil and 'renda_mensal' in colunas_perfil and total_clientes:
+                    df_renda_idade = perfil_por_faixa_etaria().groupby('faixa_etaria', as_index=False)[
+                        ['renda_total', 'com_renda']].sum()
+                    df_renda_idade['renda_mensal'] = df_renda_idade['renda_total'] / df_renda_idade['com_renda']
                     fig = px.bar(
                         df_renda_idade,
                         x='faixa_etaria',
@@ -315,23 +410,23 @@ def render():
             
             with st.form(key='filters_form'):
                 # Widgets de filtro - agora usando os valores individuais do session_state
-                if 'nome' in df_perfil.columns:
+                if 'nome' in colunas_perfil:
                     st.session_state.filtros['nome'] = st.text_input(
                         "Buscar por nome",
                         value=st.session_state.get('filter_nome', ''),
                         placeholder="Digite o início do nome..."
                     )
                 
-                if 'genero' in df_perfil.columns and not df_perfil['genero'].empty:
+                if 'genero' in colunas_perfil:
                     st.session_state.filtros['genero'] = st.multiselect(
                         "Gênero",
-                        options=df_perfil['genero'].unique(),
-                        default=st.session_state.get('filter_genero', list(df_perfil['genero'].unique()))
+                        options=opcoes_filtro('genero'),
+                        default=st.session_state.get('filter_genero', opcoes_filtro('genero'))
                     )
                 
-                if 'idade_atual' in df_perfil.columns and not df_perfil['idade_atual'].empty:
-                    idade_min_default = int(df_perfil['idade_atual'].min())
-                    idade_max_default = int(df_perfil['idade_atual'].max())
+                if resumo.get('idade_min') is not None:
+                    idade_min_default = int(resumo['idade_min'])
+                    idade_max_default = int(resumo['idade_max'])
                     idade_min, idade_max = st.slider(
                         "Faixa de Idade",
                         min_value=idade_min_default,
@@ -346,16 +441,16 @@ def render():
                         'idade_max': idade_max
                     })
                 
-                if 'nivel_educacional' in df_perfil.columns and not df_perfil['nivel_educacional'].empty:
+                if 'nivel_educacional' in colunas_perfil:
                     st.session_state.filtros['educacao'] = st.multiselect(
                         "Nível Educacional",
-                        options=df_perfil['nivel_educacional'].unique(),
-                        default=st.session_state.get('filter_educacao', list(df_perfil['nivel_educacional'].unique()))
+                        options=opcoes_filtro('nivel_educacional'),
+                        default=st.session_state.get('filter_educacao', opcoes_filtro('nivel_educacional'))
                     )
                 
-                if 'qtd_dependente' in df_perfil.columns and not df_perfil['qtd_dependente'].empty:
-                    dep_min_default = int(df_perfil['qtd_dependente'].min())
-                    dep_max_default = int(df_perfil['qtd_dependente'].max())
+                if resumo.get('dependentes_min') is not None:
+                    dep_min_default = int(resumo['dependentes_min'])
+                    dep_max_default = int(resumo['dependentes_max'])
                     dep_min, dep_max = st.slider(
                         "Número de Dependentes",
                         min_value=dep_min_default,
@@ -370,9 +465,9 @@ def render():
                         'dependentes_max': dep_max
                     })
                 
-                if 'total_contratos' in df_perfil.columns and not df_perfil['total_contratos'].empty:
-                    contratos_min_default = int(df_perfil['total_contratos'].min())
-                    contratos_max_default = int(df_perfil['total_contratos'].max())
+                if resumo.get('contratos_min') is not None:
+                    contratos_min_default = int(resumo['contratos_min'])
+                    contratos_max_default = int(resumo['contratos_max'])
                     contratos_min, contratos_max = st.slider(
                         "Total de Contratos",
                         min_value=contratos_min_default,
@@ -387,9 +482,9 @@ def render():
                         'contratos_max': contratos_max
                     })
 
-                if 'renda_mensal' in df_perfil.columns and not df_perfil['renda_mensal'].empty:
-                    renda_min_default = float(df_perfil['renda_mensal'].min())
-                    renda_max_default = float(df_perfil['renda_mensal'].max())
+                if resumo.get('renda_min') is not None:
+                    renda_min_default = float(resumo['renda_min'])
+                    renda_max_default = float(resumo['renda_max'])
                     renda_min, renda_max = st.slider(
                         "Renda Mensal (R$)",
                         min_value=renda_min_default,
@@ -410,30 +505,86 @@ def render():
                     aplicar_filtros = st.form_submit_button("Aplicar Filtros")
                 with col2:
                     if st.form_submit_button("🔄 Resetar"):
-                        resetar_filtros(df_perfil)
-
-        # Aplica os filtros
-        df_filtrado = apply_filters(df_perfil, st.session_state.filtros)
+                        resetar_filtros()
+
+        # Volta para a primeira página sempre que os filtros mudam
+        assinatura_filtros = repr(sorted(st.session_state.filtros.items()))
+        if st.session_state.get('assinatura_filtros') != assinatura_filtros:
+            st.session_state.assinatura_filtros = assinatura_filtros
+            st.session_state.pagina_clientes = 1
+
+        # Aplica os filtros (só a página visível é buscada)
+        pagina = st.session_state.get('pagina_clientes', 1)
+        df_pagina, total_filtrado = filtrar_clientes(st.session_state.filtros, pagina)
+        total_paginas = max(1, -(-total_filtrado // TAMANHO_PAGINA))
+        # A página guardada pode não existir mais (os dados mudaram desde a última interação):
+        # traz para 1..total_paginas antes do number_input, que recusa valor acima do máximo
+        if not 1 <= pagina <= total_paginas:
+            st.session_state.pagina_clientes = min(max(1, pagina), total_paginas)
+            df_pagina, total_filtrado = filtrar_clientes(st.session_state.filtros, st.session_state.pagina_clientes)
+        if MODO_FILTRO != "memoria" and st.session_state.filtros.get('nome') and not busca_sem_acento():
+            st.warning("A busca por nome está diferenciando acentos: o banco não tem a função nome_busca. "
+                       "Rode python -m backend.data.processed.ingestao para criá-la.")
 
         # Exibição dos resultados
-        st.info(f"📊 {len(df_filtrado)} clientes encontrados")
-        
-        cols_to_show = [col for col in [
-            'nome', 'genero', 'idade_atual', 'nivel_educacional',
-            'qtd_dependente', 'total_contratos', 'renda_mensal'
-        ] if col in df_filtrado.columns]
-
-        if not df_filtrado.empty and cols_to_show:
-            st.dataframe(df_filtrado[cols_to_show].head(5000), use_container_width=True, height=400)
-            st.download_button(
-                "📥 Exportar Dados",
-                data=df_filtrado[cols_to_show].to_csv(index=False).encode('utf-8'),
-                file_name="clientes_filtrados.csv",
-                mime="text/csv"
-            )
+        st.info(f"📊 {total_filtrado} clientes encontrados")
+
+        cols_to_show = [col for col in COLUNAS_LISTAGEM if col != 'cliente_id' and col in df_pagina.columns]
+
+        if total_filtrado and cols_to_show:
+            st.dataframe(df_pagina[cols_to_show], use_container_width=True, height=400, hide_index=True)
+            col_pagina, col_exportar = st.columns([1, 3])
+            with col_pagina:
+                st.number_input(
+                    f"Página (de {total_paginas})", min_value=1, max_value=total_paginas,
+                    step=1, key='pagina_clientes'
+                )
+            with col_exportar:
+                # A exportação traz todos os filtrados: só consulta quando pedida
+                if st.button("📥 Preparar Exportação"):
+                    df_exportar = exportar_filtrados(st.session_state.filtros)
+                    st.download_button(
+                        "📥 Exportar Dados",
+                        data=df_exportar[cols_to_show].to_csv(index=False).encode('utf-8'),
+                        file_name="clientes_filtrados.csv",
+                        mime="text/csv"
+                    )
         else:
             st.info("Nenhum dado filtrado para exibir ou colunas ausentes.")
 
+        # ========== RISCO DE CANCELAMENTO AO VIVO ==========
+        st.markdown("---")
+        st.markdown("### Risco de Cancelamento ao Vivo")
+        with st.container(border=True):
+            cliente_id_risco = st.number_input("ID do cliente", min_value=1, step=1, value=None,
+                                               placeholder="Digite o ID do cliente...")
+            if cliente_id_risco is not None:
+                df_features_cliente = carregar_query_parametrizada(
+                    QUERY_FEATURES_CLIENTE, {"cliente_id": int(cliente_id_risco)}
+                )
+                if df_features_cliente.empty:
+                    st.info("Cliente sem contratos ativos para pontuar.")
+                else:
+                    try:
+                        resposta = consultar_risco_online(df_features_cliente)
+                    except urllib.error.HTTPError as e:
+                        # O serviço respondeu, mas recusou ou falhou ao pontuar (400/500/503)
+                        st.error(f"Serviço de score recusou a requisição ({detalhe_erro_servico(e)}).")
+                    except (urllib.error.URLError, OSError) as e:
+                        st.warning(f"Serviço de score indisponível em {SCORE_SERVICE_URL} ({e}). "
+                                   "Inicie com: python backend/data/models/servico_score.py")
+                    else:
+                        df_risco = pd.DataFrame({
+                            'Contrato': df_features_cliente['id_contrato_legado'],
+                            'Tipo de Seguro': df_features_cliente['tipo_seguro'],
+                            'Prob. Cancelamento': [f"{p:.2%}" for p in resposta['probabilidades']],
+                            'Tende a Cancelar': ['Sim' if c else 'Não' for c in resposta['cancelamento_previsto']],
+                        })
+                        kpi_custom("fas fa-exclamation-triangle", f"{max(resposta['probabilidades']):.1%}",
+                                   "Maior risco entre os contratos do cliente")
+                        st.dataframe(df_risco, use_container_width=True, hide_index=True)
+                        st.caption(f"Modelo {resposta['versao_modelo']} · threshold {resposta['threshold']}")
+
     except Exception as e:
         st.error(f"Erro: {str(e)}")
 
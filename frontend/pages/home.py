@@ -15,42 +15,16 @@ if PROJECT_ROOT not in sys.path:
 
 # --- Importações reais do backend ---
 
-from backend.data.processed.loading_views import carregar_view, carregar_query
+from backend.data.processed.loading_views import carregar_view, carregar_query, carregar_query_parametrizada
+from backend.data.processed.datasets import carregar_dataset
+from backend.data.processed.faturamento_mensal import (
+    QUERY_FATURAMENTO_MENSAL, QUERY_FATURAMENTO_MENSAL_DIRETO, existe_faturamento_mensal,
+)
+from backend.data.processed.projecao_faturamento import projetar_faturamento_cenario
+from backend.data.processed.predicoes import carregar_predicoes
 from frontend.styles.css_loader import load_global_css # Importante!
 from frontend.utils.components import kpi_custom
 
-# --- Função para carregar dados de predição (assume que o CSV existe e é válido) ---
-@st.cache_data
-def carregar_dados_predicao():
-    caminho_csv = os.path.join(PROJECT_ROOT, "frontend", "pages", "clientes_com_risco_cancelamento.csv")
-    
-    if not os.path.exists(caminho_csv):
-        st.error(f"Erro: Arquivo CSV de predição não encontrado em: {caminho_csv}. Sem este arquivo, os dados de predição não podem ser carregados.")
-        return pd.DataFrame() # Retorna DataFrame vazio se o arquivo não existir.
-
-    df = pd.read_csv(caminho_csv)
-    # Validar a presença das colunas críticas do CSV
-    required_cols_csv = ['id_cliente', 'tende_cancelar', 'tipo_seguro']
-    if not all(col in df.columns for col in required_cols_csv):
-        st.error(f"O arquivo CSV '{os.path.basename(caminho_csv)}' não contém todas as colunas necessárias para o dashboard: {', '.join(required_cols_csv)}. Verifique o arquivo.")
-        return pd.DataFrame() # Retorna DataFrame vazio se colunas essenciais estiverem faltando.
-    
-    # Renomear colunas para consistência com o restante do código (se necessário para joins ou lógica)
-    df.rename(columns={'id_cliente': 'cliente_id', 'tipo_seguro': 'tipo_seguro_nome'}, inplace=True)
-    
-    # Certificar que 'tende_cancelar' é numérica (0 ou 1)
-    if 'tende_cancelar' in df.columns:
-        df['tende_cancelar'] = pd.to_numeric(df['tende_cancelar'], errors='coerce').fillna(0).astype(int)
-    
-    # Adicionar 'prob_cancelamento' se não existir (para evitar erro no display_df_tab se o CSV não tiver essa coluna)
-    # No seu CSV, você tem 'prob_cancelamento', mas é bom garantir.
-    if 'prob_cancelamento' not in df.columns:
-        df['prob_cancelamento'] = np.nan # Ou um valor padrão razoável, se souber
-        st.warning("Coluna 'prob_cancelamento' não encontrada no CSV. Exibindo como NaN.")
-
-    return df
-
-
 # --- Componente Customizado KPI ---
 
 
@@ -59,6 +33,19 @@ def carregar_dados_predicao():
 # O CSS global agora será carregado pela função load_global_css().
 
 
+def marcar_contratos_previstos(df_contratos, df_predicoes):
+    """
+    Adiciona ``is_predicted_to_cancel`` aos contratos. Uma previsão por contrato (contrato_id
+    é a chave de predicoes_churn): busca um-para-um pelo índice, sem merge, então cada contrato
+    mantém exatamente uma linha; contratos sem previsão ficam como False.
+    """
+    flag_por_contrato = df_predicoes.set_index('contrato_id')['tende_cancelar']
+    df_contratos['is_predicted_to_cancel'] = (
+        df_contratos['contrato_id'].map(flag_por_contrato).fillna(0).astype(bool)
+    )
+    return df_contratos
+
+
 # --- Função Principal de Renderização do Dashboard ---
 def render():
     # --- CHAME A FUNÇÃO PARA CARREGAR O CSS GLOBAL AQUI ---
@@ -103,7 +90,10 @@ def render():
     df_churn_rate = carregar_query(query_churn_rate)
     churn_rate = df_churn_rate['churn_global'].iloc[0] if not df_churn_rate.empty else 0.0
 
-    df_predicoes = carregar_dados_predicao()
+    # Previsões gravadas pelo aply_mode.py na tabela predicoes_churn
+    df_predicoes = carregar_predicoes()
+    if df_predicoes.empty:
+        st.warning("Nenhuma previsão encontrada na tabela predicoes_churn. Rode backend/data/models/aply_mode.py para gerá-las.")
     # KPI 'Contratos em Risco' - Conta o número de contratos previstos como em risco diretamente de df_predicoes
     contratos_em_risco = len(df_predicoes[df_predicoes['tende_cancelar'] == 1]) if not df_predicoes.empty else 0
 
@@ -129,7 +119,9 @@ def render():
     st.markdown('---')
 
     # --- Dados dos Cards de Gráficos ---
-    df_contratos_detalhados_para_grafico = carregar_view('v_contratos_detalhados')
+    # Uma única busca (compartilhada com as outras páginas) serve o gráfico e o cenário de faturamento
+    df_contratos_detalhados = carregar_dataset('v_contratos_detalhados')
+    df_contratos_detalhados_para_grafico = df_contratos_detalhados
 
     # Contratos Ativos por Categoria
     active_contracts_by_type = df_contratos_detalhados_para_grafico[
@@ -148,82 +140,29 @@ def render():
     categories_order = df_card1_data['Categoria'].tolist()
 
     # --- CARREGAMENTO PARA O CARD 2: FATURAMENTO MENSAL REAL E CENÁRIO DE CANCELAMENTO ---
-    query_faturamento_mensal_real = """
-    WITH meses_projetados AS (
-        SELECT generate_series(
-            DATE_TRUNC('month', MIN(data_inicio)),
-            DATE_TRUNC('month', MAX(data_fim) + INTERVAL '1 year'), -- Projeção de 1 ano após o último fim de contrato
-            '1 month'::interval
-        ) AS mes_vigencia
-        FROM v_contratos_detalhados
-    ),
-    faturamento_por_contrato_mes AS (
-        SELECT
-            c.contrato_id,
-            c.premio_mensal,
-            c.data_inicio,
-            c.data_fim,
-            mp.mes_vigencia
-        FROM
-            v_contratos_detalhados c
-        JOIN
-            meses_projetados mp ON mp.mes_vigencia >= DATE_TRUNC('month', c.data_inicio)
-                               AND mp.mes_vigencia <= DATE_TRUNC('month', c.data_fim)
-        WHERE
-            c.status_contrato IN ('Ativo', 'Encerrado')
-    )
-    SELECT
-        mes_vigencia AS "Data",
-        SUM(premio_mensal) AS "Faturamento"
-    FROM
-        faturamento_por_contrato_mes
-    GROUP BY
-        mes_vigencia
-    ORDER BY
-        mes_vigencia;
-    """
-
-    df_faturamento_real = carregar_query(query_faturamento_mensal_real)
+    # Lido da tabela resumo faturamento_mensal (atualizada por
+    # `python -m backend.data.processed.faturamento_mensal`), sem o generate_series x contratos
+    if existe_faturamento_mensal():
+        df_faturamento_real = carregar_query_parametrizada(QUERY_FATURAMENTO_MENSAL)
+    else:
+        st.warning(
+            "Tabela faturamento_mensal ainda não criada: faturamento calculado direto dos contratos. "
+            "Rode `python -m backend.data.processed.faturamento_mensal` para usar a tabela resumo."
+        )
+        df_faturamento_real = carregar_query_parametrizada(QUERY_FATURAMENTO_MENSAL_DIRETO)
     df_faturamento_real['Data'] = pd.to_datetime(df_faturamento_real['Data']).dt.tz_localize(None) if not df_faturamento_real.empty else pd.Series(dtype='datetime64[ns]')
 
 
-    # --- CRIANDO O CENÁRIO "SE TIVESSEM CANCELADO" NO PYTHON (AJUSTADO PARA df_predicoes sem contrato_id) ---
-    df_contratos_detalhados_para_cenario = carregar_view('v_contratos_detalhados')
+    # --- CRIANDO O CENÁRIO "SE TIVESSEM CANCELADO" NO PYTHON (previsões por contrato_id) ---
+    df_contratos_detalhados_para_cenario = df_contratos_detalhados.copy(deep=False)
     if not df_contratos_detalhados_para_cenario.empty:
         df_contratos_detalhados_para_cenario['data_inicio'] = pd.to_datetime(df_contratos_detalhados_para_cenario['data_inicio']).dt.tz_localize(None)
         df_contratos_detalhados_para_cenario['data_fim'] = pd.to_datetime(df_contratos_detalhados_para_cenario['data_fim']).dt.tz_localize(None)
 
-        # Renomear colunas em df_predicoes para facilitar o merge
-        df_predicoes_para_merge = df_predicoes[['cliente_id', 'tipo_seguro_nome', 'tende_cancelar']].copy()
-        
-        # Criar um DataFrame simples com apenas os identificadores e a flag de cancelamento para merge
-        contratos_previstos_para_cancelar_flags = df_predicoes_para_merge[df_predicoes_para_merge['tende_cancelar'] == 1].copy()
-        contratos_previstos_para_cancelar_flags = contratos_previstos_para_cancelar_flags[['cliente_id', 'tipo_seguro_nome']]
-        # Adiciona uma coluna auxiliar que será True para os contratos que tendem a cancelar
-        contratos_previstos_para_cancelar_flags['previsto_para_cancelar_flag'] = True
-
-        # Fazer um LEFT MERGE para adicionar essa flag aos seus contratos detalhados
-        contratos_com_predicao = pd.merge(
-            df_contratos_detalhados_para_cenario,
-            contratos_previstos_para_cancelar_flags,
-            on=['cliente_id', 'tipo_seguro_nome'],
-            how='left'
-        )
-
-        # A coluna 'previsto_para_cancelar_flag' agora existe no df_contratos_com_predicao.
-        # Ela será True se houve match, e NaN se não houve match.
-        # Criar a coluna final 'is_predicted_to_cancel' preenchendo NaN com False.
-        contratos_com_predicao['is_predicted_to_cancel'] = contratos_com_predicao['previsto_para_cancelar_flag'].fillna(False)
-
-        # Remover a coluna auxiliar se não for mais necessária
-        contratos_com_predicao.drop(columns=['previsto_para_cancelar_flag'], inplace=True)
+        contratos_com_predicao = marcar_contratos_previstos(df_contratos_detalhados_para_cenario, df_predicoes)
     else:
         contratos_com_predicao = pd.DataFrame()
 
-
-    # Aviso sobre a limitação da estimativa (mantido)
-    st.warning("Aviso: O cenário de faturamento por cancelamento previsto é uma estimativa. Devido à ausência de 'contrato_id' em 'df_predicoes', contratos são correspondidos por 'id_cliente' e 'tipo_seguro'. Se um cliente tem vários contratos do mesmo tipo, e um é previsto para cancelar, todos do mesmo tipo para aquele cliente serão considerados cancelados no cenário.")
-
     current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
     if not df_faturamento_real.empty:
@@ -235,37 +174,15 @@ def render():
         all_months_in_range = pd.date_range(start=current_month, end=current_month + timedelta(days=30), freq='MS').tz_localize(None)
 
 
-    faturamento_cenario_list = []
-    for month_start in all_months_in_range:
-        month_end = month_start + pd.offsets.MonthEnd(0)
-        
-        # Garante que contratos_com_predicao não esteja vazio antes de filtrar
-        if not contratos_com_predicao.empty:
-            current_month_contracts_active = contratos_com_predicao[
-                (contratos_com_predicao['data_inicio'] <= month_end) &
-                (contratos_com_predicao['data_fim'] >= month_start) &
-                (contratos_com_predicao['status_contrato'] == 'Ativo')
-            ].copy()
-        else:
-            current_month_contracts_active = pd.DataFrame()
-
-        faturamento_real_mes = current_month_contracts_active['premio_mensal'].sum() if not current_month_contracts_active.empty else 0
-
-        faturamento_cenario_cancelamento_mes = 0
-        if month_start >= current_month and not current_month_contracts_active.empty:
-            faturamento_cenario_cancelamento_mes = current_month_contracts_active[
-                current_month_contracts_active['is_predicted_to_cancel'] == False
-            ]['premio_mensal'].sum()
-        else:
-            faturamento_cenario_cancelamento_mes = faturamento_real_mes
-
-        faturamento_cenario_list.append({
-            'Data': month_start,
-            'Faturamento Real': faturamento_real_mes,
-            'Faturamento Cenário Cancelamento': faturamento_cenario_cancelamento_mes
+    # Séries real e de cenário calculadas juntas por varredura de eventos (+prêmio no início, -prêmio após o fim)
+    if not contratos_com_predicao.empty:
+        df_card2_data = projetar_faturamento_cenario(contratos_com_predicao, all_months_in_range, current_month)
+    else:
+        df_card2_data = pd.DataFrame({
+            'Data': all_months_in_range,
+            'Faturamento Real': 0.0,
+            'Faturamento Cenário Cancelamento': 0.0
         })
-
-    df_card2_data = pd.DataFrame(faturamento_cenario_list)
     if not df_card2_data.empty:
         df_card2_data['Data'] = pd.to_datetime(df_card2_data['Data']).dt.tz_localize(None)
         df_card2_data['Mês'] = df_card2_data['Data'].dt.month
@@ -423,7 +340,7 @@ def render():
 
     if not df_predicoes.empty:
         # Colunas a serem exibidas na tabela
-        cols_to_display = ['cliente_id', 'prob_cancelamento', 'tipo_seguro_nome', 'tende_cancelar']
+        cols_to_display = ['contrato_id', 'cliente_id', 'prob_cancelamento', 'tipo_seguro_nome', 'tende_cancelar']
         display_df = df_predicoes[cols_to_display].copy()
         
         # Formatar a probabilidade para percentual
@@ -431,7 +348,7 @@ def render():
             display_df['prob_cancelamento'] = display_df['prob_cancelamento'].apply(lambda x: f"{x:.2%}" if pd.notnull(x) else "N/A")
         
         # Renomear colunas para exibição amigável
-        display_df.columns = ['ID Cliente', 'Prob. Cancelamento', 'Tipo de Seguro', 'Tende a Cancelar']
+        display_df.columns = ['ID Contrato', 'ID Cliente', 'Prob. Cancelamento', 'Tipo de Seguro', 'Tende a Cancelar']
 
         st.dataframe(display_df, use_container_width=True, height=400)
     else:
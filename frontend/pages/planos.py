@@ -5,7 +5,6 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dateutil.relativedelta import relativedelta
 import numpy as np
 from datetime import datetime, timedelta
 
@@ -16,37 +15,19 @@ if PROJECT_ROOT not in sys.path:
 
 # --- Importações reais do backend ---
 
-from backend.data.processed.loading_views import carregar_view, carregar_query
+from backend.data.processed.loading_views import carregar_view, carregar_query, carregar_query_parametrizada
+from backend.data.processed.datasets import carregar_dataset
+from backend.data.processed.kpis import carregar_kpis_por_tipo
+from backend.data.processed.transicoes import carregar_matriz_transicoes
+from backend.data.processed.duracao import diferenca_meses, histograma_meses
+from backend.data.processed.predicoes import carregar_predicoes
 from frontend.utils.components import kpi_custom
 
 
-# --- Importação da função de carregamento de CSS global ---
-
-# --- Função para carregar dados de predição (SÓ CSV, SEM GERAÇÃO DE MOCKS) ---
-@st.cache_data
-def carregar_dados_predicao():
-    caminho_csv = os.path.join(PROJECT_ROOT, "frontend", "pages", "clientes_com_risco_cancelamento.csv")
-    
-    if not os.path.exists(caminho_csv):
-        st.error(f"Erro: Arquivo CSV de predição não encontrado em: {caminho_csv}. Sem este arquivo, os dados de predição não podem ser carregados.")
-        return pd.DataFrame() # Retorna DataFrame vazio se o arquivo não existir.
+# --- SQLs parametrizadas das abas (o tipo de seguro entra como :tipo) ---
+QUERY_CHURN_TIPO = "SELECT * FROM v_analise_churn WHERE tipo_seguro_nome = :tipo;"
 
-    df = pd.read_csv(caminho_csv)
-
-    # Validar a presença das colunas críticas do CSV
-    required_cols_csv = ['id_cliente', 'tende_cancelar', 'tipo_seguro']
-    if not all(col in df.columns for col in required_cols_csv):
-        st.error(f"O arquivo CSV '{os.path.basename(caminho_csv)}' não contém todas as colunas necessárias para o dashboard: {', '.join(required_cols_csv)}. Verifique o arquivo.")
-        return pd.DataFrame() # Retorna DataFrame vazio se colunas essenciais estiverem faltando.
-    
-    # Renomear colunas para consistência com o restante do código (se necessário para joins ou lógica)
-    df.rename(columns={'id_cliente': 'cliente_id', 'tipo_seguro': 'tipo_seguro_nome'}, inplace=True)
-    
-    # Certificar que 'tende_cancelar' é numérica (0 ou 1)
-    if 'tende_cancelar' in df.columns:
-        df['tende_cancelar'] = pd.to_numeric(df['tende_cancelar'], errors='coerce').fillna(0).astype(int)
-    
-    return df
+# --- Importação da função de carregamento de CSS global ---
 
 # --- Componente Customizado KPI ---
 
@@ -105,25 +86,24 @@ def create_contract_duration_chart(df_detalhes):
         fig.update_layout(height=250, margin=dict(l=10, r=10, t=50, b=10))
         return fig
 
-    df_duracao['data_fim'] = pd.to_datetime(df_duracao['data_fim'])
-    df_duracao['data_inicio'] = pd.to_datetime(df_duracao['data_inicio'])
+    # Diferença de meses vetorizada e histograma já agrupado (sem apply linha a linha)
+    duracao_meses = diferenca_meses(df_duracao['data_inicio'], df_duracao['data_fim'])
+    df_hist = histograma_meses(duracao_meses, nbins=10)
+    df_hist['faixa'] = df_hist['inicio'].astype(int).astype(str) + '–' + df_hist['fim'].astype(int).astype(str)
 
-    df_duracao['duracao_meses'] = df_duracao.apply(
-        lambda row: (relativedelta(row['data_fim'], row['data_inicio']).years * 12 +
-                     relativedelta(row['data_fim'], row['data_inicio']).months), axis=1
-    )
-
-    fig = px.histogram(df_duracao, x="duracao_meses", nbins=10,
-                         title='Melhor Duração de Contrato',
-                         labels={'duracao_meses': 'Duração (Meses)', 'count': 'Número de Contratos'},
-                         color_discrete_sequence=px.colors.qualitative.Pastel)
-    fig.update_layout(xaxis_title="", yaxis_title="", showlegend=False, height=250)
+    fig = px.bar(df_hist, x="centro", y="contratos",
+                     title='Melhor Duração de Contrato',
+                     hover_data={'faixa': True, 'centro': False},
+                     labels={'centro': 'Duração (Meses)', 'contratos': 'Número de Contratos', 'faixa': 'Meses'},
+                     color_discrete_sequence=px.colors.qualitative.Pastel)
+    fig.update_traces(width=df_hist['largura'].tolist())
+    fig.update_layout(xaxis_title="", yaxis_title="", showlegend=False, height=250, bargap=0)
     return fig
 
 # --- Nova Função para Gráfico de Transição de Contratos ---
-def create_contract_transition_chart(df_all_detalhes, current_contract_type):
-    if df_all_detalhes.empty or \
-       not all(col in df_all_detalhes.columns for col in ['cliente_id', 'data_inicio', 'tipo_seguro_nome']):
+def create_contract_transition_chart(df_transicoes, current_contract_type):
+    if df_transicoes.empty or \
+       not all(col in df_transicoes.columns for col in ['From', 'To', 'Count']):
         fig = go.Figure()
         fig.add_annotation(text="Dados insuficientes para o gráfico de transição de contratos.",
                            xref="paper", yref="paper", showarrow=False,
@@ -131,22 +111,10 @@ def create_contract_transition_chart(df_all_detalhes, current_contract_type):
         fig.update_layout(height=350, margin=dict(l=10, r=10, t=50, b=10))
         return fig
 
-    df_detalhes_copy = df_all_detalhes.copy()
-    df_detalhes_copy['data_inicio'] = pd.to_datetime(df_detalhes_copy['data_inicio'])
-
-    df_sorted = df_detalhes_copy.sort_values(by=['cliente_id', 'data_inicio'])
-
-    transitions = []
-    for client_id in df_sorted['cliente_id'].unique():
-        client_contracts = df_sorted[df_sorted['cliente_id'] == client_id]
-        if len(client_contracts) > 1:
-            for i in range(len(client_contracts) - 1):
-                from_type = client_contracts.iloc[i]['tipo_seguro_nome']
-                to_type = client_contracts.iloc[i+1]['tipo_seguro_nome']
-                if from_type == current_contract_type and from_type != to_type:
-                    transitions.append({'From': from_type, 'To': to_type})
+    # A matriz já vem contada para todos os tipos; aqui só recortamos o tipo da aba
+    transition_counts = df_transicoes[df_transicoes['From'] == current_contract_type]
 
-    if not transitions:
+    if transition_counts.empty:
         fig = go.Figure()
         fig.add_annotation(text=f"Nenhuma transição de '{current_contract_type}' para outros tipos de contrato encontrada.",
                            xref="paper", yref="paper", showarrow=False,
@@ -154,11 +122,6 @@ def create_contract_transition_chart(df_all_detalhes, current_contract_type):
         fig.update_layout(height=350, margin=dict(l=10, r=10, t=50, b=10))
         return fig
 
-    df_transitions = pd.DataFrame(transitions)
-    
-    # Count transitions
-    transition_counts = df_transitions.groupby(['From', 'To']).size().reset_index(name='Count')
-
     # Prepare data for Sankey
     all_nodes = pd.concat([transition_counts['From'], transition_counts['To']]).unique()
     label_map = {label: i for i, label in enumerate(all_nodes)}
@@ -199,30 +162,23 @@ def render():
     # --- CHAME A FUNÇÃO PARA CARREGAR O CSS GLOBAL AQUI ---
     load_global_css()
 
-    # --- BUSCAR TIPOS DE SEGURO PARA AS ABAS ---
-    tipos_df = carregar_query("""
-        SELECT DISTINCT tipo_seguro_nome
-        FROM v_contratos_detalhados
-        ORDER BY tipo_seguro_nome;
-    """)
+    # --- KPIS DE TODOS OS TIPOS EM UMA ÚNICA QUERY (também definem as abas) ---
+    kpis_por_tipo = carregar_kpis_por_tipo()
     
-    if tipos_df.empty:
+    if kpis_por_tipo.empty:
         st.warning("Não foi possível carregar os tipos de seguro do banco de dados. Verifique a conexão e os dados em 'v_contratos_detalhados'.")
         st.info("A aplicação não pode exibir detalhes por tipo de contrato sem dados de tipos de seguro.")
         return # Sai da função render se não houver tipos para exibir.
     
-    tab_names = tipos_df['tipo_seguro_nome'].tolist()
+    tab_names = kpis_por_tipo.index.tolist()
 
     tabs = st.tabs(tab_names)
 
-    # Carrega TODOS os dados detalhados de contratos UMA VEZ para o gráfico de transição.
-    df_all_detalhes_for_transitions = carregar_query("""
-        SELECT cliente_id, data_inicio, tipo_seguro_nome
-        FROM v_contratos_detalhados;
-    """)
-    
-    # Carrega TODOS os dados de predição de risco UMA VEZ. Será filtrado por aba.
-    df_predicoes_global = carregar_dados_predicao()
+    # Contratos vêm do dataset compartilhado; cada aba só recorta o seu tipo.
+    df_contratos = carregar_dataset('v_contratos_detalhados')
+
+    # Matriz de transições de TODOS os tipos, calculada UMA VEZ (com cache) e recortada por aba.
+    df_transicoes = carregar_matriz_transicoes()
 
 
     for i, tab in enumerate(tabs):
@@ -230,56 +186,28 @@ def render():
             contract_type = tab_names[i]
             st.markdown(f"## Visão Geral - {contract_type}")
             # --- CARREGAMENTO DE DADOS ESPECÍFICOS DA ABA ---
-            where_clause = f"WHERE tipo_seguro_nome = '{contract_type}'"
-
-            # Queries para KPIs e gráficos específicos da aba
-            query_contratos_ativos_tab = f"""
-            SELECT COUNT(*) AS total_contratos_ativos
-            FROM v_contratos_detalhados
-            {where_clause} AND status_contrato = 'Ativo';
-            """
-            query_clientes_ativos_tab = f"""
-            SELECT COUNT(DISTINCT cliente_id) AS total_clientes_ativos
-            FROM v_contratos_detalhados
-            {where_clause} AND status_contrato = 'Ativo';
-            """
-            query_faturamento_tab = f"""
-            SELECT COALESCE(SUM(premio_mensal), 0) AS faturamento_total
-            FROM v_contratos_detalhados
-            {where_clause} AND status_contrato = 'Ativo';
-            """
-            query_churn_tab_calc = f"""
-            SELECT
-                CAST(COUNT(CASE WHEN status_contrato = 'Cancelado' THEN 1 ELSE NULL END) AS REAL) * 100 /
-                NULLIF(COUNT(CASE WHEN status_contrato IN ('Ativo', 'Cancelado', 'Encerrado') THEN 1 ELSE NULL END), 0) AS churn_rate
-            FROM v_contratos_detalhados
-            {where_clause};
-            """
-            query_satisfacao_tab = f"""
-            SELECT COALESCE(ROUND(AVG(nivel_satisfacao_num), 2), 0) AS satisfacao_media
-            FROM v_contratos_detalhados
-            {where_clause} AND nivel_satisfacao_num IS NOT NULL AND nivel_satisfacao_num > 0;
-            """
+            # O tipo vai como parâmetro: todas as abas usam o mesmo texto de SQL (e o mesmo plano)
+            params_tab = {"tipo": contract_type}
 
             # Carrega DataFrames para a aba atual
-            df_detalhes_tab = carregar_query(f"SELECT * FROM v_contratos_detalhados {where_clause};")
-            df_churn_reasons_tab = carregar_query(f"SELECT * FROM v_analise_churn {where_clause};")
+            df_detalhes_tab = df_contratos[df_contratos['tipo_seguro_nome'] == contract_type]
+            df_churn_reasons_tab = carregar_query_parametrizada(QUERY_CHURN_TIPO, params_tab)
             
-            # Filtra os dados de predição global para o tipo de contrato atual da aba
-            # Usa 'tende_cancelar' e 'tipo_seguro_nome' (que é o 'tipo_seguro' renomeado do CSV)
-            df_predicoes_filtered_tab = df_predicoes_global[df_predicoes_global['tipo_seguro_nome'] == contract_type].copy() if not df_predicoes_global.empty else pd.DataFrame()
+            # Só as previsões em risco deste tipo, lidas pelo índice (tipo_seguro, cancelamento_previsto)
+            df_predicoes_filtered_tab = carregar_predicoes(tipo_seguro=contract_type, apenas_risco=True)
 
 
             # --- Calcular KPIs Específicos da Aba ---
-            # Uso de .iloc[0] após checar se não está vazio para segurança
-            contratos_ativos_tab = carregar_query(query_contratos_ativos_tab)['total_contratos_ativos'].iloc[0] if not carregar_query(query_contratos_ativos_tab).empty else 0
-            clientes_ativos_tab = carregar_query(query_clientes_ativos_tab)['total_clientes_ativos'].iloc[0] if not carregar_query(query_clientes_ativos_tab).empty else 0
-            faturamento_tab = carregar_query(query_faturamento_tab)['faturamento_total'].iloc[0] if not carregar_query(query_faturamento_tab).empty else 0.0
-            churn_rate_tab = carregar_query(query_churn_tab_calc)['churn_rate'].iloc[0] if not carregar_query(query_churn_tab_calc).empty else 0.0
-            satisfacao_media_tab = carregar_query(query_satisfacao_tab)['satisfacao_media'].iloc[0] if not carregar_query(query_satisfacao_tab).empty else 0.0
+            # Lidos do DataFrame de KPIs já carregado, sem novas idas ao banco
+            kpis_tab = kpis_por_tipo.loc[contract_type]
+            contratos_ativos_tab = int(kpis_tab['total_contratos_ativos'])
+            clientes_ativos_tab = int(kpis_tab['total_clientes_ativos'])
+            faturamento_tab = float(kpis_tab['faturamento_total'])
+            churn_rate_tab = float(kpis_tab['churn_rate'])
+            satisfacao_media_tab = float(kpis_tab['satisfacao_media'])
             
-            # KPI de Clientes em Risco para a aba atual, usando 'tende_cancelar' do CSV
-            # O status_risco não pode ser usado sem a coluna no CSV, então focamos em 'tende_cancelar'
+            # KPI de Clientes em Risco para a aba atual, usando 'tende_cancelar' das previsões
+            # O status_risco não pode ser usado sem a coluna nas previsões, então focamos em 'tende_cancelar'
             at_risk_clients_tab = df_predicoes_filtered_tab[df_predicoes_filtered_tab['tende_cancelar'] == 1]['cliente_id'].nunique() if not df_predicoes_filtered_tab.empty else 0
 
 
@@ -315,19 +243,19 @@ def render():
             # Gráfico de Transição de Contratos (Tab-specific)
             st.markdown("### Transição de Contratos por Cliente")
             with st.container(border=True):
-                st.plotly_chart(create_contract_transition_chart(df_all_detalhes_for_transitions, contract_type), use_container_width=True, key=f"transition_chart_{contract_type}")
+                st.plotly_chart(create_contract_transition_chart(df_transicoes, contract_type), use_container_width=True, key=f"transition_chart_{contract_type}")
 
             st.markdown("---")
 
-            # Contratos em Risco (Table - Tab-specific, using filtered df_predicoes_global)
+            # Contratos em Risco (Table - Tab-specific, using df_predicoes_filtered_tab)
             bottom_cols_tab = st.columns([0.7, 0.3])
             with bottom_cols_tab[0]:
                 st.container(border=True).write(f"### Clientes em Risco para {contract_type}")
                 # Filtra apenas clientes que tendem a cancelar
                 df_risk_display_tab = df_predicoes_filtered_tab[df_predicoes_filtered_tab['tende_cancelar'] == 1].copy()
                 
-                # As colunas agora são 'cliente_id' e 'prob_cancelamento', pois 'cliente_nome', 'status_risco', 'data_fim_contrato_previsao' não estão no CSV.
-                expected_risk_cols = ['cliente_id', 'prob_cancelamento'] # Ajustado para as colunas do CSV
+                # As colunas agora são 'cliente_id' e 'prob_cancelamento', pois 'cliente_nome', 'status_risco', 'data_fim_contrato_previsao' não estão na tabela de previsões.
+                expected_risk_cols = ['cliente_id', 'prob_cancelamento'] # Ajustado para as colunas das previsões
                 
                 if not df_risk_display_tab.empty and all(col in df_risk_display_tab.columns for col in expected_risk_cols):
                     display_df_tab = df_risk_display_tab[expected_risk_cols]
@@ -338,7 +266,7 @@ def render():
 
                     st.dataframe(display_df_tab, use_container_width=True, hide_index=True, key=f"risk_clients_table_{contract_type}")
                 else:
-                    st.info(f"Nenhum cliente em risco encontrado para {contract_type} ou colunas necessárias ausentes no CSV.")
+                    st.info(f"Nenhum cliente em risco encontrado para {contract_type} ou colunas necessárias ausentes nas previsões.")
                     st.dataframe(pd.DataFrame(), use_container_width=True, hide_index=True, key=f"risk_clients_table_empty_{contract_type}")
 
 
@@ -346,7 +274,7 @@ def render():
                 # --- Preenchimento do card 'Situação Contrato' ---
                 # Agora, contamos clientes que 'tende_cancelar' sem um status_risco
                 clients_predicted_to_cancel_count = 0
-                # O KPI "Contratos a Terminar" foi removido pois 'data_fim_contrato_previsao' não está no CSV.
+                # O KPI "Contratos a Terminar" foi removido pois 'data_fim_contrato_previsao' não está nas previsões.
 
                 if not df_predicoes_filtered_tab.empty:
                     clients_predicted_to_cancel_count = df_predicoes_filtered_tab[df_predicoes_filtered_tab['tende_cancelar'] == 1].shape[0]
@@ -0,0 +1,123 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+from sqlalchemy import create_engine, text
+
+# Os testes importam o projeto a partir da raiz (backend.data..., frontend...), como os scripts
+raiz_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if raiz_projeto not in sys.path:
+    sys.path.insert(0, raiz_projeto)
+# Os modelos (backend/data/models) importam como os próprios scripts: data.processed..., data.models...
+raiz_backend = os.path.join(raiz_projeto, "backend")
+if raiz_backend not in sys.path:
+    sys.path.insert(1, raiz_backend)
+
+from backend.data.processed import backend_local, data_acess, snapshot_cache  # noqa: E402
+from backend.data.processed.ingestao import ESQUEMAS  # noqa: E402
+
+DIRETORIO_RAW = os.path.join(raiz_projeto, "backend", "data", "raw")
+# Linhas de dados de cada arquivo P18_* copiadas para o banco dos testes
+LINHAS_INICIAIS = {"clientes": 300, "contratos": 400, "cancelamentos": 100}
+
+
+def linhas_raw(tabela):
+    """Linhas (com o cabeçalho) do arquivo de origem completo da tabela."""
+    with open(os.path.join(DIRETORIO_RAW, ESQUEMAS[tabela]["arquivo"] + ".csv"), encoding="utf-8") as f:
+        return f.readlines()
+
+
+@pytest.fixture
+def dados(tmp_path):
+    """Diretório com o início de cada arquivo P18_* (LINHAS_INICIAIS linhas de dados)."""
+    diretorio = tmp_path / "raw"
+    diretorio.mkdir()
+    for tabela, linhas in LINHAS_INICIAIS.items():
+        (diretorio / f"{ESQUEMAS[tabela]['arquivo']}.csv").write_text(
+            "".join(linhas_raw(tabela)[:linhas + 1]), encoding="utf-8"
+        )
+    return diretorio
+
+
+@pytest.fixture
+def banco_local(dados, tmp_path, monkeypatch):
+    """DSN de um banco local DuckDB novo, carregado de ``dados`` na primeira get_engine."""
+    pytest.importorskip("duckdb_engine")
+    monkeypatch.setattr(backend_local, "DIRETORIO_DADOS", str(dados))
+    yield backend_local.montar_dsn_local(str(tmp_path / "local.duckdb"))
+    data_acess.dispose_engines()
+
+
+@pytest.fixture
+def ambiente_local(banco_local, tmp_path, monkeypatch):
+    """O banco local como banco padrão do processo (get_engine() sem DSN), com caches limpos."""
+    monkeypatch.setattr(data_acess, "montar_dsn", lambda: banco_local)
+    monkeypatch.setattr(snapshot_cache, "DIRETORIO_SNAPSHOTS", str(tmp_path / "snapshots"))
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    yield banco_local
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def gerar_clientes_predicao(n, semente=0):
+    """Linhas no formato de v_clientes_para_predicao_final (com alvo ``cancelou`` para treinar)."""
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({
+        "cliente_id": rng.integers(1, n // 2 + 2, n),
+        "id_contrato_legado": np.arange(1, n + 1) * 7,
+        "genero": rng.choice(["M", "F", "O"], n),
+        "nivel_educacional": rng.choice(["Fundamental", "Médio", "Superior"], n),
+        "canal_venda": rng.choice(["Corretor", "Online", "Agência"], n),
+        "tipo_seguro": rng.choice(["Auto", "Vida", "Saúde"], n),
+        "renda_mensal": rng.uniform(1000, 20000, n).round(2),
+        "valor_premio_mensal": rng.uniform(50, 900, n).round(2),
+        "satisfacao_score": rng.integers(1, 6, n),
+        "renovado_automaticamente": rng.integers(0, 2, n),
+        "duracao_dias": rng.integers(30, 1500, n),
+    })
+    df["valor_premio_sobre_renda"] = df["valor_premio_mensal"] / df["renda_mensal"]
+    df["interacao_idade_renda"] = rng.integers(18, 80, n) * df["renda_mensal"]
+    risco = 2.5 - df["satisfacao_score"] + (df["canal_venda"] == "Online") + rng.normal(0, 1, n)
+    df["cancelou"] = (risco > 0.8).astype(int)
+    return df
+
+
+@pytest.fixture(scope="session")
+def artefato_teste(tmp_path_factory):
+    """Artefato versionado pequeno (one-hot + CatBoost), treinado como no modo smote sem o SMOTE."""
+    catboost = pytest.importorskip("catboost")
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder
+
+    from data.models.aply_mode import columns_for_model_input
+    from data.models.artefato import salvar_artefato
+
+    treino = gerar_clientes_predicao(600, semente=1)
+    categoricas = ["genero", "nivel_educacional", "canal_venda", "tipo_seguro"]
+    encoder = ColumnTransformer(
+        [("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=False), categoricas)],
+        remainder="passthrough",
+    )
+    X = encoder.fit_transform(treino[columns_for_model_input])
+    modelo = catboost.CatBoostClassifier(iterations=40, depth=3, verbose=0, allow_writing_files=False, random_seed=0)
+    modelo.fit(X, treino["cancelou"])
+    diretorio = tmp_path_factory.mktemp("artefatos")
+    return salvar_artefato(encoder, modelo, columns_for_model_input, threshold=0.4,
+                           diretorio_base=str(diretorio), tornar_atual=False)
+
+
+@pytest.fixture
+def base_predicao(tmp_path):
+    """Banco DuckDB com uma tabela no lugar da view v_clientes_para_predicao_final."""
+    pytest.importorskip("duckdb_engine")
+    clientes = gerar_clientes_predicao(500, semente=2).drop(columns="cancelou")
+    engine = create_engine(f"duckdb:///{tmp_path / 'predicao.duckdb'}")
+    with engine.begin() as conn:
+        conn.connection.driver_connection.register("_clientes", clientes)
+        conn.execute(text("CREATE TABLE v_clientes_para_predicao_final AS SELECT * FROM _clientes"))
+    yield engine
+    engine.dispose()
@@ -0,0 +1,77 @@
+"""Pontuação em lotes do aply_mode.py: mesmo resultado que pontuar a base de uma vez."""
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from data.models.aply_mode import PontuadorLocal, PontuadorParalelo, columns_for_model_input, ler_em_lotes, pontuar
+from data.models.artefato import carregar_artefato
+
+
+def _esperado(base_predicao, artefato_teste):
+    with base_predicao.connect() as conn:
+        df = pd.read_sql_query(text("SELECT * FROM v_clientes_para_predicao_final"), conn)
+    artefato = carregar_artefato(artefato_teste)
+    proba = artefato.modelo.predict_proba(artefato.encoder.transform(df[columns_for_model_input]))[:, 1]
+    return pd.DataFrame({"contrato_id": df["id_contrato_legado"], "probabilidade_cancelamento": proba,
+                         "cancelamento_previsto": (proba >= artefato.threshold).astype(int)})
+
+
+def test_ler_em_lotes(base_predicao):
+    lotes = list(ler_em_lotes(128, base_predicao))
+    assert [len(lote) for lote in lotes] == [128, 128, 128, 116]
+    assert "contrato_id" in lotes[0].columns and "id_contrato_legado" not in lotes[0].columns
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+def test_pontuar_em_lotes_para_arquivo(formato, base_predicao, artefato_teste, tmp_path):
+    if formato == "parquet":
+        pytest.importorskip("pyarrow")
+    saida = tmp_path / f"previsoes.{formato}"
+    total, pontuadas = pontuar(100, formato, str(saida), artefato_teste, engine=base_predicao)
+    assert (total, pontuadas) == (500, 500)
+
+    gravado = pd.read_parquet(saida) if formato == "parquet" else pd.read_csv(saida)
+    esperado = _esperado(base_predicao, artefato_teste)
+    assert gravado["contrato_id"].tolist() == esperado["contrato_id"].tolist()
+    np.testing.assert_allclose(gravado["probabilidade_cancelamento"], esperado["probabilidade_cancelamento"], rtol=1e-9)
+    assert gravado["cancelamento_previsto"].tolist() == esperado["cancelamento_previsto"].tolist()
+    assert not (tmp_path / f"previsoes.{formato}.tmp").exists()
+
+
+def test_pontuar_para_o_banco(base_predicao, artefato_teste):
+    total, _ = pontuar(100, "banco", caminho_modelo=artefato_teste, engine=base_predicao)
+    with base_predicao.connect() as conn:
+        gravado = pd.read_sql_query(text("SELECT * FROM predicoes_churn ORDER BY contrato_id"), conn)
+    esperado = _esperado(base_predicao, artefato_teste).sort_values("contrato_id")
+    assert total == len(gravado) == 500
+    np.testing.assert_allclose(gravado["probabilidade_cancelamento"], esperado["probabilidade_cancelamento"], rtol=1e-9)
+    assert (gravado["versao_modelo"] == carregar_artefato(artefato_teste).versao).all()
+
+
+def test_falha_no_meio_nao_deixa_arquivo(base_predicao, artefato_teste, tmp_path, monkeypatch):
+    chamadas = []
+
+    def probabilidades_com_falha(self, X):
+        chamadas.append(len(X))
+        if len(chamadas) == 3:
+            raise RuntimeError("falha no lote")
+        return np.zeros(len(X))
+
+    monkeypatch.setattr(PontuadorLocal, "probabilidades", probabilidades_com_falha)
+    saida = tmp_path / "previsoes.csv"
+    with pytest.raises(RuntimeError):
+        pontuar(100, "csv", str(saida), artefato_teste, engine=base_predicao)
+    assert not saida.exists() and not (tmp_path / "previsoes.csv.tmp").exists()
+
+
+def test_pontuador_paralelo_igual_ao_local(base_predicao, artefato_teste, tmp_path):
+    local, paralelo = tmp_path / "local.csv", tmp_path / "paralelo.csv"
+    pontuar(150, "csv", str(local), artefato_teste, workers=1, engine=base_predicao)
+    pontuar(150, "csv", str(paralelo), artefato_teste, workers=2, engine=base_predicao)
+    pd.testing.assert_frame_equal(pd.read_csv(local), pd.read_csv(paralelo))
+
+
+def test_pool_paralelo_usa_spawn(artefato_teste):
+    with PontuadorParalelo(artefato_teste, workers=2) as pontuador:
+        assert pontuador.pool._mp_context.get_start_method() == "spawn"
@@ -0,0 +1,134 @@
+"""Artefato versionado: manifesto, apontador ATUAL, carga preguiçosa e dados de avaliação."""
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+
+from data.models import artefato as mod_artefato
+from data.models.artefato import (
+    ARQUIVO_ATUAL, Artefato, ArtefatoLegado, atualizar_manifesto, caminho_atual, carregar_artefato,
+    converter_legado, salvar_artefato,
+)
+
+
+@pytest.fixture(scope="module")
+def treinado(artefato_teste):
+    """Encoder e modelo do artefato de teste, para gravar novas versões."""
+    artefato = carregar_artefato(artefato_teste)
+    return artefato.encoder, artefato.modelo, artefato.colunas
+
+
+def test_salvar_grava_manifesto_e_aponta_atual(treinado, tmp_path):
+    encoder, modelo, colunas = treinado
+    destino = salvar_artefato(encoder, modelo, colunas, threshold=0.35, diretorio_base=str(tmp_path),
+                              extras={"origem": "teste"})
+
+    assert sorted(os.listdir(tmp_path)) == sorted([ARQUIVO_ATUAL, os.path.basename(destino)])
+    assert caminho_atual(str(tmp_path)) == destino
+    with open(os.path.join(destino, "manifesto.json")) as f:
+        manifesto = json.load(f)
+    assert manifesto["versao"] == os.path.basename(destino)
+    assert manifesto["modo"] == "onehot_smote"
+    assert manifesto["threshold"] == 0.35
+    assert manifesto["colunas"] == list(colunas)
+    assert manifesto["origem"] == "teste"
+    assert manifesto["arquivos"] == {"modelo": "modelo.cbm", "encoder": "encoder.joblib"}
+
+    # tornar_atual=False não cria nem mexe no apontador
+    outra_base = tmp_path / "outra"
+    outra_base.mkdir()
+    salvar_artefato(encoder, modelo, colunas, diretorio_base=str(outra_base), tornar_atual=False)
+    assert not (outra_base / ARQUIVO_ATUAL).exists()
+
+
+def test_caminho_atual_sem_apontador_usa_legado(tmp_path):
+    assert caminho_atual(str(tmp_path)) == mod_artefato.CAMINHO_LEGADO
+    (tmp_path / ARQUIVO_ATUAL).write_text("versao-que-nao-existe")
+    assert caminho_atual(str(tmp_path)) == mod_artefato.CAMINHO_LEGADO
+
+
+def test_carga_preguicosa(artefato_teste, monkeypatch):
+    lidos = []
+    original = joblib.load
+    monkeypatch.setattr(mod_artefato.joblib, "load", lambda caminho: lidos.append(caminho) or original(caminho))
+
+    artefato = carregar_artefato(artefato_teste)
+    assert isinstance(artefato, Artefato)
+    assert artefato.threshold == 0.4
+    assert lidos == []
+    assert "modelo" not in artefato.__dict__
+
+    artefato.encoder
+    artefato.encoder
+    assert len(lidos) == 1
+    assert artefato.modelo is artefato.modelo
+
+
+def test_formato_desconhecido(artefato_teste, tmp_path):
+    with open(os.path.join(artefato_teste, "manifesto.json")) as f:
+        manifesto = json.load(f)
+    (tmp_path / "manifesto.json").write_text(json.dumps({**manifesto, "formato": 99}))
+    with pytest.raises(ValueError, match="Formato de artefato não suportado"):
+        Artefato(str(tmp_path))
+
+
+def test_dados_de_avaliacao_em_memory_map(treinado, tmp_path):
+    encoder, modelo, colunas = treinado
+    y = np.array([0, 1, 1, 0])
+    X = np.array([[1, "a"], [2, "b"]], dtype=object)[:, :1]
+    destino = salvar_artefato(encoder, modelo, colunas, diretorio_base=str(tmp_path),
+                              avaliacao={"y_test": y, "X_test": X}, relatorio={"threshold": 0.3})
+
+    dados = carregar_artefato(destino).dados_avaliacao()
+    assert isinstance(dados["y_test"], np.memmap)
+    np.testing.assert_array_equal(dados["y_test"], y)
+    # Arrays object viram float64 para poderem ser abertos com memory-map
+    assert dados["X_test"].dtype == np.float64
+    with pytest.raises(ValueError):
+        dados["y_test"][0] = 5
+
+    with open(os.path.join(destino, "avaliacao", "relatorio.json")) as f:
+        assert json.load(f) == {"threshold": 0.3, "versao_modelo": os.path.basename(destino)}
+
+    sem_avaliacao = salvar_artefato(encoder, modelo, colunas, diretorio_base=str(tmp_path / "b"))
+    assert carregar_artefato(sem_avaliacao).dados_avaliacao() is None
+
+
+def test_falha_ao_gravar_nao_deixa_diretorio(treinado, tmp_path):
+    encoder, modelo, colunas = treinado
+    # Array object que não vira float64: a gravação falha no meio
+    with pytest.raises(ValueError):
+        salvar_artefato(encoder, modelo, colunas, diretorio_base=str(tmp_path),
+                        avaliacao={"X_test": np.array(["a"], dtype=object)})
+    assert os.listdir(tmp_path) == []
+
+
+def test_atualizar_manifesto(artefato_teste, tmp_path):
+    destino = str(shutil.copytree(artefato_teste, tmp_path / "copia"))
+    atualizar_manifesto(destino, threshold=0.55, nota="ajuste")
+    artefato = carregar_artefato(destino)
+    assert artefato.threshold == 0.55
+    assert artefato.manifesto["nota"] == "ajuste"
+    assert not os.path.exists(os.path.join(destino, "manifesto.json.tmp"))
+
+    with pytest.raises(ValueError, match="não é um artefato versionado"):
+        atualizar_manifesto(str(tmp_path / "modelo.pkl"), threshold=0.5)
+
+
+def test_converter_legado(treinado, tmp_path):
+    encoder, modelo, colunas = treinado
+    pkl = tmp_path / "modelo_completo.pkl"
+    joblib.dump({"encoder": encoder, "model": modelo, "X_test_encoded": np.ones((3, 2)), "y_test": np.array([0, 1, 0])},
+                pkl)
+    legado = carregar_artefato(str(pkl))
+    assert isinstance(legado, ArtefatoLegado)
+    assert legado.colunas == list(encoder.feature_names_in_)
+
+    destino = converter_legado(str(pkl), diretorio_base=str(tmp_path / "artefatos"))
+    convertido = carregar_artefato(destino)
+    assert convertido.manifesto["versao_origem"] == legado.versao
+    assert convertido.colunas == legado.colunas
+    np.testing.assert_array_equal(convertido.dados_avaliacao()["y_test"], [0, 1, 0])
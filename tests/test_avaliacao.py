@@ -0,0 +1,77 @@
+"""Varredura de thresholds e escolha do threshold de operação."""
+import json
+
+import numpy as np
+import pytest
+from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
+
+from data.models.avaliacao import (
+    escolher_e_medir, escolher_threshold, metricas_no_threshold, montar_relatorio, varrer_thresholds,
+)
+
+
+def _dados(n=2000, semente=0):
+    rng = np.random.default_rng(semente)
+    y = rng.integers(0, 2, n)
+    # Scores arredondados: muitos empates, inclusive exatamente nos thresholds da grade
+    scores = np.clip(np.round(0.3 * y + rng.uniform(0, 0.7, n), 2), 0, 1)
+    return y, scores
+
+
+def test_varredura_igual_ao_sklearn():
+    y, scores = _dados()
+    tabela = varrer_thresholds(y, scores, custo_fp=1.0, custo_fn=5.0)
+    assert len(tabela) == 99
+
+    for linha in tabela.itertuples():
+        previsto = (scores >= linha.threshold).astype(int)
+        tn, fp, fn, tp = confusion_matrix(y, previsto, labels=[0, 1]).ravel()
+        assert (linha.tp, linha.fp, linha.fn, linha.tn) == (tp, fp, fn, tn)
+        assert linha.precision == pytest.approx(precision_score(y, previsto, zero_division=0))
+        assert linha.recall == pytest.approx(recall_score(y, previsto, zero_division=0))
+        assert linha.f1 == pytest.approx(f1_score(y, previsto, zero_division=0))
+        assert linha.custo == fp + 5 * fn
+
+
+def test_casos_degenerados():
+    # Sem positivos: recall e F1 zerados, sem divisão por zero
+    tabela = varrer_thresholds(np.zeros(5), np.linspace(0, 1, 5), [0.0, 0.5, 1.01])
+    assert tabela["recall"].tolist() == [0.0, 0.0, 0.0]
+    assert tabela["f1"].tolist() == [0.0, 0.0, 0.0]
+    # Threshold acima de todos os scores: nenhum previsto positivo, precision 0
+    tabela = varrer_thresholds([1, 0, 1], [0.2, 0.4, 0.6], [0.7])
+    assert tabela.iloc[0][["tp", "fp", "fn", "tn"]].tolist() == [0, 0, 2, 1]
+    assert tabela.iloc[0]["precision"] == 0.0
+
+
+def test_escolher_threshold():
+    y, scores = _dados(semente=1)
+    tabela = varrer_thresholds(y, scores)
+    por_f1 = escolher_threshold(tabela, "f1")
+    assert por_f1["f1"] == tabela["f1"].max()
+    # Empate: o menor threshold
+    assert por_f1["threshold"] == tabela.loc[tabela["f1"] == tabela["f1"].max(), "threshold"].min()
+    por_custo = escolher_threshold(tabela, "custo")
+    assert por_custo["custo"] == tabela["custo"].min()
+    with pytest.raises(ValueError, match="Critério"):
+        escolher_threshold(tabela, "auc")
+
+
+def test_escolher_e_medir_mede_no_teste_o_threshold_da_selecao():
+    y_selecao, scores_selecao = _dados(semente=2)
+    y_teste, scores_teste = _dados(500, semente=3)
+    tabela, escolhido, teste = escolher_e_medir(y_selecao, scores_selecao, y_teste, scores_teste, "custo", 1.0, 8.0)
+
+    assert escolhido["custo"] == tabela["custo"].min()
+    esperado = metricas_no_threshold(y_teste, scores_teste, escolhido["threshold"], 1.0, 8.0)
+    assert teste.equals(esperado)
+    assert teste["f1"] == pytest.approx(f1_score(y_teste, scores_teste >= escolhido["threshold"]))
+
+    relatorio = montar_relatorio(tabela, escolhido, "custo", 1.0, 8.0, teste=teste, origem="oof_treino")
+    json.dumps(relatorio)
+    assert relatorio["threshold"] == escolhido["threshold"]
+    assert relatorio["metricas"]["f1"] == teste["f1"]
+    assert relatorio["metricas_selecao"]["f1"] == escolhido["f1"]
+    assert relatorio["amostras"] == 500
+    assert relatorio["positivos"] == int(y_teste.sum())
+    assert len(relatorio["grade"]) == len(tabela)
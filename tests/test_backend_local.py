@@ -0,0 +1,86 @@
+"""Banco local embutido (DuckDB): DSN, views sobre as tabelas da ingestão e ids estáveis."""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.data.processed import backend_local, data_acess
+from backend.data.processed.datasets import DATASETS
+
+from data.models.aply_mode import columns_for_model_input
+
+
+def _ler(engine, sql):
+    with engine.connect() as conn:
+        return pd.read_sql_query(text(sql), conn)
+
+
+def test_dsn(monkeypatch):
+    monkeypatch.setenv("DB_BACKEND", "duckdb")
+    assert data_acess.montar_dsn() == backend_local.montar_dsn_local() == f"duckdb:///{backend_local.CAMINHO_BANCO}"
+    assert backend_local.eh_dsn_local(data_acess.montar_dsn())
+
+    monkeypatch.setenv("DB_BACKEND", "postgres")
+    for nome, valor in {"DB_USER": "u", "DB_PASS": "p", "DB_HOST": "h", "DB_PORT": "6543", "DB_NAME": "seguros"}.items():
+        monkeypatch.setenv(nome, valor)
+    monkeypatch.delenv("DB_DRIVER", raising=False)
+    assert data_acess.montar_dsn() == "postgresql://u:p@h:6543/seguros"
+    assert not backend_local.eh_dsn_local(data_acess.montar_dsn())
+
+
+def test_views_com_as_colunas_usadas(banco_local):
+    engine = data_acess.get_engine(banco_local)
+    for nome in backend_local.VIEWS:
+        _ler(engine, f"SELECT * FROM {nome} LIMIT 1")
+    for view, tipos in DATASETS.items():
+        assert set(tipos) <= set(_ler(engine, f"SELECT * FROM {view} LIMIT 0").columns), view
+    predicao = _ler(engine, "SELECT * FROM v_clientes_para_predicao_final LIMIT 0").columns
+    assert set(columns_for_model_input) | {"cliente_id", "id_contrato_legado"} <= set(predicao)
+
+
+def test_ids_e_status(banco_local, dados):
+    engine = data_acess.get_engine(banco_local)
+    contratos = _ler(engine, "SELECT * FROM v_contratos_detalhados")
+    origem = pd.read_csv(dados / "P18_contratos.csv")
+    cancelados = set(pd.read_csv(dados / "P18_cancelamentos.csv")["id_contrato"])
+
+    assert len(contratos) == len(origem)
+    assert contratos["contrato_id"].is_unique
+    por_codigo = contratos.set_index("contrato_codigo")
+    # C00042 -> 42
+    esperado = origem.set_index("id_contrato")["id_cliente"].str[1:].astype(int)
+    assert (por_codigo.loc[esperado.index, "cliente_id"] == esperado).all()
+    for codigo, status in por_codigo["status_contrato"].items():
+        assert (status == "Cancelado") == (codigo in cancelados)
+
+    # contrato_id vem do md5 do código: o mesmo num banco novo, carregado de novo do zero
+    outro = create_engine(backend_local.montar_dsn_local(str(dados.parent / "outro" / "local.duckdb")))
+    try:
+        backend_local.preparar_banco_local(outro, str(dados))
+        de_novo = _ler(outro, "SELECT contrato_codigo, contrato_id FROM v_contratos_detalhados")
+    finally:
+        outro.dispose()
+    de_novo = de_novo.set_index("contrato_codigo")["contrato_id"]
+    assert (de_novo == por_codigo.loc[de_novo.index, "contrato_id"]).all()
+
+
+def test_faturamento_mensal_igual_ao_calculo_em_pandas(banco_local):
+    engine = data_acess.get_engine(banco_local)
+    contratos = _ler(engine, "SELECT * FROM v_contratos_detalhados "
+                             "WHERE data_inicio IS NOT NULL AND data_fim IS NOT NULL")
+    linhas = []
+    for c in contratos.itertuples():
+        for mes in pd.date_range(pd.Timestamp(c.data_inicio).to_period("M").to_timestamp(),
+                                 pd.Timestamp(c.data_fim), freq="MS"):
+            linhas.append((mes, c.tipo_seguro_nome, c.status_contrato, c.premio_mensal))
+    esperado = (pd.DataFrame(linhas, columns=["mes_vigencia", "tipo_seguro_nome", "status_contrato", "premio"])
+                .groupby(["mes_vigencia", "tipo_seguro_nome", "status_contrato"])
+                .agg(faturamento=("premio", "sum"), qtd_contratos=("premio", "size")).reset_index())
+
+    view = _ler(engine, "SELECT * FROM faturamento_mensal")
+    view["mes_vigencia"] = pd.to_datetime(view["mes_vigencia"])
+    chaves = ["mes_vigencia", "tipo_seguro_nome", "status_contrato"]
+    view = view.sort_values(chaves).reset_index(drop=True)
+    esperado = esperado.sort_values(chaves).reset_index(drop=True)
+    pd.testing.assert_frame_equal(view[chaves], esperado[chaves], check_dtype=False)
+    assert (view["qtd_contratos"].to_numpy() == esperado["qtd_contratos"].to_numpy()).all()
+    assert view["faturamento"].to_numpy() == pytest.approx(esperado["faturamento"].to_numpy())
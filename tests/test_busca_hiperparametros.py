@@ -0,0 +1,64 @@
+"""Busca de hiperparâmetros: o fold de validação fica fora do treino e do early stopping."""
+import pytest
+from sklearn.model_selection import StratifiedKFold
+
+from data.models import busca_hiperparametros as busca
+from data.models.aply_mode import columns_for_model_input
+
+from conftest import gerar_clientes_predicao
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    # O CatBoost grava catboost_info/ no diretório atual (também nos processos do pool)
+    monkeypatch.chdir(tmp_path)
+    df = gerar_clientes_predicao(300, semente=7)
+    return df[columns_for_model_input], df["cancelou"]
+
+
+def test_fold_de_validacao_nao_participa_do_treino(base, monkeypatch):
+    X, y = base
+    busca._iniciar_worker(X, y)
+    vistos = {}
+    treinar = busca.TREINOS["nativo"]
+
+    def espiao(X_treino, y_treino, parametros, validacao=None):
+        vistos["treino"], vistos["parada"] = set(X_treino.index), set(validacao[0].index)
+        return treinar(X_treino, y_treino, parametros, validacao)
+
+    monkeypatch.setitem(busca.TREINOS, "nativo", espiao)
+    indices_treino, indices_validacao = next(StratifiedKFold(3, shuffle=True, random_state=0).split(X, y))
+    resultado = busca._rodar_fold("nativo", {"iterations": 200, "eval_metric": busca.METRICA_PARADA},
+                                  indices_treino, indices_validacao)
+
+    validacao = set(X.index[indices_validacao])
+    assert not vistos["treino"] & validacao
+    assert not vistos["parada"] & validacao
+    assert not vistos["treino"] & vistos["parada"]
+    assert vistos["treino"] | vistos["parada"] == set(X.index[indices_treino])
+    assert len(vistos["parada"]) == pytest.approx(busca.FRACAO_PARADA * len(indices_treino), abs=1)
+    assert 1 <= resultado["iteracoes"] <= 200
+    assert 0 <= resultado["f1"] <= 1
+
+
+def test_buscar_e_parametros_finais(base, monkeypatch):
+    X, y = base
+    monkeypatch.setattr(busca, "MAX_ITERACOES", 60)
+    tabela = busca.buscar(X, y, "nativo", tentativas=3, folds=3, workers=2, semente=1, minimo_poda=99)
+
+    assert len(tabela) == 3
+    assert (tabela["status"] == "completa").all()
+    assert (tabela["folds"] == 3).all()
+    assert tabela["f1_medio"].is_monotonic_decreasing
+    assert tabela["iteracoes"].between(1, 60).all()
+
+    parametros = busca.parametros_finais(tabela.iloc[0])
+    assert set(parametros) == set(busca.ESPACO_BUSCA) | {"iterations"}
+    assert parametros["iterations"] == tabela.iloc[0]["iteracoes"]
+    assert isinstance(parametros["depth"], int)
+
+
+def test_deve_podar():
+    assert not busca.deve_podar(0.1, [0.5, 0.6], minimo=3)
+    assert busca.deve_podar(0.1, [0.5, 0.6, 0.7], minimo=3)
+    assert not busca.deve_podar(0.65, [0.5, 0.6, 0.7], minimo=3)
@@ -0,0 +1,60 @@
+"""Engine compartilhada por DSN e métricas do pool (eventos + espera em raw_connection)."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from backend.data.processed import data_acess
+
+
+@pytest.fixture
+def dsn(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    yield f"sqlite:///{tmp_path / 'pool.db'}"
+    data_acess.dispose_engines()
+
+
+def test_uma_engine_por_dsn(dsn):
+    engine = data_acess.get_engine(dsn)
+    assert data_acess.get_engine(dsn) is engine
+    assert type(engine.pool) is QueuePool
+
+
+def test_metricas_do_pool(dsn):
+    engine = data_acess.get_engine(dsn)
+    antes = data_acess.get_pool_metrics()
+
+    liberar = threading.Event()
+
+    def segurar_conexao():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            liberar.wait()
+
+    segurando = threading.Thread(target=segurar_conexao)
+    segurando.start()
+    time.sleep(0.05)
+    # Pool de uma conexão ocupada: este checkout espera a outra thread devolver
+    threading.Timer(0.2, liberar.set).start()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT 1"))
+    segurando.join()
+
+    depois = data_acess.get_pool_metrics()
+    assert depois["checkouts"] - antes["checkouts"] == 2
+    assert depois["checkins"] - antes["checkins"] == 2
+    assert depois["conexoes_criadas"] - antes["conexoes_criadas"] == 1
+    assert depois["espera_max_s"] >= 0.1
+    assert str(engine.url) in depois["engines"]
+
+
+def test_metricas_continuam_depois_do_dispose(dsn):
+    engine = data_acess.get_engine(dsn)
+    engine.dispose()
+    antes = data_acess.get_pool_metrics()["checkouts"]
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert data_acess.get_pool_metrics()["checkouts"] == antes + 1
@@ -0,0 +1,52 @@
+"""Datasets compartilhados: colunas projetadas, tipos em memória, cópia rasa por chamada e índices derivados."""
+import pandas as pd
+import pytest
+import streamlit as st
+
+from backend.data.processed.datasets import DATASETS, carregar_dataset, indice_dataset
+
+from conftest import LINHAS_INICIAIS
+
+
+def test_dataset_tipado(ambiente_local):
+    df = carregar_dataset("v_contratos_detalhados")
+    assert len(df) == LINHAS_INICIAIS["contratos"]
+    assert list(df.columns) == [col for col in DATASETS["v_contratos_detalhados"] if col in df.columns]
+    assert isinstance(df["tipo_seguro_nome"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_dtype(df["data_inicio"])
+    assert pd.api.types.is_numeric_dtype(df["premio_mensal"])
+
+
+def test_copia_rasa_por_chamada(ambiente_local):
+    primeiro = carregar_dataset("v_perfil_cliente_enriquecido")
+    primeiro["coluna_da_pagina"] = 1
+    segundo = carregar_dataset("v_perfil_cliente_enriquecido")
+    # A coluna nova ficou só na cópia da primeira chamada; os dados são os mesmos
+    assert "coluna_da_pagina" not in segundo.columns
+    assert primeiro is not segundo
+    assert primeiro["nome"].equals(segundo["nome"])
+
+
+def test_view_nao_configurada(ambiente_local):
+    with pytest.raises(KeyError):
+        carregar_dataset("v_inexistente")
+
+
+def test_indice_devolve_o_dataset_sobre_o_qual_foi_montado(ambiente_local):
+    construidos = []
+
+    def construir(df):
+        construidos.append(df)
+        return df["cliente_id"].to_numpy()
+
+    df, indice = indice_dataset("v_perfil_cliente_enriquecido", "teste", construir)
+    assert (df["cliente_id"].to_numpy() == indice).all()
+    # Cópia rasa por chamada, como carregar_dataset; o índice não é refeito sem recarga
+    outro, mesmo_indice = indice_dataset("v_perfil_cliente_enriquecido", "teste", construir)
+    assert outro is not df and mesmo_indice is indice and len(construidos) == 1
+
+    # Dataset buscado de novo (fim do TTL): o índice é refeito e volta junto com o dataset novo
+    st.cache_resource.clear()
+    novo, novo_indice = indice_dataset("v_perfil_cliente_enriquecido", "teste", construir)
+    assert len(construidos) == 2 and novo_indice is not indice
+    assert (novo["cliente_id"].to_numpy() == novo_indice).all()
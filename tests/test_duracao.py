@@ -0,0 +1,44 @@
+"""Duração de contratos vetorizada contra o relativedelta e o histograma pré-agrupado."""
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from backend.data.processed.duracao import diferenca_meses, duracao_dias, histograma_meses
+
+
+def _meses_relativedelta(inicio, fim):
+    if pd.isna(inicio) or pd.isna(fim):
+        return np.nan
+    delta = relativedelta(fim.to_pydatetime(), inicio.to_pydatetime())
+    return delta.years * 12 + delta.months
+
+
+def test_diferenca_meses_igual_ao_relativedelta():
+    rng = np.random.default_rng(11)
+    n = 3000
+    inicio = pd.Series(pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 2500, n), unit="D"))
+    fim = inicio + pd.to_timedelta(rng.integers(-400, 1500, n), unit="D")
+    # Fins de mês e horários, onde o dia transportado é limitado ao último dia do mês de fim
+    inicio.iloc[:6] = pd.to_datetime(["2021-01-31", "2020-02-29", "2021-03-31 18:00", "2021-08-31", "2019-12-31", "2021-05-15"], format="mixed")
+    fim.iloc[:6] = pd.to_datetime(["2021-02-28", "2021-02-28", "2021-04-30 12:00", "2021-06-30", "2020-02-29", "2021-05-15"], format="mixed")
+    inicio.iloc[10] = pd.NaT
+    fim.iloc[11] = pd.NaT
+
+    esperado = np.array([_meses_relativedelta(i, f) for i, f in zip(inicio, fim)], dtype=np.float64)
+    np.testing.assert_array_equal(diferenca_meses(inicio, fim), esperado)
+
+
+def test_duracao_dias():
+    dias = duracao_dias(["2021-01-01", "2021-03-01", None], ["2021-01-31", "2021-02-01", "2021-01-01"])
+    np.testing.assert_array_equal(dias, [30.0, -28.0, np.nan])
+
+
+def test_histograma_meses():
+    meses = np.array([0, 1, 5, 11, 12, 23, np.nan, 23])
+    hist = histograma_meses(meses, nbins=4)
+    assert hist["contratos"].sum() == 7
+    assert hist["inicio"].iloc[0] == 0 and hist["fim"].iloc[-1] >= 23
+    assert (hist["fim"] - hist["inicio"] + 1 == hist["largura"]).all()
+    for linha in hist.itertuples():
+        assert linha.contratos == ((meses >= linha.inicio) & (meses <= linha.fim)).sum()
+    assert histograma_meses([np.nan]).empty
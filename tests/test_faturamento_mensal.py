@@ -0,0 +1,107 @@
+"""Atualização incremental da tabela resumo faturamento_mensal (DuckDB) contra o recálculo completo."""
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.data.processed import faturamento_mensal
+from backend.data.processed.faturamento_mensal import atualizar_faturamento_mensal, existe_faturamento_mensal
+
+TIPOS = ["Auto", "Residencial", "Vida"]
+STATUS = ["Ativo", "Cancelado", "Encerrado"]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    pytest.importorskip("duckdb_engine")
+    rng = np.random.default_rng(13)
+    n = 300
+    inicio = pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 900, n), unit="D")
+    contratos = pd.DataFrame({
+        "contrato_id": np.arange(n),
+        "tipo_seguro_nome": rng.choice(TIPOS, n),
+        "status_contrato": rng.choice(STATUS, n),
+        "premio_mensal": rng.uniform(50, 900, n).round(2),
+        "data_inicio": inicio,
+        "data_fim": inicio + pd.to_timedelta(rng.integers(30, 1000, n), unit="D"),
+    })
+    engine = create_engine(f"duckdb:///{tmp_path / 'faturamento.duckdb'}")
+    with engine.begin() as conn:
+        conn.connection.driver_connection.register("_contratos", contratos)
+        conn.execute(text("CREATE TABLE v_contratos_detalhados AS SELECT * FROM _contratos"))
+    faturamento_mensal._existe.clear()
+    yield engine
+    engine.dispose()
+
+
+def _resumo(engine):
+    with engine.connect() as conn:
+        df = pd.read_sql_query(text("""
+            SELECT mes_vigencia, tipo_seguro_nome, status_contrato, faturamento, qtd_contratos
+            FROM faturamento_mensal ORDER BY 1, 2, 3
+        """), conn)
+    return df.reset_index(drop=True)
+
+
+def _esperado(engine):
+    with engine.connect() as conn:
+        contratos = pd.read_sql_query(text("SELECT * FROM v_contratos_detalhados"), conn)
+    linhas = []
+    for c in contratos.itertuples():
+        for mes in pd.date_range(pd.Timestamp(c.data_inicio).to_period("M").to_timestamp(),
+                                 pd.Timestamp(c.data_fim).to_period("M").to_timestamp(), freq="MS"):
+            linhas.append((mes.date(), c.tipo_seguro_nome, c.status_contrato, c.premio_mensal))
+    df = pd.DataFrame(linhas, columns=["mes_vigencia", "tipo_seguro_nome", "status_contrato", "premio"])
+    return (df.groupby(["mes_vigencia", "tipo_seguro_nome", "status_contrato"])
+              .agg(faturamento=("premio", "sum"), qtd_contratos=("premio", "size"))
+              .reset_index())
+
+
+def _comparar(engine):
+    obtido, esperado = _resumo(engine), _esperado(engine)
+    assert len(obtido) == len(esperado)
+    assert (obtido["mes_vigencia"].astype(str) == esperado["mes_vigencia"].astype(str)).all()
+    assert (obtido["tipo_seguro_nome"] == esperado["tipo_seguro_nome"]).all()
+    assert (obtido["qtd_contratos"] == esperado["qtd_contratos"]).all()
+    np.testing.assert_allclose(obtido["faturamento"].astype(float), esperado["faturamento"], atol=0.01)
+
+
+def test_atualizacao_incremental_igual_ao_recalculo(engine):
+    alterados, _ = atualizar_faturamento_mensal(engine=engine)
+    assert alterados == 300
+    _comparar(engine)
+    assert atualizar_faturamento_mensal(engine=engine) == (0, 0)
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE v_contratos_detalhados SET premio_mensal = premio_mensal + 10 WHERE contrato_id = 1"))
+        conn.execute(text("UPDATE v_contratos_detalhados SET status_contrato = 'Suspenso' WHERE contrato_id = 2"))
+        conn.execute(text("UPDATE v_contratos_detalhados SET data_fim = data_fim + INTERVAL 400 DAY WHERE contrato_id = 3"))
+        conn.execute(text("DELETE FROM v_contratos_detalhados WHERE contrato_id = 4"))
+        conn.execute(text("""
+            INSERT INTO v_contratos_detalhados
+            VALUES (1000, 'Auto', 'Ativo', 99.9, TIMESTAMP '2020-06-15', TIMESTAMP '2021-02-01')
+        """))
+    alterados, meses = atualizar_faturamento_mensal(engine=engine)
+    assert alterados == 5 and meses > 0
+    _comparar(engine)
+
+    incremental = _resumo(engine)
+    atualizar_faturamento_mensal(completo=True, engine=engine)
+    pd.testing.assert_frame_equal(_resumo(engine), incremental)
+
+
+def test_view_local_nao_e_atualizada(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE VIEW faturamento_mensal AS SELECT 1 AS mes_vigencia"))
+    assert atualizar_faturamento_mensal(engine=engine) == (0, 0)
+
+
+def test_existencia_memorizada_por_engine(engine, monkeypatch):
+    assert existe_faturamento_mensal(engine) is False
+    atualizar_faturamento_mensal(engine=engine)
+    # A ausência fica memorizada até REVERIFICAR_AUSENTE_S; a presença, para sempre
+    assert existe_faturamento_mensal(engine) is False
+    monkeypatch.setattr(faturamento_mensal, "REVERIFICAR_AUSENTE_S", 0)
+    assert existe_faturamento_mensal(engine) is True
+    monkeypatch.setattr(faturamento_mensal, "inspect", None)
+    assert existe_faturamento_mensal(engine) is True
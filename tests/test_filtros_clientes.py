@@ -0,0 +1,134 @@
+"""Filtros e agregados da página de clientes no banco: mesma resposta do cálculo em memória."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.data.processed import filtros_clientes as fc
+from backend.data.processed.datasets import carregar_dataset
+from frontend.pages import clientes
+
+
+def test_compilar_filtros():
+    assert fc.compilar_filtros({}) == ("1 = 1", {}, [])
+    # Listas vazias e faixas incompletas não filtram
+    assert fc.compilar_filtros({"nome": "", "genero": [], "idade_min": 20}) == ("1 = 1", {}, [])
+
+    where, params, listas = fc.compilar_filtros({
+        "nome": "Jo_ão%",
+        "genero": ["F", "M"],
+        "educacao": [],
+        "idade_min": np.int64(20),
+        "idade_max": np.int64(40),
+        "renda_min": np.float64(1000.5),
+        "renda_max": 5000,
+    })
+    assert where == ("nome_busca(nome) LIKE :nome_prefixo ESCAPE '\\' AND genero IN :genero "
+                     "AND idade_atual BETWEEN :idade_min AND :idade_max "
+                     "AND renda_mensal BETWEEN :renda_min AND :renda_max")
+    # Prefixo normalizado (sem acento) com os curingas do LIKE escapados
+    assert params["nome_prefixo"] == "jo\\_ao\\%%"
+    assert listas == ["genero"]
+    assert params["genero"] == ["F", "M"]
+    # Escalares numpy viram tipos Python antes de ir para o driver
+    assert type(params["idade_min"]) is int and type(params["renda_min"]) is float
+
+    where, params, _ = fc.compilar_filtros({"nome": "JoÃo"}, sem_acento=False)
+    assert where == "lower(nome) LIKE :nome_prefixo ESCAPE '\\'"
+    assert params == {"nome_prefixo": "joão%"}
+
+
+@pytest.fixture
+def perfil(ambiente_local, monkeypatch):
+    """A view de perfil inteira (como o modo em memória a vê) e os filtros padrão da página."""
+    monkeypatch.setattr(clientes, "MODO_FILTRO", "banco")
+    return carregar_dataset(fc.VIEW_CLIENTES), clientes.filtros_padrao()
+
+
+def _variacoes(padrao):
+    yield padrao
+    yield {**padrao, "genero": ["F"], "idade_min": 30, "idade_max": 50}
+    yield {**padrao, "nome": "a", "educacao": padrao["educacao"][:1], "contratos_min": 2}
+    yield {**padrao, "renda_min": 5000.0, "dependentes_max": 1}
+    yield {**padrao, "nome": "zzz"}
+
+
+def test_consultas_no_banco_iguais_ao_filtro_em_memoria(perfil):
+    df, padrao = perfil
+    for filtros in _variacoes(padrao):
+        esperado = clientes.apply_filters(df, filtros).sort_values("cliente_id")
+        assert fc.contar_clientes(filtros) == len(esperado)
+        assert fc.exportar_clientes(filtros)["cliente_id"].tolist() == esperado["cliente_id"].tolist()
+
+        pagina, total = clientes.filtrar_clientes(filtros, 2, tamanho_pagina=7)
+        assert total == len(esperado)
+        assert pagina["cliente_id"].tolist() == esperado["cliente_id"].iloc[7:14].tolist()
+        assert list(pagina.columns) == fc.COLUNAS_LISTAGEM
+
+
+def test_modo_em_memoria_igual_ao_banco(perfil, monkeypatch):
+    _, padrao = perfil
+    monkeypatch.setattr(clientes, "MODO_FILTRO", "memoria")
+    for filtros in _variacoes(padrao):
+        pagina, total = clientes.filtrar_clientes(filtros, 2, tamanho_pagina=7)
+        assert total == fc.contar_clientes(filtros)
+        assert pagina["cliente_id"].tolist() == fc.buscar_pagina_clientes(filtros, 2, 7)["cliente_id"].tolist()
+        assert (clientes.exportar_filtrados(filtros)["cliente_id"].sort_values().tolist()
+                == fc.exportar_clientes(filtros)["cliente_id"].tolist())
+
+
+def test_resumo_igual_ao_pandas(perfil):
+    df, padrao = perfil
+    resumo = fc.resumo_clientes()
+    assert resumo["total"] == len(df)
+    assert resumo["media_dependentes"] == pytest.approx(df["qtd_dependente"].mean())
+    assert resumo["multi_contratos"] == (df["total_contratos"] > 1).sum()
+    assert resumo["renda_media"] == pytest.approx(df["renda_mensal"].mean())
+    assert resumo["com_situacao"] == df["status_cliente"].count()
+    for situacao, quantidade in resumo["situacao"].items():
+        assert quantidade == (df["status_cliente"] == situacao).sum()
+    for coluna, chave_min, chave_max in fc.FILTROS_FAIXA:
+        assert resumo[chave_min] == pytest.approx(df[coluna].min())
+        assert resumo[chave_max] == pytest.approx(df[coluna].max())
+
+    assert padrao["idade_min"] == int(df["idade_atual"].min())
+    assert sorted(padrao["genero"]) == sorted(df["genero"].dropna().astype(str).unique())
+    escolaridade = fc.contagem_clientes("nivel_educacional").set_index("nivel_educacional")["count"]
+    assert escolaridade.to_dict() == df["nivel_educacional"].astype(str).value_counts().to_dict()
+    with pytest.raises(KeyError):
+        fc.contagem_clientes("coluna_inexistente")
+
+
+def test_perfil_por_faixa_etaria_igual_ao_pandas(perfil):
+    df, _ = perfil
+    inicios = [inicio for inicio, _, _ in fc.FAIXAS_ETARIAS] + [fc.FAIXAS_ETARIAS[-1][1]]
+    df = df.assign(faixa_etaria=pd.cut(df["idade_atual"], bins=inicios, right=False,
+                                       labels=[rotulo for _, _, rotulo in fc.FAIXAS_ETARIAS]))
+    faixas = fc.perfil_por_faixa_etaria()
+
+    contagem = faixas.dropna(subset=["genero"]).set_index(["faixa_etaria", "genero"])["count"]
+    esperado = df.groupby(["faixa_etaria", "genero"], observed=True).size()
+    esperado.index = esperado.index.set_levels(esperado.index.levels[0].astype(str), level=0)
+    assert contagem.to_dict() == esperado.to_dict()
+
+    renda = faixas.groupby("faixa_etaria")[["renda_total", "com_renda"]].sum()
+    esperado = df.groupby("faixa_etaria", observed=True)["renda_mensal"].mean()
+    for faixa, media in esperado.items():
+        assert renda.loc[str(faixa), "renda_total"] / renda.loc[str(faixa), "com_renda"] == pytest.approx(media)
+
+
+def test_pagina_guardada_alem_do_total(perfil):
+    from streamlit.testing.v1 import AppTest
+
+    _, padrao = perfil
+    app = AppTest.from_string("from frontend.pages import clientes\nclientes.render()", default_timeout=60)
+    # Sessão de antes dos dados mudarem: os mesmos filtros, numa página que não existe mais
+    app.session_state["filtros"] = padrao
+    app.session_state["assinatura_filtros"] = repr(sorted(padrao.items()))
+    app.session_state["pagina_clientes"] = 999
+    app.run()
+
+    assert not app.exception and not app.error
+    total_paginas = -(-fc.contar_clientes(padrao) // fc.TAMANHO_PAGINA)
+    assert app.session_state["pagina_clientes"] == total_paginas
+    assert app.number_input[0].value == total_paginas
+    assert len(app.dataframe[0].value) == fc.contar_clientes(padrao) - (total_paginas - 1) * fc.TAMANHO_PAGINA
@@ -0,0 +1,34 @@
+"""Cenário "se tivessem cancelado" da home: previsões casadas por contrato_id, sem multiplicar linhas."""
+import pandas as pd
+
+from frontend.pages.home import marcar_contratos_previstos
+
+
+def test_cada_contrato_recebe_so_a_propria_previsao():
+    # Cliente 1 tem dois contratos Auto; só o 10 está previsto para cancelar
+    contratos = pd.DataFrame({
+        "contrato_id": [10, 11, 12, 13],
+        "cliente_id": [1, 1, 2, 3],
+        "tipo_seguro_nome": ["Auto", "Auto", "Vida", "Auto"],
+        "premio_mensal": [100.0, 200.0, 50.0, 80.0],
+    })
+    previsoes = pd.DataFrame({
+        "cliente_id": [1, 1, 2],
+        "contrato_id": [10, 11, 12],
+        "tipo_seguro_nome": ["Auto", "Auto", "Vida"],
+        "tende_cancelar": [1, 0, 1],
+    })
+    marcados = marcar_contratos_previstos(contratos.copy(), previsoes)
+
+    assert len(marcados) == len(contratos)
+    assert marcados["contrato_id"].tolist() == [10, 11, 12, 13]
+    # 11 (mesmo cliente e tipo do 10) não é arrastado; 13 não tem previsão
+    assert marcados["is_predicted_to_cancel"].tolist() == [True, False, True, False]
+    assert marcados["is_predicted_to_cancel"].dtype == bool
+
+
+def test_sem_previsoes_nenhum_contrato_marcado():
+    contratos = pd.DataFrame({"contrato_id": [1, 2], "cliente_id": [1, 2]})
+    previsoes = pd.DataFrame(columns=["cliente_id", "contrato_id", "tipo_seguro_nome", "tende_cancelar"])
+    marcados = marcar_contratos_previstos(contratos, previsoes)
+    assert not marcados["is_predicted_to_cancel"].any()
@@ -0,0 +1,87 @@
+"""Filtro em memória pelos índices (IndiceNomes + IndiceBitmap) contra a varredura do apply_filters."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.data.processed.filtros_clientes import FILTROS_FAIXA, FILTROS_LISTA
+from backend.data.processed.indice_bitmap import IndiceBitmap
+from backend.data.processed.indice_nomes import IndiceNomes
+from frontend.pages.clientes import apply_filters
+
+NOMES = ["Ana Souza", "Antonio Lima", "Beatriz Rocha", "Bruno Alves", "Carla Dias", "Joana Prado",
+         "Juliana Pires", "Júlia Nunes", "Julio Costa", "Álvaro Ramos", "Marcos Reis", "Maria Silva", "Mariana Melo", "Noah Santos"]
+GENEROS = ["Feminino", "Masculino", "Outro"]
+EDUCACAO = ["Fundamental", "Médio", "Superior", "Pós-graduação"]
+PREFIXOS = ["", "a", "á", "ju", "Jú", "mar", "maria", "x", "NOAH"]
+
+
+@pytest.fixture(scope="module")
+def perfil():
+    rng = np.random.default_rng(7)
+    n = 3000
+    df = pd.DataFrame({
+        "cliente_id": np.arange(n),
+        "nome": rng.choice(NOMES, n),
+        "genero": pd.Categorical(rng.choice(GENEROS, n)),
+        "nivel_educacional": rng.choice(EDUCACAO, n),
+        "idade_atual": rng.integers(18, 90, n).astype(float),
+        "qtd_dependente": rng.integers(0, 6, n),
+        "total_contratos": rng.integers(1, 9, n),
+        "renda_mensal": rng.uniform(800, 30000, n).round(2),
+    })
+    # Nulos não atendem a filtro nenhum, nos dois caminhos
+    df.loc[rng.choice(n, 40, replace=False), "genero"] = np.nan
+    df.loc[rng.choice(n, 40, replace=False), "idade_atual"] = np.nan
+    indices = (
+        IndiceNomes(df["nome"]),
+        IndiceBitmap(df, [coluna for coluna, _ in FILTROS_LISTA], [coluna for coluna, _, _ in FILTROS_FAIXA]),
+    )
+    return df, indices
+
+
+def _filtros_aleatorios(rng, df):
+    filtros = {
+        "nome": str(rng.choice(PREFIXOS)),
+        "genero": list(rng.choice(GENEROS, rng.integers(0, 3), replace=False)),
+        "educacao": list(rng.choice(EDUCACAO, rng.integers(0, 3), replace=False)),
+    }
+    for coluna, chave_min, chave_max in FILTROS_FAIXA:
+        minimo, maximo = df[coluna].min(), df[coluna].max()
+        if rng.random() < 0.4:
+            # Faixa inteira da coluna, como o slider no estado inicial
+            filtros[chave_min], filtros[chave_max] = minimo, maximo
+        else:
+            a, b = sorted(rng.uniform(minimo, maximo, 2))
+            if np.issubdtype(df[coluna].dtype, np.integer) or coluna == "idade_atual":
+                a, b = int(a), int(b)
+            filtros[chave_min], filtros[chave_max] = a, b
+    return filtros
+
+
+def test_indices_iguais_a_varredura_em_300_combinacoes(perfil):
+    df, indices = perfil
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        filtros = _filtros_aleatorios(rng, df)
+        esperado = apply_filters(df, filtros)
+        obtido = apply_filters(df, filtros, indices)
+        assert obtido.index.equals(esperado.index), filtros
+
+
+def test_faixas_completas_nao_filtram(perfil):
+    df, (_, indice_bitmap) = perfil
+    condicoes = (("faixa", "renda_mensal", df["renda_mensal"].min(), df["renda_mensal"].max()),)
+    assert indice_bitmap.estimar(condicoes) == len(df)
+    assert np.array_equal(indice_bitmap.selecionar(condicoes), np.arange(len(df)))
+    # Com nulos a faixa completa ainda exclui as linhas nulas
+    condicoes = (("faixa", "idade_atual", df["idade_atual"].min(), df["idade_atual"].max()),)
+    assert len(indice_bitmap.selecionar(condicoes)) == df["idade_atual"].notna().sum()
+
+
+def test_comeca_pela_condicao_mais_seletiva(perfil):
+    df, (_, indice_bitmap) = perfil
+    condicoes = (
+        ("lista", "nivel_educacional", tuple(EDUCACAO[:3])),
+        ("faixa", "total_contratos", 2, 2),
+    )
+    assert indice_bitmap.estimar(condicoes) == (df["total_contratos"] == 2).sum()
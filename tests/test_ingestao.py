@@ -0,0 +1,96 @@
+"""
+Carga incremental do ingestao.py (anexar / reescrever) no SQLite e no banco local DuckDB,
+e a busca por nome (nome_busca) do banco local criado por ela.
+"""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.data.processed import backend_local, data_acess
+from backend.data.processed.filtros_clientes import VIEW_CLIENTES, compilar_filtros
+from backend.data.processed.indice_nomes import IndiceNomes
+from backend.data.processed.ingestao import ingerir
+
+from conftest import LINHAS_INICIAIS, linhas_raw
+
+LINHAS_ANEXADAS = 150
+
+
+def _contar(engine, tabela):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {tabela}")).scalar()
+
+
+def _anexar_contratos(dados):
+    novas = linhas_raw("contratos")[LINHAS_INICIAIS["contratos"] + 1:LINHAS_INICIAIS["contratos"] + 1 + LINHAS_ANEXADAS]
+    with open(dados / "P18_contratos.csv", "a", encoding="utf-8") as f:
+        f.writelines(novas)
+
+
+def _reescrever_clientes(dados):
+    caminho = dados / "P18_clientes.csv"
+    linhas = caminho.read_text(encoding="utf-8").splitlines(keepends=True)
+    cabecalho, primeira = linhas[0], linhas[1].split(",")
+    primeira[1] = "Nome Reescrito"
+    caminho.write_text(cabecalho + ",".join(primeira) + "".join(linhas[2:]), encoding="utf-8")
+    return primeira[0]
+
+
+def _verificar_anexar_e_reescrever(engine, dados):
+    assert _contar(engine, "contratos") == LINHAS_INICIAIS["contratos"]
+    assert {acao for acao, _ in ingerir(dados, engine=engine).values()} == {"nada"}
+
+    _anexar_contratos(dados)
+    resultado = ingerir(dados, engine=engine)
+    assert resultado["contratos"] == ("anexar", LINHAS_ANEXADAS)
+    assert resultado["clientes"][0] == "nada"
+    assert _contar(engine, "contratos") == LINHAS_INICIAIS["contratos"] + LINHAS_ANEXADAS
+
+    id_cliente = _reescrever_clientes(dados)
+    resultado = ingerir(dados, engine=engine)
+    assert resultado["clientes"] == ("completa", LINHAS_INICIAIS["clientes"])
+    assert resultado["contratos"][0] == "nada"
+    with engine.connect() as conn:
+        nome = conn.execute(text("SELECT nome FROM clientes WHERE id_cliente = :id"), {"id": id_cliente}).scalar()
+        linhas = conn.execute(text("SELECT linhas_carregadas FROM ingestao_arquivos WHERE tabela = 'contratos'")).scalar()
+    assert nome == "Nome Reescrito"
+    assert linhas == LINHAS_INICIAIS["contratos"] + LINHAS_ANEXADAS
+
+
+def test_sqlite_anexar_e_reescrever(dados, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingestao.db'}")
+    try:
+        assert ingerir(dados, engine=engine)["clientes"] == ("completa", LINHAS_INICIAIS["clientes"])
+        _verificar_anexar_e_reescrever(engine, dados)
+    finally:
+        engine.dispose()
+
+
+def test_banco_local_anexar_e_reescrever(dados, banco_local):
+    # get_engine já prepara o banco local pelo ingestao.py; a ingestão seguinte só vê o que mudou
+    engine = data_acess.get_engine(banco_local)
+    _verificar_anexar_e_reescrever(engine, dados)
+
+    assert backend_local.preparar_banco_local(engine) == []
+    assert _contar(engine, "v_contratos_detalhados") == LINHAS_INICIAIS["contratos"] + LINHAS_ANEXADAS
+    assert _contar(engine, "v_perfil_cliente_enriquecido") == LINHAS_INICIAIS["clientes"]
+
+
+def test_banco_local_busca_nome_igual_ao_indice(banco_local):
+    # nome_busca (criada pela ingestão) e o índice em memória normalizam o nome do mesmo jeito
+    engine = data_acess.get_engine(banco_local)
+    with engine.connect() as conn:
+        perfil = pd.read_sql_query(text(f"SELECT cliente_id, nome FROM {VIEW_CLIENTES}"), conn)
+    indice = IndiceNomes(perfil["nome"])
+
+    com_acento = perfil["nome"].str.lower().str.startswith("jú").sum()
+    assert com_acento > 0
+    for termo in ["jú", "JU", "ju", "bé", "Be", "mar", "zz", "50%"]:
+        where, params, _ = compilar_filtros({"nome": termo})
+        with engine.connect() as conn:
+            banco = conn.execute(text(f"SELECT cliente_id FROM {VIEW_CLIENTES} WHERE {where}"), params).scalars()
+            banco = sorted(banco)
+        memoria = sorted(perfil["cliente_id"].iloc[indice.buscar(termo)])
+        assert banco == memoria, termo
+        if termo.lower() == "ju":
+            assert len(banco) >= com_acento
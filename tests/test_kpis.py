@@ -0,0 +1,78 @@
+"""KPIs por tipo de seguro: a query agrupada contra o cálculo direto em pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.data.processed import kpis
+
+TIPOS = ["Auto", "Residencial", "Saúde", "Vida"]
+STATUS = ["Ativo", "Cancelado", "Encerrado", "Suspenso"]
+
+
+@pytest.fixture
+def contratos():
+    rng = np.random.default_rng(3)
+    n = 800
+    df = pd.DataFrame({
+        "contrato_id": np.arange(n),
+        "cliente_id": rng.integers(0, 200, n),
+        "tipo_seguro_nome": rng.choice(TIPOS, n),
+        "status_contrato": rng.choice(STATUS, n, p=[0.5, 0.2, 0.2, 0.1]),
+        "premio_mensal": rng.uniform(50, 900, n).round(2),
+        "nivel_satisfacao_num": rng.integers(0, 6, n),
+    })
+    df.loc[:9, "tipo_seguro_nome"] = None
+    # Tipo só com contratos suspensos: sem denominador para o churn
+    df.loc[10:14, ["tipo_seguro_nome", "status_contrato"]] = ["Odonto", "Suspenso"]
+    return df
+
+
+@pytest.fixture
+def engine(contratos):
+    pytest.importorskip("duckdb_engine")
+    engine = create_engine("duckdb:///:memory:")
+    with engine.begin() as conn:
+        conn.connection.driver_connection.register("_contratos", contratos)
+        conn.execute(text("CREATE TABLE v_contratos_detalhados AS SELECT * FROM _contratos"))
+    yield engine
+    engine.dispose()
+
+
+def _esperado(df):
+    linhas = {}
+    for tipo, grupo in df.dropna(subset=["tipo_seguro_nome"]).groupby("tipo_seguro_nome"):
+        ativos = grupo[grupo["status_contrato"] == "Ativo"]
+        base_churn = grupo["status_contrato"].isin(["Ativo", "Cancelado", "Encerrado"]).sum()
+        satisfeitos = grupo.loc[grupo["nivel_satisfacao_num"] > 0, "nivel_satisfacao_num"]
+        linhas[tipo] = {
+            "total_contratos_ativos": len(ativos),
+            "total_clientes_ativos": ativos["cliente_id"].nunique(),
+            "faturamento_total": ativos["premio_mensal"].sum(),
+            "churn_rate": (grupo["status_contrato"] == "Cancelado").sum() * 100 / base_churn if base_churn else 0.0,
+            "satisfacao_media": round(satisfeitos.mean(), 2) if len(satisfeitos) else 0.0,
+        }
+    return pd.DataFrame.from_dict(linhas, orient="index")
+
+
+def test_kpis_por_tipo_igual_ao_pandas(engine, contratos, monkeypatch):
+    monkeypatch.setattr(
+        kpis, "carregar_query_parametrizada",
+        lambda sql, params=None: pd.read_sql_query(text(sql), engine, params=params or {}),
+    )
+    obtido = kpis.carregar_kpis_por_tipo()
+    esperado = _esperado(contratos)
+
+    assert list(obtido.columns) == kpis.COLUNAS_KPI
+    assert list(obtido.index) == sorted(esperado.index)
+    assert obtido.loc["Odonto", "churn_rate"] == 0.0
+    for coluna in kpis.COLUNAS_KPI:
+        np.testing.assert_allclose(
+            obtido[coluna].astype(float), esperado.loc[obtido.index, coluna].astype(float), rtol=1e-5, err_msg=coluna
+        )
+
+
+def test_kpis_sem_contratos(monkeypatch):
+    monkeypatch.setattr(kpis, "carregar_query_parametrizada", lambda sql, params=None: pd.DataFrame())
+    vazio = kpis.carregar_kpis_por_tipo()
+    assert vazio.empty and list(vazio.columns) == kpis.COLUNAS_KPI
@@ -0,0 +1,55 @@
+"""Modo de treino nativo: CatBoost com cat_features, sem encoder, do treino à pontuação."""
+import numpy as np
+import pandas as pd
+
+from data.models.aply_mode import PontuadorLocal, columns_for_model_input
+from data.models.artefato import carregar_artefato, salvar_artefato
+from data.models.train_model import categorical_features, treinar_nativo
+from data.models.transformacao import TransformacaoNativa
+
+from conftest import gerar_clientes_predicao
+
+
+def test_transformacao_nativa():
+    X = pd.DataFrame({
+        "renda": [1.0, 2.0, np.nan],
+        "genero": pd.Categorical(["M", None, "F"]),
+        "canal": ["Online", np.nan, "Corretor"],
+        "extra": [0, 0, 0],
+    })
+    saida = TransformacaoNativa(["genero", "renda", "canal"], ["genero", "canal"]).transform(X)
+    assert list(saida.columns) == ["genero", "renda", "canal"]
+    # O CatBoost não aceita NaN em categóricas: nulos viram texto vazio; numéricas ficam como estão
+    assert saida["genero"].tolist() == ["M", "", "F"]
+    assert saida["canal"].tolist() == ["Online", "", "Corretor"]
+    assert np.isnan(saida["renda"].iloc[2])
+    # A entrada não é alterada
+    assert X["canal"].isna().sum() == 1
+
+
+def test_treino_nativo_e_pontuacao_pelo_artefato(tmp_path):
+    df = gerar_clientes_predicao(400, semente=5)
+    df.loc[::13, "genero"] = np.nan
+    X, y = df[columns_for_model_input], df["cancelou"]
+
+    encoder, modelo, preparar = treinar_nativo(X, y, parametros={"iterations": 30, "allow_writing_files": False})
+    assert encoder is None
+    assert sorted(modelo.get_cat_feature_indices()) == sorted(
+        columns_for_model_input.index(coluna) for coluna in categorical_features)
+
+    destino = salvar_artefato(None, modelo, list(X.columns), threshold=0.5, diretorio_base=str(tmp_path),
+                              cat_features=categorical_features)
+    artefato = carregar_artefato(destino)
+    assert artefato.manifesto["modo"] == "nativo"
+    assert artefato.encoder is None
+    assert artefato.cat_features == categorical_features
+
+    novos = gerar_clientes_predicao(50, semente=6)
+    novos.loc[0, "genero"] = np.nan
+    novos.loc[1, "canal_venda"] = "Telefone"  # categoria que o treino nunca viu
+    esperado = modelo.predict_proba(preparar(novos[columns_for_model_input]))[:, 1]
+
+    # Colunas fora da ordem do treino e extras são ignoradas pelo preparador do artefato
+    entrada = novos[list(reversed(columns_for_model_input)) + ["cliente_id"]]
+    np.testing.assert_allclose(artefato.modelo.predict_proba(artefato.preparador()(entrada))[:, 1], esperado)
+    np.testing.assert_allclose(PontuadorLocal(artefato=artefato).probabilidades(entrada), esperado)
@@ -0,0 +1,68 @@
+"""--incremental do aply_mode.py: só linhas novas, alteradas ou com previsão afetada pelo threshold."""
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from data.models.aply_mode import pontuar
+from data.models.artefato import atualizar_manifesto
+
+from conftest import gerar_clientes_predicao
+
+
+def _alterar_base(engine):
+    novos = gerar_clientes_predicao(5, semente=9).drop(columns="cancelou")
+    novos["id_contrato_legado"] = np.arange(5) + 100_000
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE v_clientes_para_predicao_final
+            SET satisfacao_score = 6 - satisfacao_score, duracao_dias = duracao_dias + 1
+            WHERE id_contrato_legado IN (SELECT id_contrato_legado FROM v_clientes_para_predicao_final
+                                         ORDER BY id_contrato_legado LIMIT 10)
+        """))
+        conn.connection.driver_connection.register("_novos", novos)
+        conn.execute(text("INSERT INTO v_clientes_para_predicao_final SELECT * FROM _novos"))
+
+
+@pytest.mark.parametrize("formato", ["csv", "banco"])
+def test_incremental_pontua_so_o_que_mudou(formato, base_predicao, artefato_teste, tmp_path):
+    saida = str(tmp_path / "previsoes.csv") if formato == "csv" else None
+
+    def rodar(incremental=True):
+        return pontuar(64, formato, saida, artefato_teste, incremental=incremental, engine=base_predicao)
+
+    def ler():
+        if formato == "csv":
+            df = pd.read_csv(saida)
+        else:
+            with base_predicao.connect() as conn:
+                df = pd.read_sql_query(text("SELECT * FROM predicoes_churn"), conn)
+        return df.sort_values("contrato_id").reset_index(drop=True)[
+            ["contrato_id", "probabilidade_cancelamento", "cancelamento_previsto"]]
+
+    assert rodar() == (500, 500)
+    primeira = ler()
+    assert rodar() == (500, 0)
+    pd.testing.assert_frame_equal(ler(), primeira)
+
+    _alterar_base(base_predicao)
+    assert rodar() == (505, 15)
+    incremental = ler()
+    rodar(incremental=False)
+    pd.testing.assert_frame_equal(incremental, ler(), check_exact=False, rtol=1e-12)
+
+
+def test_threshold_novo_repontua_as_previsoes_que_mudam(base_predicao, artefato_teste, tmp_path):
+    artefato = shutil.copytree(artefato_teste, tmp_path / "artefato")
+    saida = str(tmp_path / "previsoes.csv")
+    pontuar(64, "csv", saida, str(artefato), incremental=True, engine=base_predicao)
+    anterior = pd.read_csv(saida)
+
+    atualizar_manifesto(str(artefato), threshold=0.6)
+    _, pontuadas = pontuar(64, "csv", saida, str(artefato), incremental=True, engine=base_predicao)
+    mudam = ((anterior["probabilidade_cancelamento"] >= 0.4) != (anterior["probabilidade_cancelamento"] >= 0.6)).sum()
+    assert pontuadas == mudam > 0
+    atual = pd.read_csv(saida)
+    assert (atual["cancelamento_previsto"] == (atual["probabilidade_cancelamento"] >= 0.6).astype(int)).all()
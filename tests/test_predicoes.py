@@ -0,0 +1,127 @@
+"""Tabela predicoes_churn: upsert do EscritorPredicoes e leituras em cache das páginas."""
+import pandas as pd
+import pytest
+import streamlit as st
+from sqlalchemy import create_engine, text
+
+from backend.data.processed import predicoes
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    pytest.importorskip("duckdb_engine")
+    engine = create_engine(f"duckdb:///{tmp_path / 'predicoes.duckdb'}")
+    monkeypatch.setattr(predicoes, "get_engine", lambda: engine)
+    monkeypatch.setattr(predicoes, "_existe", {})
+    st.cache_data.clear()
+    yield engine
+    st.cache_data.clear()
+    engine.dispose()
+
+
+def _previsoes(contratos, probabilidade, versao="v1"):
+    return pd.DataFrame({
+        "contrato_id": contratos,
+        "cliente_id": [c // 10 for c in contratos],
+        "tipo_seguro": ["Auto" if c % 2 else "Vida" for c in contratos],
+        "versao_modelo": versao,
+        "probabilidade_cancelamento": probabilidade,
+        "cancelamento_previsto": [int(p >= 0.5) for p in probabilidade],
+        "hash_features": contratos,
+    })
+
+
+def _gravar(engine, *lotes, alterados=None):
+    escritor = predicoes.EscritorPredicoes(engine)
+    for lote in lotes:
+        escritor.escrever(lote, alterados)
+    escritor.fechar()
+
+
+def _tabela(engine):
+    with engine.connect() as conn:
+        return pd.read_sql_query(
+            text("SELECT contrato_id, probabilidade_cancelamento FROM predicoes_churn ORDER BY contrato_id"), conn)
+
+
+def test_upsert_e_remocao_dos_contratos_nao_vistos(banco):
+    _gravar(banco, _previsoes([10, 11], [0.1, 0.9]), _previsoes([12, 13], [0.6, 0.2]))
+    assert _tabela(banco)["contrato_id"].tolist() == [10, 11, 12, 13]
+
+    # 13 sumiu da base, 11 mudou e 14 é novo
+    _gravar(banco, _previsoes([10, 11, 12, 14], [0.1, 0.3, 0.6, 0.8]))
+    tabela = _tabela(banco)
+    assert tabela["contrato_id"].tolist() == [10, 11, 12, 14]
+    assert tabela["probabilidade_cancelamento"].tolist() == [0.1, 0.3, 0.6, 0.8]
+
+
+def test_incremental_regrava_so_as_linhas_alteradas(banco):
+    _gravar(banco, _previsoes([10, 11, 12], [0.1, 0.9, 0.6]))
+    lote = _previsoes([10, 11, 12], [0.5, 0.5, 0.5])
+    _gravar(banco, lote, alterados=pd.Series([False, True, False]))
+    # As não alteradas continuam como estavam (e não são removidas, porque foram vistas)
+    assert _tabela(banco)["probabilidade_cancelamento"].tolist() == [0.1, 0.5, 0.6]
+    assert set(predicoes.ler_hashes("v1", banco)["contrato_id"]) == {10, 11, 12}
+
+
+def test_descartar_nao_grava_nada(banco):
+    _gravar(banco, _previsoes([10], [0.1]))
+    escritor = predicoes.EscritorPredicoes(banco)
+    escritor.escrever(_previsoes([20], [0.9]))
+    escritor.descartar()
+    assert _tabela(banco)["contrato_id"].tolist() == [10]
+    assert predicoes.carimbo_predicoes(banco) == 1
+
+
+def test_sem_tabela_retorna_vazio(banco):
+    vazio = predicoes.carregar_predicoes()
+    assert vazio.empty
+    assert list(vazio.columns) == predicoes.COLUNAS_PAGINAS
+    assert predicoes.ler_hashes("v1", banco).empty
+
+
+def test_nova_gravacao_aparece_sem_limpar_o_cache(banco):
+    _gravar(banco, _previsoes([10, 11, 12], [0.1, 0.9, 0.6]))
+    assert predicoes.carregar_predicoes()["contrato_id"].tolist() == [10, 11, 12]
+    risco_auto = predicoes.carregar_predicoes(tipo_seguro="Auto", apenas_risco=True)
+    assert risco_auto["contrato_id"].tolist() == [11]
+    assert risco_auto["tende_cancelar"].tolist() == [1]
+
+    _gravar(banco, _previsoes([10, 11, 13], [0.7, 0.2, 0.9]))
+    assert predicoes.carimbo_predicoes(banco) == 2
+    assert predicoes.carregar_predicoes()["contrato_id"].tolist() == [10, 11, 13]
+    assert predicoes.carregar_predicoes(tipo_seguro="Auto", apenas_risco=True)["contrato_id"].tolist() == [13]
+
+
+def test_previsoes_gravadas_antes_do_marcador(banco):
+    _gravar(banco, _previsoes([10, 11], [0.1, 0.9]))
+    with banco.begin() as conn:
+        conn.execute(text("DROP TABLE predicoes_churn_carga"))
+    predicoes._existe.clear()
+    assert predicoes.carimbo_predicoes(banco) == 0
+    assert predicoes.carregar_predicoes()["contrato_id"].tolist() == [10, 11]
+
+    # A próxima gravação cria o marcador e a leitura seguinte já vê os dados novos
+    _gravar(banco, _previsoes([12], [0.9]))
+    assert predicoes.carregar_predicoes()["contrato_id"].tolist() == [12]
+
+
+def test_existencia_da_tabela_verificada_uma_vez(banco, monkeypatch):
+    chamadas = []
+    original = predicoes.inspect
+
+    def inspect_contado(engine):
+        chamadas.append(engine)
+        return original(engine)
+
+    monkeypatch.setattr(predicoes, "inspect", inspect_contado)
+    # Ausente: guardado por REVERIFICAR_AUSENTE_S
+    assert predicoes.carimbo_predicoes(banco) is None
+    assert predicoes.carimbo_predicoes(banco) is None
+    assert len(chamadas) == 1
+
+    # O escritor marca a tabela como existente; daí em diante nunca mais há reflexão
+    _gravar(banco, _previsoes([10], [0.1]))
+    for _ in range(3):
+        predicoes.carregar_predicoes()
+    assert len(chamadas) == 1
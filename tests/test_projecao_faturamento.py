@@ -0,0 +1,60 @@
+"""Série mensal por vetor de diferenças contra o filtro mês a mês."""
+import numpy as np
+import pandas as pd
+
+from backend.data.processed.projecao_faturamento import projetar_faturamento_cenario, projetar_series
+
+
+def _contratos(n=600, semente=9):
+    rng = np.random.default_rng(semente)
+    inicio = pd.Series(pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 2000, n), unit="D"))
+    fim = inicio + pd.to_timedelta(rng.integers(-60, 1200, n), unit="D")
+    inicio.iloc[:5] = pd.NaT
+    return pd.DataFrame({
+        "data_inicio": inicio,
+        "data_fim": fim,
+        "status_contrato": rng.choice(["Ativo", "Cancelado", "Encerrado"], n),
+        "premio_mensal": rng.uniform(50, 900, n).round(2),
+        "is_predicted_to_cancel": rng.random(n) < 0.3,
+    })
+
+
+def _soma_mes_a_mes(contratos, meses, peso):
+    mes_inicio = contratos["data_inicio"].dt.to_period("M")
+    mes_fim = contratos["data_fim"].dt.to_period("M")
+    return np.array([peso[(mes_inicio <= mes) & (mes_fim >= mes)].sum() for mes in meses.to_period("M")])
+
+
+def test_projetar_series_igual_ao_filtro_mes_a_mes():
+    contratos = _contratos()
+    # Janela que corta contratos dos dois lados
+    meses = pd.date_range("2020-03-01", "2023-06-01", freq="MS")
+    premio = contratos["premio_mensal"].to_numpy()
+    df = projetar_series(contratos["data_inicio"], contratos["data_fim"], meses,
+                         {"premio": premio, "contratos": np.ones(len(contratos))})
+
+    assert list(df.columns) == ["Data", "premio", "contratos"]
+    np.testing.assert_allclose(df["premio"], _soma_mes_a_mes(contratos, meses, premio), atol=1e-6)
+    np.testing.assert_allclose(df["contratos"], _soma_mes_a_mes(contratos, meses, np.ones(len(contratos))), atol=1e-9)
+
+
+def test_projetar_series_sem_meses():
+    contratos = _contratos(10)
+    df = projetar_series(contratos["data_inicio"], contratos["data_fim"], [], {"premio": contratos["premio_mensal"]})
+    assert df.empty and list(df.columns) == ["Data", "premio"]
+
+
+def test_cenario_acompanha_o_real_antes_do_corte():
+    contratos = _contratos()
+    meses = pd.date_range("2020-01-01", "2024-12-01", freq="MS")
+    corte = pd.Timestamp("2022-07-01")
+    df = projetar_faturamento_cenario(contratos, meses, corte)
+
+    ativos = contratos["status_contrato"] == "Ativo"
+    mantidos = ativos & ~contratos["is_predicted_to_cancel"]
+    real = _soma_mes_a_mes(contratos, meses, np.where(ativos, contratos["premio_mensal"], 0.0))
+    cenario = _soma_mes_a_mes(contratos, meses, np.where(mantidos, contratos["premio_mensal"], 0.0))
+    depois = meses >= corte
+    np.testing.assert_allclose(df["Faturamento Real"], real, atol=1e-6)
+    np.testing.assert_allclose(df.loc[~depois, "Faturamento Cenário Cancelamento"], real[~depois], atol=1e-6)
+    np.testing.assert_allclose(df.loc[depois, "Faturamento Cenário Cancelamento"], cenario[depois], atol=1e-6)
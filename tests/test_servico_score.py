@@ -0,0 +1,149 @@
+"""Serviço de score online: validação do corpo, agrupamento em lotes e o servidor HTTP."""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.models import servico_score
+from data.models.artefato import carregar_artefato
+from data.models.servico_score import AgrupadorLotes, ErroRequisicao, Metricas, criar_servidor, ler_registros
+from frontend.pages.clientes import detalhe_erro_servico
+
+from conftest import gerar_clientes_predicao
+
+COLUNAS = ["a", "b"]
+
+
+class PontuadorSoma:
+    """Probabilidade = a + b; guarda o tamanho de cada lote recebido."""
+
+    def __init__(self, atraso_s=0.0):
+        self.lotes = []
+        self.atraso_s = atraso_s
+
+    def probabilidades(self, X):
+        time.sleep(self.atraso_s)
+        self.lotes.append(len(X))
+        return (X["a"] + X["b"]).to_numpy(dtype=np.float64)
+
+
+def test_ler_registros():
+    assert ler_registros(b'{"a": 1, "b": 2}', COLUNAS) == [{"a": 1, "b": 2}]
+    assert ler_registros(b'{"clientes": [{"a": 1, "b": 2}, {"a": 3, "b": 4}]}', COLUNAS) == [
+        {"a": 1, "b": 2}, {"a": 3, "b": 4}]
+    assert ler_registros(b'[{"a": 1, "b": 2}]', COLUNAS) == [{"a": 1, "b": 2}]
+    for corpo in (b"", b"{", b"[]", b'{"clientes": []}', b"[1, 2]", b'"texto"'):
+        with pytest.raises(ErroRequisicao):
+            ler_registros(corpo, COLUNAS)
+    with pytest.raises(ErroRequisicao, match="Cliente 1: faltam as features b"):
+        ler_registros(b'[{"a": 1, "b": 2}, {"a": 3}]', COLUNAS)
+
+
+def test_agrupador_junta_requisicoes_concorrentes():
+    pontuador = PontuadorSoma()
+    metricas = Metricas()
+    agrupador = AgrupadorLotes(pontuador, metricas, COLUNAS, janela_ms=200, max_linhas=1000)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            resultados = list(executor.map(lambda i: agrupador.pontuar([{"a": i, "b": 0.5}] * (i + 1)), range(8)))
+    finally:
+        agrupador.fechar()
+    # Cada requisição recebe a sua fatia, na ordem dos seus registros
+    for i, proba in enumerate(resultados):
+        np.testing.assert_array_equal(proba, np.full(i + 1, i + 0.5))
+    assert sum(pontuador.lotes) == sum(range(1, 9))
+    assert len(pontuador.lotes) < 8
+    assert metricas.resumo()["lotes"] == len(pontuador.lotes)
+
+
+def test_agrupador_respeita_max_linhas():
+    pontuador = PontuadorSoma()
+    agrupador = AgrupadorLotes(pontuador, Metricas(), COLUNAS, janela_ms=200, max_linhas=4)
+    try:
+        with ThreadPoolExecutor(6) as executor:
+            list(executor.map(lambda _: agrupador.pontuar([{"a": 0, "b": 0}] * 2), range(6)))
+    finally:
+        agrupador.fechar()
+    assert max(pontuador.lotes) <= 4
+    assert sum(pontuador.lotes) == 12
+
+
+def test_agrupador_timeout_e_erro_do_modelo():
+    agrupador = AgrupadorLotes(PontuadorSoma(atraso_s=0.5), Metricas(), COLUNAS, janela_ms=0, timeout_s=0.05)
+    try:
+        with pytest.raises(TimeoutError):
+            agrupador.pontuar([{"a": 1, "b": 1}])
+    finally:
+        agrupador.fechar()
+
+    # Exceção no modelo chega a todas as requisições do lote, e a thread segue atendendo
+    agrupador = AgrupadorLotes(PontuadorSoma(), Metricas(), COLUNAS, janela_ms=0)
+    try:
+        with pytest.raises(TypeError):
+            agrupador.pontuar([{"a": "x", "b": 1}])
+        np.testing.assert_array_equal(agrupador.pontuar([{"a": 1, "b": 1}]), [2.0])
+    finally:
+        agrupador.fechar()
+
+
+@pytest.fixture
+def servidor(artefato_teste, monkeypatch):
+    cargas = []
+    original = servico_score.carregar_artefato
+
+    def carregar_contado(caminho=None):
+        cargas.append(caminho)
+        return original(caminho)
+
+    monkeypatch.setattr(servico_score, "carregar_artefato", carregar_contado)
+    servidor = criar_servidor("127.0.0.1", 0, artefato_teste, janela_ms=1)
+    servidor.cargas = cargas
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+    servidor.agrupador.fechar()
+
+
+def _url(servidor, caminho):
+    return f"http://127.0.0.1:{servidor.server_address[1]}{caminho}"
+
+
+def _post(servidor, corpo):
+    requisicao = urllib.request.Request(_url(servidor, "/score"), data=corpo,
+                                        headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(requisicao, timeout=5) as resposta:
+        return json.loads(resposta.read())
+
+
+def test_servidor_pontua_como_o_modelo(servidor, artefato_teste):
+    # O artefato é aberto uma vez só, e o pontuador usa esse mesmo
+    assert servidor.cargas == [artefato_teste]
+
+    artefato = carregar_artefato(artefato_teste)
+    clientes = gerar_clientes_predicao(5, semente=4)[artefato.colunas]
+    resposta = _post(servidor, json.dumps({"clientes": json.loads(clientes.to_json(orient="records"))}).encode())
+    esperado = artefato.modelo.predict_proba(artefato.encoder.transform(clientes))[:, 1]
+    np.testing.assert_allclose(resposta["probabilidades"], esperado)
+    assert resposta["cancelamento_previsto"] == (esperado >= 0.4).astype(int).tolist()
+    assert resposta["versao_modelo"] == artefato.versao
+
+    with urllib.request.urlopen(_url(servidor, "/saude"), timeout=5) as r:
+        assert json.loads(r.read())["colunas"] == artefato.colunas
+    with urllib.request.urlopen(_url(servidor, "/metricas"), timeout=5) as r:
+        assert json.loads(r.read())["linhas_pontuadas"] == 5
+
+
+def test_erro_http_mostra_status_e_motivo(servidor):
+    with pytest.raises(urllib.error.HTTPError) as erro:
+        _post(servidor, b'{"clientes": [{"genero": "M"}]}')
+    assert erro.value.code == 400
+    detalhe = detalhe_erro_servico(erro.value)
+    assert detalhe.startswith("HTTP 400: Cliente 0: faltam as features")
@@ -0,0 +1,64 @@
+"""Snapshots em disco: reuso dentro da janela, chave por banco e falha de gravação."""
+import logging
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from backend.data.processed import snapshot_cache
+from backend.data.processed.snapshot_cache import carregar_com_snapshot
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture(autouse=True)
+def diretorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_cache, "DIRETORIO_SNAPSHOTS", str(tmp_path / "snapshots"))
+    return tmp_path / "snapshots"
+
+
+class Busca:
+    def __init__(self, df):
+        self.df = df
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        return self.df
+
+
+def _engine(tmp_path, nome):
+    return create_engine(f"sqlite:///{tmp_path / nome}")
+
+
+def test_reusa_o_snapshot_dentro_da_janela(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, "a.db")
+    busca = Busca(pd.DataFrame({"x": [1, 2, 3], "y": ["a", "b", "c"]}))
+
+    primeiro = carregar_com_snapshot("view_teste", busca, engine)
+    segundo = carregar_com_snapshot("view_teste", busca, engine)
+    assert busca.chamadas == 1
+    pd.testing.assert_frame_equal(primeiro, segundo)
+
+    # Sem carimbo de versão (não é Postgres): passada a janela, o banco é consultado de novo
+    monkeypatch.setattr(snapshot_cache, "REVALIDAR_APOS_S", 0)
+    carregar_com_snapshot("view_teste", busca, engine)
+    assert busca.chamadas == 2
+
+
+def test_chave_inclui_o_banco(tmp_path):
+    busca_a = Busca(pd.DataFrame({"x": [1]}))
+    busca_b = Busca(pd.DataFrame({"x": [2]}))
+    a = carregar_com_snapshot("view_teste", busca_a, _engine(tmp_path, "a.db"))
+    b = carregar_com_snapshot("view_teste", busca_b, _engine(tmp_path, "b.db"))
+    assert (a["x"].tolist(), b["x"].tolist()) == ([1], [2])
+    assert busca_a.chamadas == busca_b.chamadas == 1
+
+
+def test_falha_ao_gravar_so_registra_aviso(tmp_path, diretorio, caplog):
+    diretorio.write_text("não é um diretório")
+    busca = Busca(pd.DataFrame({"x": [1]}))
+    with caplog.at_level(logging.WARNING, logger=snapshot_cache.__name__):
+        df = carregar_com_snapshot("view_teste", busca, _engine(tmp_path, "a.db"))
+    assert df["x"].tolist() == [1]
+    assert "view_teste" in caplog.text
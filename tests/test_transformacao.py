@@ -0,0 +1,100 @@
+"""Transformação compilada: mesma matriz que o ColumnTransformer treinado."""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from data.models.artefato import carregar_artefato
+from data.models.transformacao import (
+    TransformacaoCompilada, TransformacaoNaoSuportada, compilar_transformacao, verificar_paridade,
+)
+
+CATEGORICAS = ["genero", "canal"]
+NUMERICAS = ["renda", "score"]
+
+
+def _treino(n=200, semente=0, com_nulos=False):
+    rng = np.random.default_rng(semente)
+    df = pd.DataFrame({
+        "genero": rng.choice(["M", "F", "O"], n).astype(object),
+        "renda": rng.uniform(1000, 9000, n),
+        "canal": rng.choice(["Online", "Corretor"], n).astype(object),
+        "score": rng.integers(1, 6, n).astype(float),
+    })
+    if com_nulos:
+        df.loc[::17, "genero"] = np.nan
+    return df
+
+
+def _encoder(X, **opcoes):
+    opcoes = {"handle_unknown": "ignore", "sparse_output": False, **opcoes}
+    return ColumnTransformer([("cat", OneHotEncoder(**opcoes), CATEGORICAS)], remainder="passthrough").fit(X)
+
+
+@pytest.mark.parametrize("com_nulos", [False, True])
+def test_paridade_com_desconhecidas_e_nulos(com_nulos):
+    encoder = _encoder(_treino(com_nulos=com_nulos))
+    X = _treino(50, semente=1)
+    X.loc[0, "genero"] = "Não informado"  # categoria que o treino nunca viu
+    X.loc[1, "canal"] = "Telefone"
+    X.loc[2, "genero"] = np.nan  # desconhecida se o treino não teve nulos, categoria própria se teve
+    X.loc[3, "renda"] = np.nan  # passthrough mantém o NaN
+    assert verificar_paridade(encoder, X)
+
+    obtido = TransformacaoCompilada(encoder).transform(X)
+    assert obtido.dtype == np.float64
+    n_genero = len(encoder.named_transformers_["cat"].categories_[0])
+    assert obtido[0, :n_genero].sum() == 0
+    assert obtido[2, :n_genero].sum() == (1 if com_nulos else 0)
+    assert np.isnan(obtido[3]).sum() == 1
+
+
+def test_ordem_das_colunas_de_entrada_nao_importa():
+    encoder = _encoder(_treino())
+    X = _treino(30, semente=2)
+    assert verificar_paridade(encoder, X[["score", "canal", "renda", "genero"]])
+
+
+def test_detecta_diferenca(monkeypatch):
+    encoder = _encoder(_treino())
+    original = TransformacaoCompilada.transform
+
+    def adulterada(self, X):
+        saida = original(self, X)
+        saida[0, 0] += 1
+        return saida
+
+    monkeypatch.setattr(TransformacaoCompilada, "transform", adulterada)
+    assert not verificar_paridade(encoder, _treino(30, semente=3))
+
+
+@pytest.mark.parametrize("encoder", [
+    lambda X: _encoder(X, drop="first"),
+    lambda X: _encoder(X, min_frequency=5),
+    lambda X: ColumnTransformer([("num", StandardScaler(), NUMERICAS)], remainder="passthrough").fit(X),
+])
+def test_encoder_nao_suportado_usa_o_original(encoder):
+    X = _treino()
+    encoder = encoder(X)
+    with pytest.raises(TransformacaoNaoSuportada):
+        TransformacaoCompilada(encoder)
+    assert not verificar_paridade(encoder, X)
+    assert compilar_transformacao(encoder) == encoder.transform
+
+
+def test_artefato_sem_paridade_pontua_com_o_encoder(artefato_teste, tmp_path):
+    destino = str(shutil.copytree(artefato_teste, tmp_path / "artefato"))
+    assert carregar_artefato(destino).preparador() != carregar_artefato(destino).encoder.transform
+
+    caminho_manifesto = os.path.join(destino, "manifesto.json")
+    with open(caminho_manifesto) as f:
+        manifesto = json.load(f)
+    with open(caminho_manifesto, "w") as f:
+        json.dump({**manifesto, "transformacao_compilada": False}, f)
+    artefato = carregar_artefato(destino)
+    assert artefato.preparador() == artefato.encoder.transform
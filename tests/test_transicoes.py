@@ -0,0 +1,57 @@
+"""Matriz de transições de tipo de seguro contra a contagem contrato a contrato."""
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from backend.data.processed.transicoes import COLUNAS_MATRIZ, construir_matriz_transicoes
+
+TIPOS = ["Auto", "Residencial", "Saúde", "Vida"]
+
+
+def _esperado(df):
+    contagem = Counter()
+    for _, grupo in df.sort_values(["cliente_id", "data_inicio"], kind="mergesort").groupby("cliente_id"):
+        tipos = grupo["tipo_seguro_nome"].tolist()
+        for atual, seguinte in zip(tipos, tipos[1:]):
+            if pd.notna(atual) and pd.notna(seguinte) and atual != seguinte:
+                contagem[(atual, seguinte)] += 1
+    return contagem
+
+
+def test_transicoes_iguais_a_contagem_por_cliente():
+    rng = np.random.default_rng(5)
+    n = 2000
+    df = pd.DataFrame({
+        "cliente_id": rng.integers(0, 300, n),
+        # Poucas datas distintas: muitos empates, que mantêm a ordem de chegada
+        "data_inicio": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 60, n) * 30, unit="D"),
+        "tipo_seguro_nome": rng.choice(TIPOS, n).astype(object),
+    })
+    df.loc[rng.choice(n, 50, replace=False), "tipo_seguro_nome"] = None
+
+    matriz = construir_matriz_transicoes(df)
+    obtido = {(linha.From, linha.To): linha.Count for linha in matriz.itertuples()}
+    assert list(matriz.columns) == COLUNAS_MATRIZ
+    assert obtido == dict(_esperado(df))
+
+
+def test_sem_transicoes():
+    df = pd.DataFrame({
+        "cliente_id": [1, 1, 2],
+        "data_inicio": ["2021-01-01", "2022-01-01", "2021-05-01"],
+        "tipo_seguro_nome": ["Auto", "Auto", "Vida"],
+    })
+    assert construir_matriz_transicoes(df).empty
+    assert construir_matriz_transicoes(df.drop(columns="data_inicio")).empty
+    assert list(construir_matriz_transicoes(df.iloc[:0]).columns) == COLUNAS_MATRIZ
+
+
+def test_ordem_pela_data_de_inicio():
+    df = pd.DataFrame({
+        "cliente_id": [7, 7, 7],
+        "data_inicio": ["2023-01-01", "2021-01-01", "2022-01-01"],
+        "tipo_seguro_nome": ["Vida", "Auto", "Saúde"],
+    })
+    matriz = construir_matriz_transicoes(df)
+    assert sorted(map(tuple, matriz[COLUNAS_MATRIZ].to_numpy().tolist())) == [("Auto", "Saúde", 1), ("Saúde", "Vida", 1)]